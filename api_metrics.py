@@ -0,0 +1,302 @@
+"""
+Metrics for every external API call (Google Sheets and Gemini).
+
+Each call records its latency, outcome, payload sizes and whether it hit a
+quota limit. The numbers are shared by all sessions of the app process and
+can be read as:
+    - Prometheus text (prometheus_text() or start_metrics_server(port))
+    - a JSONL log, one line per call (set_jsonl_log(path) or the
+      API_METRICS_LOG environment variable)
+    - a small Streamlit panel (render_metrics_panel())
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+_lock = threading.Lock()
+# (service, operation) -> dictionary of counters, see _new_entry()
+_metrics = {}
+_jsonl_path = os.environ.get("API_METRICS_LOG")
+_server = None
+# JSONL lines waiting to be written, so API calls never wait for the disk
+_log_queue = queue.SimpleQueue()
+_log_writer = None
+_write_lock = threading.Lock()
+
+
+def _new_entry():
+    return {
+        'calls': 0,
+        'errors': 0,
+        'quota_errors': 0,
+        'retries': 0,
+        'request_bytes': 0,
+        'response_bytes': 0,
+        'latency_sum': 0.0,
+        'buckets': [0] * len(LATENCY_BUCKETS),
+    }
+
+
+def set_jsonl_log(path):
+    """Append one JSON line per call to this file (None to stop logging)."""
+    global _jsonl_path
+    _jsonl_path = path
+
+
+def payload_size(payload):
+    """Size in bytes of a request or response body, as JSON."""
+    if payload is None:
+        return 0
+    if isinstance(payload, (bytes, str)):
+        return len(payload)
+    return len(json.dumps(payload, separators=(',', ':'), default=str))
+
+
+def error_status(error):
+    """HTTP status of an API error, or None if it isn't an HTTP error."""
+    resp = getattr(error, 'resp', None)
+    status = getattr(resp, 'status', None) or getattr(error, 'code', None)
+    try:
+        return int(status)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_quota_error(error):
+    """True for "too many requests" style errors (HTTP 429 or RESOURCE_EXHAUSTED)."""
+    return error_status(error) == 429 or 'RESOURCE_EXHAUSTED' in str(error) or 'Quota exceeded' in str(error)
+
+
+def record_call(service, operation, seconds, success, quota_error=False, request_bytes=0, response_bytes=0):
+    """Add one finished call to the metrics (and the JSONL log, if enabled)."""
+    with _lock:
+        entry = _metrics.setdefault((service, operation), _new_entry())
+        entry['calls'] += 1
+        entry['errors'] += 0 if success else 1
+        entry['quota_errors'] += 1 if quota_error else 0
+        entry['request_bytes'] += request_bytes
+        entry['response_bytes'] += response_bytes
+        entry['latency_sum'] += seconds
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                entry['buckets'][i] += 1
+                break
+        path = _jsonl_path
+
+    if path:
+        _log_queue.put((path, {
+            'time': time.time(),
+            'service': service,
+            'operation': operation,
+            'seconds': round(seconds, 6),
+            'success': success,
+            'quota_error': quota_error,
+            'request_bytes': request_bytes,
+            'response_bytes': response_bytes,
+        }))
+        _start_log_writer()
+
+
+def _start_log_writer():
+    global _log_writer
+    if _log_writer is None:
+        with _write_lock:
+            if _log_writer is None:
+                _log_writer = threading.Thread(target=_write_log_forever, daemon=True)
+                _log_writer.start()
+
+
+def _write_log_lines(first=None):
+    """Write every queued JSONL line (plus `first`, if given), one file open per path."""
+    pending = [first] if first else []
+    while True:
+        try:
+            pending.append(_log_queue.get_nowait())
+        except queue.Empty:
+            break
+    by_path = {}
+    for path, line in pending:
+        by_path.setdefault(path, []).append(json.dumps(line) + '\n')
+    with _write_lock:
+        for path, lines in by_path.items():
+            try:
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.writelines(lines)
+            except OSError:
+                pass
+
+
+def _write_log_forever():
+    # Background thread: wait for a line, then write it with whatever else queued up
+    while True:
+        _write_log_lines(_log_queue.get())
+
+
+# Write what is still queued when the process exits
+atexit.register(_write_log_lines)
+
+
+def record_retry(service, operation):
+    """Count one retry of a call (the retried attempt itself is recorded by record_call)."""
+    with _lock:
+        _metrics.setdefault((service, operation), _new_entry())['retries'] += 1
+
+
+@contextmanager
+def track_call(service, operation, request_bytes=0):
+    """
+    Time the code inside the with-block as one API call.
+
+    Set call['response_bytes'] inside the block to record the response size.
+    Exceptions are recorded as failed calls and raised again.
+
+    Example:
+        with track_call('gemini', 'generate_content', len(prompt)) as call:
+            response = model.generate_content(prompt)
+            call['response_bytes'] = len(response.text)
+    """
+    call = {'response_bytes': 0}
+    start = time.perf_counter()
+    try:
+        yield call
+    except Exception as error:
+        record_call(service, operation, time.perf_counter() - start, False,
+                    is_quota_error(error), request_bytes, call['response_bytes'])
+        raise
+    record_call(service, operation, time.perf_counter() - start, True,
+                False, request_bytes, call['response_bytes'])
+
+
+def execute(request, operation, body=None, service='sheets'):
+    """
+    Run request.execute() for a Google API request and record it.
+
+    Args:
+        request: The request object, e.g. service.spreadsheets().values().get(...)
+        operation: Name for the metrics, e.g. "values.get"
+        body: The request body that was sent, for the payload size
+
+    Returns:
+        Whatever request.execute() returns
+    """
+    with track_call(service, operation, payload_size(body)) as call:
+        result = request.execute()
+        call['response_bytes'] = payload_size(result)
+    return result
+
+
+def get_metrics():
+    """Copy of all counters: {(service, operation): {...}}."""
+    with _lock:
+        return {key: dict(entry, buckets=list(entry['buckets'])) for key, entry in _metrics.items()}
+
+
+def reset_metrics():
+    with _lock:
+        _metrics.clear()
+
+
+def prometheus_text():
+    """All metrics in the Prometheus text exposition format."""
+    metrics = get_metrics()
+    lines = [
+        "# HELP api_call_duration_seconds Latency of external API calls.",
+        "# TYPE api_call_duration_seconds histogram",
+    ]
+    for (service, operation), entry in sorted(metrics.items()):
+        labels = f'service="{service}",operation="{operation}"'
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, entry['buckets']):
+            cumulative += count
+            le = "+Inf" if bound == float('inf') else f"{bound:g}"
+            lines.append(f'api_call_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f'api_call_duration_seconds_sum{{{labels}}} {entry["latency_sum"]:.6f}')
+        lines.append(f'api_call_duration_seconds_count{{{labels}}} {entry["calls"]}')
+
+    counters = [
+        ('api_calls_total', 'calls', 'External API calls.'),
+        ('api_call_errors_total', 'errors', 'External API calls that failed.'),
+        ('api_quota_errors_total', 'quota_errors', 'External API calls rejected by a quota limit.'),
+        ('api_retries_total', 'retries', 'Retried external API calls.'),
+        ('api_request_bytes_total', 'request_bytes', 'Bytes sent to external APIs.'),
+        ('api_response_bytes_total', 'response_bytes', 'Bytes received from external APIs.'),
+    ]
+    for name, key, help_text in counters:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for (service, operation), entry in sorted(metrics.items()):
+            lines.append(f'{name}{{service="{service}",operation="{operation}"}} {entry[key]}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep the terminal quiet
+
+
+def start_metrics_server(port, host='127.0.0.1'):
+    """
+    Serve http://localhost:<port>/metrics for Prometheus, once per process.
+
+    Only this computer can reach it by default; pass host='0.0.0.0' to let a
+    Prometheus server elsewhere scrape it.
+
+    Returns:
+        True if the server is running, False if the port could not be used
+    """
+    global _server
+    with _lock:
+        if _server is not None:
+            return True
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError:
+            return False
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return True
+
+
+def render_metrics_panel():
+    """Small Streamlit table of calls, errors, latency and bytes per operation."""
+    import streamlit as st
+
+    metrics = get_metrics()
+    if not metrics:
+        st.write("No API calls yet.")
+        return
+
+    rows = []
+    for (service, operation), entry in sorted(metrics.items()):
+        rows.append({
+            "Service": service,
+            "Operation": operation,
+            "Calls": entry['calls'],
+            "Errors": entry['errors'],
+            "Quota errors": entry['quota_errors'],
+            "Retries": entry['retries'],
+            "Avg ms": round(entry['latency_sum'] / entry['calls'] * 1000, 1) if entry['calls'] else 0,
+            "KB sent": round(entry['request_bytes'] / 1024, 1),
+            "KB received": round(entry['response_bytes'] / 1024, 1),
+        })
+    st.dataframe(rows, hide_index=True)
+    st.download_button("Download Prometheus metrics", prometheus_text(), file_name="metrics.txt")
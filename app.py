@@ -1,4 +1,6 @@
+import time
 import streamlit as st
+from job_runner import JobRunner, TOOLS
 
 # Set page configuration
 st.set_page_config(
@@ -40,6 +42,77 @@ with col2:
 # Add some spacing
 st.markdown("---")
 
+
+@st.cache_resource
+def get_job_runner():
+    """One job runner for the whole server, so jobs outlive page reloads."""
+    return JobRunner(max_workers=3)
+
+
+runner = get_job_runner()
+
+# Start a tool in the background
+st.header("🧰 Run a Tool")
+tool = st.selectbox("Tool", list(TOOLS), format_func=lambda name: TOOLS[name]["label"])
+inputs = {}
+for name, label in TOOLS[tool]["inputs"].items():
+    if name == "urls":
+        inputs[name] = [u.strip() for u in st.text_area(label).splitlines() if u.strip()]
+    else:
+        inputs[name] = st.text_input(label).strip()
+if st.button("▶️ Start in background"):
+    if all(inputs.values()):
+        runner.submit(tool, **inputs)
+        st.success(f"Started {TOOLS[tool]['label']}. You can start more jobs or leave this page.")
+    else:
+        st.error("Please fill in all fields first!")
+
+
+def format_duration(seconds):
+    return f"{seconds / 60:.0f} min" if seconds >= 120 else f"{seconds:.0f} s"
+
+
+@st.fragment(run_every=2)
+def show_jobs():
+    """Running jobs with their progress and output, refreshed every 2 s."""
+    active = runner.active_jobs()
+    st.subheader(f"⏳ Running and queued ({len(active)})")
+    if not active:
+        st.caption("No jobs running.")
+    for job in active:
+        label = TOOLS[job["tool"]]["label"]
+        with st.container(border=True):
+            col1, col2 = st.columns([5, 1])
+            if job["status"] == "running":
+                col1.markdown(f"**{label}** · running for {format_duration(time.time() - job['started_at'])}")
+                if job["progress"] is not None:
+                    col1.progress(job["progress"])
+            else:
+                col1.markdown(f"**{label}** · waiting for a free slot")
+            if col2.button("⏹️ Cancel", key=f"cancel_{job['id']}"):
+                runner.cancel(job["id"])
+                st.rerun(scope="fragment")
+            if job["log_tail"]:
+                col1.code("\n".join(job["log_tail"][-10:]), language=None)
+
+    st.subheader("📜 History")
+    finished = runner.finished_jobs()
+    if not finished:
+        st.caption("No finished jobs yet.")
+    icons = {"done": "✅", "failed": "❌", "cancelled": "⏹️"}
+    for entry in finished:
+        label = TOOLS.get(entry["tool"], {}).get("label", entry["tool"])
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["finished_at"]))
+        with st.expander(f"{icons.get(entry['status'], '')} {label} · {when}"):
+            if entry["error"]:
+                st.error(entry["error"])
+            st.code("\n".join(entry["log_tail"]) or "(no output)", language=None)
+
+
+show_jobs()
+
+st.markdown("---")
+
 # Footer
 st.markdown("""
 <div style='text-align: center; color: gray;'>
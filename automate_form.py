@@ -2,9 +2,7 @@ import time
 import sys
 
 try:
-    from selenium import webdriver
     from selenium.webdriver.common.by import By
-    from selenium.webdriver.chrome.options import Options
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
 except Exception as import_error:
@@ -12,57 +10,173 @@ except Exception as import_error:
     print("Hint: open a terminal here and run: setup-venv (or) pip install -r requirements.txt")
     raise import_error
 
+from browser_driver import create_driver
+from browser_service import lease_browser
+
+
+# Selector for every field the fill engine knows how to answer
+FIELD_SELECTOR = "input[type='text'], textarea, div[role='radio'], div[role='checkbox']"
+
+# One round trip: describe every field on the page.
+# Each field gets a data attribute so the apply step (and any fallback) can find it again.
+SNAPSHOT_SCRIPT = """
+const fields = document.querySelectorAll(arguments[0]);
+const groups = Array.prototype.slice.call(document.querySelectorAll("[role='radiogroup']"));
+const snapshot = [];
+fields.forEach((el, index) => {
+    el.setAttribute('data-autofill-index', index);
+    const role = el.getAttribute('role');
+    const group = el.closest("[role='radiogroup']");
+    snapshot.push({
+        index: index,
+        kind: role ? role : el.tagName.toLowerCase(),
+        group: group ? groups.indexOf(group) : null,
+        label: el.getAttribute('aria-label') || el.getAttribute('data-value') || ''
+    });
+});
+return snapshot;
+"""
+
+# One round trip: apply every planned action and fire the events the page listens for.
+# After SETTLE_MS it returns the indexes of fields that did not keep the new value,
+# so they can be retried one by one.
+SETTLE_MS = 300
+APPLY_SCRIPT = """
+const actions = arguments[0];
+const settleMs = arguments[1];
+const done = arguments[arguments.length - 1];
+const rejected = [];
+const applied = [];
+actions.forEach((action) => {
+    const el = document.querySelector("[data-autofill-index='" + action.index + "']");
+    if (!el) {
+        rejected.push(action.index);
+        return;
+    }
+    try {
+        if (action.type === 'fill') {
+            const proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+            // Use the native setter so frameworks that track the value notice the change
+            Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, action.value);
+            el.dispatchEvent(new Event('input', {bubbles: true}));
+            el.dispatchEvent(new Event('change', {bubbles: true}));
+            el.dispatchEvent(new Event('blur', {bubbles: true}));
+        } else if (action.type === 'click') {
+            el.click();
+        }
+        applied.push([action, el]);
+    } catch (e) {
+        rejected.push(action.index);
+    }
+});
+// Check only after the page had time to react: a framework that ignored the
+// events puts its own value back on the next render, and aria-checked may
+// be updated a moment after the click.
+setTimeout(() => {
+    applied.forEach(([action, el]) => {
+        if (action.type === 'fill' && el.value !== action.value) {
+            rejected.push(action.index);
+        } else if (action.type === 'click' && (el.getAttribute('aria-checked') === 'false' || el.checked === false)) {
+            rejected.push(action.index);
+        }
+    });
+    done(rejected);
+}, settleMs);
+"""
+
+
+def is_checked(el):
+    """True if a radio button or checkbox (native or ARIA) is checked."""
+    aria = el.get_attribute("aria-checked")
+    if aria is not None:
+        return aria == "true"
+    return el.is_selected()
+
+
+def plan_form_actions(snapshot):
+    """
+    Decide what to do with every field, using only the DOM snapshot.
+
+    Args:
+        snapshot: List of field descriptions returned by SNAPSHOT_SCRIPT
+
+    Returns:
+        List of actions like {"index": 3, "type": "fill", "value": "Sample answer 1"}
+    """
+    actions = []
+    text_count = 0
+    textarea_count = 0
+    clicked_groups = set()
+    checkbox_done = False
+
+    for field in snapshot:
+        kind = field["kind"]
+        if kind == "input":
+            text_count += 1
+            actions.append({"index": field["index"], "type": "fill", "value": f"Sample answer {text_count}"})
+        elif kind == "textarea":
+            textarea_count += 1
+            actions.append({"index": field["index"], "type": "fill", "value": f"Longer sample answer {textarea_count}"})
+        elif kind == "radio":
+            # Click the first radio button in each radio group
+            group = field["group"] if field["group"] is not None else field["label"] or field["index"]
+            if group in clicked_groups:
+                continue
+            clicked_groups.add(group)
+            actions.append({"index": field["index"], "type": "click"})
+        elif kind == "checkbox" and not checkbox_done:
+            # Check only the first checkbox found
+            checkbox_done = True
+            actions.append({"index": field["index"], "type": "click"})
+
+    return actions
+
+
+def fill_form_fields(driver) -> None:
+    """
+    Fill the whole page with two WebDriver commands instead of one per field.
+
+    Fields that reject the synthetic events are retried with normal
+    WebDriver typing and clicking.
+    """
+    snapshot = driver.execute_script(SNAPSHOT_SCRIPT, FIELD_SELECTOR)
+    actions = plan_form_actions(snapshot)
+    if not actions:
+        return
+
+    rejected = set(driver.execute_async_script(APPLY_SCRIPT, actions, SETTLE_MS))
+
+    # Per-field fallback only for widgets that ignored the synthetic events
+    for action in actions:
+        if action["index"] not in rejected:
+            continue
+        try:
+            el = driver.find_element(By.CSS_SELECTOR, f"[data-autofill-index='{action['index']}']")
+            if action["type"] == "fill":
+                if el.get_attribute("value") != action["value"]:
+                    el.clear()
+                    el.send_keys(action["value"])
+            elif not is_checked(el):
+                # Read again first: clicking a box that has caught up by now would uncheck it
+                el.click()
+        except Exception:
+            pass
 
-def open_form_and_submit(url: str) -> None:
-    chrome_options = Options()
-    chrome_options.add_argument("--start-maximized")
 
-    # Launch Chrome (uses system Chrome; ensure it's installed)
-    driver = webdriver.Chrome(options=chrome_options)
+def open_form_and_submit(url: str, headless: bool = True) -> None:
+    # A warm browser from browser_service.py if it runs, else a lean new one
+    # (uses system Chrome; ensure it's installed). A visible window is always new.
+    browser = lease_browser() if headless else None
+    driver = browser.driver if browser else create_driver(headless=False)
+    broken = True
 
     try:
         driver.get(url)
 
         wait = WebDriverWait(driver, 20)
 
-        # Try to find text inputs and fill placeholder answers
-        text_inputs = driver.find_elements(By.CSS_SELECTOR, "input[type='text']")
-        for idx, el in enumerate(text_inputs, start=1):
-            try:
-                el.clear()
-                el.send_keys(f"Sample answer {idx}")
-            except Exception:
-                pass
-
-        # Try to fill textareas
-        textareas = driver.find_elements(By.CSS_SELECTOR, "textarea")
-        for idx, el in enumerate(textareas, start=1):
-            try:
-                el.clear()
-                el.send_keys(f"Longer sample answer {idx}")
-            except Exception:
-                pass
-
-        # Try to click first radio button in each radio group
-        radios = driver.find_elements(By.CSS_SELECTOR, "div[role='radio']")
-        clicked = set()
-        for r in radios:
-            try:
-                name = r.get_attribute("aria-label") or r.get_attribute("data-value") or str(id(r))
-                if name in clicked:
-                    continue
-                r.click()
-                clicked.add(name)
-            except Exception:
-                pass
-
-        # Try to check first checkbox found (if any)
-        checkboxes = driver.find_elements(By.CSS_SELECTOR, "div[role='checkbox']")
-        for c in checkboxes[:1]:
-            try:
-                c.click()
-            except Exception:
-                pass
+        # Fill text inputs, textareas, radio groups and the first checkbox in one go
+        fill_form_fields(driver)
 
         # Try to click Submit button
         try:
@@ -83,16 +197,22 @@ def open_form_and_submit(url: str) -> None:
                     pass
 
         time.sleep(3)
+        broken = False
     finally:
-        driver.quit()
+        if browser:
+            browser.release(broken=broken)
+        else:
+            driver.quit()
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python automate_form.py <google_forms_url>")
+    args = [a for a in sys.argv[1:] if a != "--show"]
+    if not args:
+        print("Usage: python automate_form.py <google_forms_url> [--show]")
         print("Example: python automate_form.py https://forms.gle/yourFormId")
+        print("--show opens a visible browser window instead of running headless")
         sys.exit(1)
-    open_form_and_submit(sys.argv[1])
+    open_form_and_submit(args[0], headless="--show" not in sys.argv)
 
 
 if __name__ == "__main__":
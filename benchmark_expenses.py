@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Benchmark the expense pipeline against a local fake of Google Sheets.
+
+Measures the load, add, delete and clear paths of google_sheets_helper.py
+(and the first render of expenses_list.py) on synthetic sheets of different
+sizes, and prints p50/p99 latency plus how many API calls each operation made.
+
+Examples:
+    python benchmark_expenses.py
+    python benchmark_expenses.py --sizes 10 1000 100000 --latency 0.05 --repeat 20
+    python benchmark_expenses.py --error-rate 0.05 --json results.json
+    python benchmark_expenses.py --sizes 100 --calls-per-minute 60 --requests-per-minute 55
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from collections import Counter
+
+import fake_sheets
+import google_sheets_helper
+import sheets_scheduler
+
+SPREADSHEET_ID = "benchmark-sheet"
+HEADER = ['Date', 'Item', 'Amount', 'Category', 'Timestamp']
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def seed_sheet(fake, rows):
+    """Replace Sheet1 with a header row plus the given rows."""
+    sheet = fake.rows('Sheet1')
+    sheet.clear()
+    sheet.append(list(HEADER))
+    sheet.extend(list(row) for row in rows)
+
+
+def measure(fake, name, func, repeat, setup=None):
+    """
+    Run func repeat times and collect latency, API calls and failures.
+
+    Returns:
+        Dictionary with p50/p99 (ms), API calls per run and failure count
+    """
+    samples = []
+    calls = Counter()
+    failures = 0
+    for _ in range(repeat):
+        if setup:
+            setup()
+        fake.reset_counters()
+        start = time.perf_counter()
+        success, _ = func()
+        samples.append(time.perf_counter() - start)
+        calls.update(fake.calls)
+        if not success:
+            failures += 1
+    return {
+        'operation': name,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'api_calls': sum(calls.values()) / repeat,
+        'calls_by_type': {op: count / repeat for op, count in sorted(calls.items())},
+        'failures': failures,
+    }
+
+
+def bench_helpers(fake, size, repeat):
+    """Benchmark the four Google Sheets operations on a sheet with size rows."""
+    rows = fake_sheets.make_expense_rows(size)
+    seed_sheet(fake, rows)
+    results = []
+
+    results.append(measure(fake, 'load', lambda: google_sheets_helper.load_expenses_from_sheet(SPREADSHEET_ID), repeat))
+
+    def add():
+        # Same two steps the app runs for every new expense
+        google_sheets_helper.setup_sheet_headers(SPREADSHEET_ID)
+        return google_sheets_helper.append_expense_to_sheet(SPREADSHEET_ID, {
+            'Date': '2030-01-01', 'Item': 'Benchmark', 'Amount': 1.5,
+            'Category': 'Other', 'Timestamp': '2030-01-01T00:00:00.000',
+        })
+    results.append(measure(fake, 'add', add, repeat, setup=lambda: seed_sheet(fake, rows)))
+
+    # Delete the row in the middle of the sheet (worst realistic case for the scan)
+    target = rows[size // 2] if rows else HEADER
+
+    def delete():
+        return google_sheets_helper.delete_expense_from_sheet(SPREADSHEET_ID, {
+            'Date': target[0], 'Item': target[1], 'Amount': target[2],
+            'Category': target[3], 'Timestamp': target[4],
+        })
+    results.append(measure(fake, 'delete', delete, repeat, setup=lambda: seed_sheet(fake, rows)))
+
+    results.append(measure(fake, 'clear', lambda: google_sheets_helper.clear_all_expenses_from_sheet(SPREADSHEET_ID),
+                           repeat, setup=lambda: seed_sheet(fake, rows)))
+    return results
+
+
+def bench_render(fake, size, repeat):
+    """
+    Time a cold first render of expenses_list.py (including the initial load).
+
+    Uses Streamlit's headless AppTest runner, so no browser is needed.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    seed_sheet(fake, fake_sheets.make_expense_rows(size))
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "expenses_list.py")
+    samples = []
+    calls = Counter()
+    for _ in range(repeat):
+        app = AppTest.from_file(script, default_timeout=600)
+        app.secrets["GOOGLE_SHEET_ID"] = SPREADSHEET_ID
+        fake.reset_counters()
+        start = time.perf_counter()
+        app.run()
+        samples.append(time.perf_counter() - start)
+        calls.update(fake.calls)
+    return {
+        'operation': 'render',
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'api_calls': sum(calls.values()) / repeat,
+        'calls_by_type': {op: count / repeat for op, count in sorted(calls.items())},
+        'failures': 0,
+    }
+
+
+def print_table(size, results):
+    print(f"\n=== {size} rows ===")
+    print(f"{'operation':<10} {'p50 ms':>10} {'p99 ms':>10} {'calls':>7} {'failed':>7}  calls by type")
+    for r in results:
+        by_type = ", ".join(f"{op}={count:g}" for op, count in r['calls_by_type'].items())
+        print(f"{r['operation']:<10} {r['p50_ms']:>10.2f} {r['p99_ms']:>10.2f} {r['api_calls']:>7.1f} {r['failures']:>7}  {by_type}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the expense pipeline against a local fake of Google Sheets.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000],
+                        help="Number of expense rows in the synthetic sheets")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per operation (default: 10)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per API call (default: 0)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random seconds per API call (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Chance of a 429 quota error per call (default: 0)")
+    parser.add_argument("--calls-per-minute", type=int, default=None, help="Simulated per-minute quota")
+    parser.add_argument("--requests-per-minute", type=int, default=1000000,
+                        help="Rate limit of the app's Sheets scheduler (default: practically unlimited)")
+    parser.add_argument("--render-max-rows", type=int, default=1000,
+                        help="Also time expenses_list.py rendering for sheets up to this size (0 = skip)")
+    parser.add_argument("--json", help="Also write all results to this JSON file")
+    args = parser.parse_args()
+
+    fake = fake_sheets.FakeSheetsService(
+        latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, calls_per_minute=args.calls_per_minute,
+    )
+    sheets_scheduler.configure(requests_per_minute=args.requests_per_minute, burst=max(1, args.requests_per_minute // 6),
+                               base_delay=0.05, max_delay=1.0)
+    # Every helper asks this function for its client, so they all talk to the fake
+    google_sheets_helper.get_google_sheets_service = lambda: fake
+
+    all_results = {}
+    for size in args.sizes:
+        results = bench_helpers(fake, size, args.repeat)
+        if size <= args.render_max_rows:
+            results.append(bench_render(fake, size, max(1, args.repeat // 5)))
+        print_table(size, results)
+        all_results[size] = results
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(all_results, f, indent=2)
+        print(f"\nResults saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Replay saved career pages through job_scraper's extraction, with no browser.
+
+For every page in the corpus this measures pages per second, elements visited
+and peak memory, and checks the findings against a golden file so a faster
+extraction can't silently find fewer jobs.
+
+The corpus is every NAME.html / NAME.golden.txt pair in the scraper_corpus
+folder. The live scraper writes page_source.html and scraped_jobs.txt, so those
+are never used as golden files: a real run can't change what "correct" means.
+
+Examples:
+    python benchmark_scraper.py
+    python benchmark_scraper.py --repeat 200
+    python benchmark_scraper.py --update-golden   # after an intended change
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+import job_scraper
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def find_corpus(corpus_dir):
+    """
+    List the (html_path, golden_path) pairs to replay.
+
+    A page without a golden file is still benchmarked, just not checked.
+    """
+    pages = []
+    for html_path in sorted(glob.glob(os.path.join(corpus_dir, "*.html"))):
+        golden_path = html_path[:-len(".html")] + ".golden.txt"
+        pages.append((html_path, golden_path))
+    return [(h, g) for h, g in pages if os.path.exists(h)]
+
+
+def bench_page(html, repeat):
+    """
+    Extract jobs from one page repeat times.
+
+    Returns:
+        Tuple of (result, pages_per_second, peak_memory_bytes)
+    """
+    # Peak memory of a single extraction
+    tracemalloc.start()
+    result = job_scraper.extract_jobs_from_html(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        job_scraper.extract_jobs_from_html(html)
+    elapsed = time.perf_counter() - start
+    return result, repeat / elapsed if elapsed else float('inf'), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark job_scraper extraction on saved pages.")
+    parser.add_argument("--corpus", default=os.path.join(HERE, "scraper_corpus"),
+                        help="Folder with NAME.html / NAME.golden.txt pairs")
+    parser.add_argument("--repeat", type=int, default=50, help="Extractions per page for the speed test (default: 50)")
+    parser.add_argument("--update-golden", action="store_true", help="Overwrite golden files with the current findings")
+    args = parser.parse_args()
+
+    pages = find_corpus(args.corpus)
+    if not pages:
+        print("No saved pages found.")
+        sys.exit(1)
+
+    total_pages = 0
+    total_time = 0.0
+    failed = False
+
+    print(f"{'page':<30} {'pages/s':>9} {'elements':>9} {'peak MB':>8} {'found':>6} {'recall':>7}")
+    for html_path, golden_path in pages:
+        with open(html_path, "r", encoding="utf-8") as f:
+            html = f.read()
+        result, pages_per_second, peak = bench_page(html, args.repeat)
+        findings = result['findings']
+        total_pages += args.repeat
+        total_time += args.repeat / pages_per_second
+
+        recall_text = "-"
+        if args.update_golden:
+            job_scraper.write_findings(golden_path, result['title'], job_scraper.JOB_URL, findings)
+            recall_text = "saved"
+        elif os.path.exists(golden_path):
+            golden = set(job_scraper.read_findings(golden_path))
+            missing = golden - set(findings)
+            recall = 1.0 if not golden else (len(golden) - len(missing)) / len(golden)
+            recall_text = f"{recall:.0%}"
+            if missing:
+                failed = True
+
+        name = os.path.basename(html_path)
+        print(f"{name:<30} {pages_per_second:>9.1f} {result['elements_visited']:>9} "
+              f"{peak / 1024 / 1024:>8.2f} {len(findings):>6} {recall_text:>7}")
+
+        if not args.update_golden and os.path.exists(golden_path):
+            for finding in sorted(golden - set(findings)):
+                print(f"   ❌ missing: {finding}")
+            for finding in sorted(set(findings) - golden):
+                print(f"   ➕ new: {finding}")
+
+    print(f"\nOverall: {total_pages / total_time:.1f} pages/s over {len(pages)} page(s)")
+    if failed:
+        print("❌ Some golden findings were not extracted.")
+        sys.exit(1)
+    print("✅ All golden findings extracted.")
+
+
+if __name__ == "__main__":
+    main()
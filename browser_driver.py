@@ -0,0 +1,103 @@
+"""
+Lean Chrome for the Selenium tools (job_scraper.py, automate_form.py).
+
+The scripts only read HTML and fill in fields, so the browser doesn't need to
+show a window or download images, fonts, video or trackers. Skipping those
+makes pages load faster and uses less memory and bandwidth per run.
+
+Example:
+    from browser_driver import create_driver
+    driver = create_driver()              # headless, nothing extra downloaded
+    driver = create_driver(headless=False) # watch what it does
+"""
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+WINDOW_SIZE = (1280, 800)
+
+# Requests the browser never makes (Chrome's wildcard URL patterns).
+# Stylesheets are kept: without them Selenium can think buttons are hidden.
+BLOCKED_URL_PATTERNS = [
+    # Images, fonts and media
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3", "*.ogg", "*.wav", "*.m4a",
+    # Analytics, ads and trackers
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*facebook.net*", "*connect.facebook.com*",
+    "*hotjar.com*", "*segment.io*", "*segment.com*", "*mixpanel.com*",
+    "*fullstory.com*", "*intercom.io*", "*newrelic.com*", "*nr-data.net*",
+    "*sentry.io*", "*clarity.ms*", "*linkedin.com/px*", "*bat.bing.com*",
+]
+
+# Chrome content settings: 2 = block
+BLOCKED_CONTENT_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.media_stream": 2,
+    "profile.default_content_setting_values.notifications": 2,
+    "profile.default_content_setting_values.geolocation": 2,
+}
+
+
+def lean_options(headless=True, window_size=WINDOW_SIZE, block_resources=True):
+    """
+    Chrome options for a small, quiet browser.
+
+    Args:
+        headless: Run without a window
+        window_size: (width, height) of the page; small pages render faster
+        block_resources: Don't load images and media at all
+
+    Returns:
+        selenium ChromeOptions
+    """
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument(f"--window-size={window_size[0]},{window_size[1]}")
+    for argument in ("--disable-extensions", "--disable-gpu", "--disable-dev-shm-usage",
+                     "--disable-background-networking", "--disable-default-apps",
+                     "--disable-sync", "--no-first-run", "--mute-audio"):
+        options.add_argument(argument)
+    if block_resources:
+        options.add_experimental_option("prefs", BLOCKED_CONTENT_PREFS)
+        options.add_argument("--blink-settings=imagesEnabled=false")
+    # Hand the page over once the HTML is parsed, not after every image and iframe
+    options.page_load_strategy = "eager"
+    return options
+
+
+def block_requests(driver, patterns=BLOCKED_URL_PATTERNS):
+    """
+    Make the browser drop requests to matching URLs (fonts, media, trackers...).
+
+    Uses the Chrome DevTools protocol; does nothing on other browsers.
+
+    Returns:
+        True if blocking is active
+    """
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+        return True
+    except Exception:
+        return False
+
+
+def create_driver(headless=True, window_size=WINDOW_SIZE, block_resources=True):
+    """
+    Start a lean Chrome (see lean_options) with resource blocking switched on.
+
+    Args:
+        headless: Run without a window
+        window_size: (width, height) of the page
+        block_resources: Skip images, fonts, media and trackers
+
+    Returns:
+        selenium Chrome WebDriver; call driver.quit() when done
+    """
+    driver = webdriver.Chrome(options=lean_options(headless, window_size, block_resources))
+    if block_resources:
+        block_requests(driver)
+    return driver
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Keep a few Chrome browsers running, so scraper and form runs don't start one each time.
+
+Starting Chrome and its driver takes 2-4 s. This service starts a small pool
+once (lean and headless, see browser_driver.py) and lends the browsers out:
+
+    python browser_service.py               # keep it running (port 9517)
+
+    from browser_service import lease_browser
+    with lease_browser() as driver:        # milliseconds when the service runs
+        driver.get("https://example.com")
+
+Each browser has its own profile, so runs don't share cookies, and it is
+wiped (cookies, storage, open page) when it is given back. A browser is
+replaced:
+    - after serving `max_pages` leases (Chrome slowly grows in memory)
+    - when a health check finds it crashed or hanging
+    - when a lease isn't given back within `lease_timeout` seconds; the late
+      client's session is ended and its release is refused
+
+If the service isn't running, lease_browser() starts a browser just for this
+run and quits it afterwards, like before.
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 9517
+SERVICE_URL = f"http://127.0.0.1:{DEFAULT_PORT}"
+
+
+class BrowserSlot:
+    """One pooled browser and its bookkeeping."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.leases = 0        # Leases served since it was started
+        self.lease_id = None   # Who has it now (None = free)
+        self.leased_at = 0.0
+
+
+class BrowserPool:
+    """
+    A fixed number of warm browsers that can be leased one at a time.
+
+    Args:
+        size: Number of browsers kept running
+        max_pages: Leases a browser serves before it is replaced
+        lease_timeout: Seconds after which an unreturned browser is taken back
+        make_driver: Function that starts a browser (default: browser_driver.create_driver)
+    """
+
+    def __init__(self, size=2, max_pages=50, lease_timeout=300, make_driver=None):
+        if make_driver is None:
+            from browser_driver import create_driver
+            make_driver = create_driver
+        self.size = size
+        self.max_pages = max_pages
+        self.lease_timeout = lease_timeout
+        self.make_driver = make_driver
+        self.slots = []
+        self.restarts = 0
+        self.expired = deque(maxlen=1000)  # Lease ids that were taken back
+        self.condition = threading.Condition()
+
+    def start(self):
+        """Start the browsers (so the first lease is already warm)."""
+        for _ in range(self.size):
+            slot = BrowserSlot(self.make_driver())
+            with self.condition:
+                self.slots.append(slot)
+                self.condition.notify()
+
+    def is_healthy(self, slot):
+        try:
+            return slot.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def restart(self, slot):
+        """Replace a slot's browser with a fresh one."""
+        try:
+            slot.driver.quit()
+        except Exception:
+            pass  # It may already be gone
+        slot.driver = self.make_driver()
+        slot.leases = 0
+        self.restarts += 1
+
+    def visited_origins(self, driver):
+        """
+        Origins the browser has data for: the pages each tab visited, and the
+        sites that set cookies (iframes and redirects don't show up in history).
+        """
+        origins = set()
+        for handle in driver.window_handles:
+            driver.switch_to.window(handle)
+            history = driver.execute_cdp_cmd("Page.getNavigationHistory", {})
+            for entry in history.get("entries", []):
+                url = urllib.parse.urlsplit(entry.get("url", ""))
+                if url.scheme in ("http", "https") and url.netloc:
+                    origins.add(f"{url.scheme}://{url.netloc}")
+        for cookie in driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", []):
+            domain = cookie.get("domain", "").lstrip(".")
+            if domain:
+                origins.update({f"https://{domain}", f"http://{domain}"})
+        return origins
+
+    def reset(self, slot):
+        """Wipe what the last run left behind, so the next one starts clean."""
+        try:
+            driver = slot.driver
+            # Storage can only be cleared one origin at a time
+            for origin in self.visited_origins(driver):
+                driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            # Close extra tabs and leave the last one on a blank page
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            driver.get("about:blank")
+            return True
+        except Exception:
+            return False
+
+    def lease(self, wait=30):
+        """
+        Take a free, healthy browser.
+
+        Args:
+            wait: Seconds to wait for one to become free
+
+        Returns:
+            (lease_id, slot), or (None, None) if none became free in time
+        """
+        deadline = time.time() + wait
+        while True:
+            self._take_back_expired()
+            with self.condition:
+                slot = next((s for s in self.slots if s.lease_id is None), None)
+                if slot is not None:
+                    slot.lease_id = uuid.uuid4().hex
+                    slot.leased_at = time.time()
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None, None
+                self.condition.wait(min(remaining, 1.0))
+        # Checked outside the lock: a restart takes seconds
+        try:
+            if slot.leases >= self.max_pages or not self.is_healthy(slot):
+                self.restart(slot)
+        except Exception:
+            with self.condition:
+                slot.lease_id = None
+                self.condition.notify()
+            raise
+        slot.leases += 1
+        return slot.lease_id, slot
+
+    def release(self, lease_id, broken=False):
+        """
+        Give a browser back.
+
+        Args:
+            lease_id: From lease()
+            broken: The run saw the browser misbehave; replace it
+
+        Returns:
+            True if the lease was known; False for unknown or expired leases
+        """
+        with self.condition:
+            if lease_id in self.expired or lease_id in ("health-check", "expired"):
+                return False
+            slot = next((s for s in self.slots if s.lease_id == lease_id), None)
+        if slot is None:
+            return False
+        if broken or not self.reset(slot):
+            self.restart(slot)
+        with self.condition:
+            slot.lease_id = None
+            self.condition.notify()
+        return True
+
+    def is_expired(self, lease_id):
+        with self.condition:
+            return lease_id in self.expired
+
+    def _take_back_expired(self):
+        """
+        Take back browsers whose lease ran out. The client may still be using
+        one, so it is restarted (which ends that client's session) before
+        anyone else gets it, and its late release() is refused.
+        """
+        with self.condition:
+            now = time.time()
+            late = [s for s in self.slots
+                    if s.lease_id not in (None, "health-check", "expired") and now - s.leased_at > self.lease_timeout]
+            for slot in late:
+                self.expired.append(slot.lease_id)
+                slot.lease_id = "expired"  # Nobody can lease it while it restarts
+        for slot in late:
+            try:
+                self.restart(slot)
+            except Exception as e:
+                print(f"⚠️ Could not restart a browser: {e}")
+                slot.leases = self.max_pages  # Try again on its next lease
+            with self.condition:
+                slot.lease_id = None
+                self.condition.notify()
+
+    def check_idle(self):
+        """Restart free browsers that crashed, so the next lease doesn't wait for it."""
+        self._take_back_expired()
+        with self.condition:
+            idle = [s for s in self.slots if s.lease_id is None]
+            for slot in idle:
+                slot.lease_id = "health-check"
+        for slot in idle:
+            if slot.leases >= self.max_pages or not self.is_healthy(slot):
+                try:
+                    self.restart(slot)
+                except Exception as e:
+                    print(f"⚠️ Could not restart a browser: {e}")
+            with self.condition:
+                slot.lease_id = None
+                self.condition.notify()
+
+    def status(self):
+        with self.condition:
+            return {
+                "size": len(self.slots),
+                "leased": sum(1 for s in self.slots if s.lease_id is not None),
+                "restarts": self.restarts,
+                "leases": [s.leases for s in self.slots],
+            }
+
+    def close(self):
+        with self.condition:
+            slots, self.slots = self.slots, []
+        for slot in slots:
+            try:
+                slot.driver.quit()
+            except Exception:
+                pass
+
+
+def make_handler(pool):
+    class BrowserServiceHandler(BaseHTTPRequestHandler):
+        def send_json(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def read_json(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            if self.path == "/health":
+                self.send_json(200, pool.status())
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            try:
+                request = self.read_json()
+            except ValueError:
+                self.send_error(400, "Expected JSON")
+                return
+            if self.path == "/lease":
+                try:
+                    lease_id, slot = pool.lease(float(request.get("wait", 30)))
+                except Exception as e:
+                    self.send_json(503, {"error": f"Could not start a browser: {e}"})
+                    return
+                if lease_id is None:
+                    self.send_json(503, {"error": "No browser became free in time"})
+                    return
+                # The client talks to the browser's own driver directly
+                self.send_json(200, {
+                    "lease_id": lease_id,
+                    "executor_url": slot.driver.service.service_url,
+                    "session_id": slot.driver.session_id,
+                })
+            elif self.path == "/release":
+                lease_id = request.get("lease_id")
+                if pool.is_expired(lease_id):
+                    # Its browser was already restarted and may be someone else's now
+                    self.send_json(410, {"released": False, "error": "Lease expired"})
+                    return
+                known = pool.release(lease_id, bool(request.get("broken")))
+                self.send_json(200 if known else 404, {"released": known})
+            else:
+                self.send_error(404)
+
+        def log_message(self, format, *args):
+            pass  # Keep the terminal quiet
+
+    return BrowserServiceHandler
+
+
+def serve(pool, port=DEFAULT_PORT, host="127.0.0.1", check_every=30):
+    """Run the service until Ctrl+C. Listens on localhost only: a lease controls a browser."""
+    server = ThreadingHTTPServer((host, port), make_handler(pool))
+
+    def health_checks():
+        while True:
+            time.sleep(check_every)
+            pool.check_idle()
+
+    threading.Thread(target=health_checks, daemon=True).start()
+    print(f"🌐 Browser service with {len(pool.slots)} browsers on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.close()
+
+
+# --- Client -----------------------------------------------------------------
+
+def _post(url, body, timeout):
+    request = urllib.request.Request(url, data=json.dumps(body).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def attach_driver(executor_url, session_id):
+    """A WebDriver for a browser session someone else started."""
+    from selenium import webdriver
+
+    class AttachedDriver(webdriver.Remote):
+        def start_session(self, capabilities):
+            # Use the running session instead of opening a new browser
+            self.session_id = session_id
+            self.caps = {}
+
+    return AttachedDriver(command_executor=executor_url, options=webdriver.ChromeOptions())
+
+
+class LeasedBrowser:
+    """
+    A browser from the service (or a fresh local one if the service isn't running).
+
+    Use as `with lease_browser() as driver:`, or call release() yourself.
+    """
+
+    def __init__(self, service_url=SERVICE_URL, wait=30):
+        self.service_url = service_url
+        self.lease_id = None
+        try:
+            lease = _post(f"{service_url}/lease", {"wait": wait}, timeout=wait + 5)
+            self.lease_id = lease["lease_id"]
+            self.driver = attach_driver(lease["executor_url"], lease["session_id"])
+        except Exception:
+            if self.lease_id is not None:
+                self.release(broken=True)
+            # No service: start a browser just for this run
+            from browser_driver import create_driver
+            self.lease_id = None
+            self.driver = create_driver()
+
+    @property
+    def pooled(self):
+        return self.lease_id is not None
+
+    def release(self, broken=False):
+        """Give the browser back (or quit it, if it was started just for this run)."""
+        if self.lease_id is None:
+            if getattr(self, "driver", None) is not None:
+                self.driver.quit()
+                self.driver = None
+            return
+        try:
+            _post(f"{self.service_url}/release", {"lease_id": self.lease_id, "broken": broken}, timeout=60)
+        except Exception:
+            pass  # The service takes it back after its lease timeout
+        self.lease_id = None
+        self.driver = None
+
+    def __enter__(self):
+        return self.driver
+
+    def __exit__(self, exc_type, exc, tb):
+        # An exception may have left the browser in a bad state
+        self.release(broken=exc_type is not None)
+        return False
+
+
+def lease_browser(service_url=SERVICE_URL, wait=30):
+    """Borrow a warm browser from the service; see LeasedBrowser."""
+    return LeasedBrowser(service_url, wait)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep warm Chrome browsers for the Selenium tools.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--browsers", type=int, default=2, help="Browsers kept running (default: 2)")
+    parser.add_argument("--max-pages", type=int, default=50, help="Leases before a browser is replaced (default: 50)")
+    parser.add_argument("--lease-timeout", type=int, default=300, help="Seconds before an unreturned browser is taken back")
+    parser.add_argument("--show", action="store_true", help="Visible browser windows instead of headless")
+    args = parser.parse_args()
+
+    from browser_driver import create_driver
+    pool = BrowserPool(args.browsers, args.max_pages, args.lease_timeout,
+                       make_driver=lambda: create_driver(headless=not args.show))
+    print("Starting browsers...")
+    pool.start()
+    serve(pool, args.port)
+
+
+if __name__ == "__main__":
+    main()
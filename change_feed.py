@@ -0,0 +1,68 @@
+"""
+In-process feed of expense changes, so open sessions stay in sync.
+
+Every add, delete or clear is published as a numbered event. Each session
+remembers the number of the last event it applied and, on its next rerun,
+applies only the newer ones to its own list - no reload from storage.
+
+The feed lives in memory and is shared by the sessions of one Streamlit
+process (through st.cache_resource). Changes made by another process or
+directly in the sheet are not seen; those still need a reload.
+
+Example:
+    feed = ChangeFeed()
+    feed.publish("add", [expense], origin="session-a")
+    version, events = feed.changes_since(0)   # -> 1, [Change(1, "add", [...], "session-a")]
+"""
+
+import threading
+from collections import deque, namedtuple
+
+# kind is "add", "delete" or "clear"; expenses are the added or deleted rows
+Change = namedtuple("Change", ["version", "kind", "expenses", "origin"])
+
+# Events kept in memory; a session further behind reloads everything instead
+MAX_EVENTS = 1000
+
+
+class ChangeFeed:
+    """Numbered list of recent changes, safe to use from several sessions at once."""
+
+    def __init__(self, max_events=MAX_EVENTS):
+        self.events = deque(maxlen=max_events)
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def publish(self, kind, expenses=(), origin=None):
+        """
+        Record a change.
+
+        Args:
+            kind: "add", "delete" or "clear"
+            expenses: The added or deleted expenses (empty for "clear")
+            origin: Who made the change, so it can skip its own events
+
+        Returns:
+            The version number of the change
+        """
+        with self.lock:
+            self.version += 1
+            # Copies: later edits to the session's dictionaries must not change the event
+            self.events.append(Change(self.version, kind, [dict(e) for e in expenses], origin))
+            return self.version
+
+    def changes_since(self, version):
+        """
+        Changes after the given version.
+
+        Returns:
+            (latest version, list of changes), or (latest version, None) if some
+            of the changes were already dropped and the caller must reload
+        """
+        with self.lock:
+            if version >= self.version:
+                return self.version, []
+            if not self.events or self.events[0].version > version + 1:
+                return self.version, None
+            skip = version + 1 - self.events[0].version
+            return self.version, list(self.events)[skip:]
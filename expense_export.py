@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Export the expense history to CSV or Parquet, streamed in chunks.
+
+Rows are read from the store `chunk_size` at a time and written out right
+away, so memory stays the same for one month or ten years of data:
+    - CSV: one block of text per chunk
+    - Parquet: one row group per chunk (needs pyarrow)
+
+Three ways to use it:
+    - CLI:      python expense_export.py expenses.csv --start 2024-01-01 --category Groceries
+    - Streamlit: st.download_button(data=lambda: export_bytes(...)) builds the file on click
+    - HTTP:     start_export_server(store, port) serves /export.csv and /export.parquet,
+                which start downloading while the rest is still being read
+"""
+
+import argparse
+import csv
+import io
+import sys
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+COLUMNS = ["Date", "Item", "Amount", "Category", "Timestamp"]
+FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def iter_csv(chunks):
+    """Yield CSV bytes: the header, then one block per chunk of expenses."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for chunk in chunks:
+        for expense in chunk:
+            writer.writerow([expense["Date"], expense["Item"], f"{float(expense['Amount']):.2f}",
+                             expense["Category"], expense.get("Timestamp", "")])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    # Only the header if there were no rows
+    if buffer.getvalue():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _Drain(io.RawIOBase):
+    """Write-only file that hands out what was written since the last take()."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def iter_parquet(chunks):
+    """Yield Parquet bytes, one row group per chunk of expenses."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("Date", pa.string()),
+        ("Item", pa.string()),
+        ("Amount", pa.float64()),
+        ("Category", pa.string()),
+        ("Timestamp", pa.string()),
+    ])
+    sink = _Drain()
+    writer = pq.ParquetWriter(sink, schema)
+    for chunk in chunks:
+        table = pa.Table.from_pydict({
+            "Date": [e["Date"] for e in chunk],
+            "Item": [e["Item"] for e in chunk],
+            "Amount": [float(e["Amount"]) for e in chunk],
+            "Category": [e["Category"] for e in chunk],
+            "Timestamp": [e.get("Timestamp", "") for e in chunk],
+        }, schema=schema)
+        writer.write_table(table)
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+def iter_export(store, fmt="csv", start=None, end=None, categories=None, chunk_size=1000):
+    """Yield the bytes of an export file, produced while the store is read."""
+    chunks = store.iter_expenses(start, end, categories, chunk_size)
+    return iter_parquet(chunks) if fmt == "parquet" else iter_csv(chunks)
+
+
+def export_to_file(store, path, fmt="csv", start=None, end=None, categories=None, chunk_size=1000):
+    """
+    Write an export to a file.
+
+    Returns:
+        Number of bytes written
+    """
+    written = 0
+    with open(path, "wb") as f:
+        for data in iter_export(store, fmt, start, end, categories, chunk_size):
+            f.write(data)
+            written += len(data)
+    return written
+
+
+def export_bytes(store, fmt="csv", start=None, end=None, categories=None):
+    """The whole export as bytes (for st.download_button, which needs all of it)."""
+    return b"".join(iter_export(store, fmt, start, end, categories))
+
+
+def export_file_name(fmt, start=None, end=None):
+    span = f"_{start}_{end}" if start or end else ""
+    return f"expenses{span}.{fmt}"
+
+
+def parse_day(text):
+    return date.fromisoformat(text) if text else None
+
+
+# --- Streaming HTTP endpoint ------------------------------------------------
+
+def make_handler(store):
+    class ExportHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            fmt = url.path.rsplit(".", 1)[-1]
+            if not url.path.startswith("/export.") or fmt not in FORMATS:
+                self.send_error(404)
+                return
+            query = parse_qs(url.query)
+            try:
+                start = parse_day(query.get("start", [None])[0])
+                end = parse_day(query.get("end", [None])[0])
+            except ValueError:
+                self.send_error(400, "Dates must be YYYY-MM-DD")
+                return
+            categories = query.get("category") or None
+
+            self.send_response(200)
+            self.send_header("Content-Type", FORMATS[fmt])
+            self.send_header("Content-Disposition", f'attachment; filename="{export_file_name(fmt, start, end)}"')
+            # No Content-Length: the size isn't known yet, so the file is sent as
+            # it is produced and ends when the connection closes (HTTP/1.0)
+            self.end_headers()
+            for data in iter_export(store, fmt, start, end, categories):
+                self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass  # Keep the terminal quiet
+
+    return ExportHandler
+
+
+def start_export_server(store, port, host="127.0.0.1"):
+    """
+    Serve streaming exports at http://<host>:<port>/export.csv (or .parquet),
+    with optional ?start=YYYY-MM-DD&end=YYYY-MM-DD&category=... filters.
+
+    Listens on localhost only by default, since it hands out all expenses.
+
+    Returns:
+        True if the server is running, False if the port could not be used
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return True
+        try:
+            _server = ThreadingHTTPServer((host, port), make_handler(store))
+        except OSError:
+            return False
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return True
+
+
+def main():
+    from expense_storage import store_from_config
+
+    parser = argparse.ArgumentParser(description="Export expenses to CSV or Parquet.")
+    parser.add_argument("output", help="File to write; '-' for standard output (CSV only)")
+    parser.add_argument("--format", choices=list(FORMATS), help="Default: from the file extension, else csv")
+    parser.add_argument("--start", type=parse_day, help="First date, YYYY-MM-DD")
+    parser.add_argument("--end", type=parse_day, help="Last date, YYYY-MM-DD")
+    parser.add_argument("--category", action="append", help="Only this category (repeatable)")
+    parser.add_argument("--backend", choices=["sqlite", "parquet"], default="sqlite")
+    parser.add_argument("--path", help="Local database file (default: expenses.db / expenses.parquet)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Rows per chunk (default: 1000)")
+    args = parser.parse_args()
+
+    fmt = args.format or ("parquet" if args.output.endswith(".parquet") else "csv")
+    config = {"STORAGE_BACKEND": args.backend}
+    if args.path:
+        config["LOCAL_DB_PATH"] = args.path
+    store = store_from_config(config)
+
+    if args.output == "-":
+        for data in iter_export(store, "csv", args.start, args.end, args.category, args.chunk_size):
+            sys.stdout.buffer.write(data)
+        return
+    written = export_to_file(store, args.output, fmt, args.start, args.end, args.category, args.chunk_size)
+    print(f"✅ Wrote {written / 1024:.1f} KB to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Import expenses from bank exports (CSV or OFX) in bulk.
+
+The file is read as a stream, `chunk_size` transactions at a time, so even a
+large export never has to fit in memory. Every row is turned into the app's
+Date/Item/Amount/Category/Timestamp format, checked against a hash index of
+the expenses that already exist, and each chunk is written with one bulk call.
+
+Importing the same file twice adds nothing the second time. Two identical
+purchases on the same day (two coffees) are kept: a row is only a duplicate
+if the file has it more often than the existing data.
+
+Examples:
+    python expense_import.py statement.csv
+    python expense_import.py export.ofx --backend sqlite --path expenses.db
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import itertools
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+CATEGORIES = ["Groceries", "Restaurants", "Cafeteria", "Transportation", "Entertainment",
+              "Shopping", "Bills", "Donations", "Other"]
+
+# Column names banks use, lower case, for each field of an expense
+COLUMN_ALIASES = {
+    "Date": ["date", "booking date", "transaction date", "posted date", "value date", "datum", "buchungstag"],
+    "Item": ["item", "description", "payee", "name", "merchant", "details", "memo", "reference",
+             "verwendungszweck", "beguenstigter/zahlungspflichtiger"],
+    "Amount": ["amount", "value", "debit", "amount (eur)", "betrag"],
+    "Category": ["category", "kategorie"],
+}
+
+# End of the timestamps handed out by the last import in this process
+_last_timestamp = datetime.min
+_timestamp_lock = threading.Lock()
+
+DATE_FORMATS = ["%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%Y%m%d", "%d.%m.%y"]
+
+
+# --- Normalizing ------------------------------------------------------------
+
+def parse_amount(text):
+    """
+    Read an amount like "12.50", "-1.234,56", "€ -12,50", "EUR -5", "(12.50)" or "12.50-".
+
+    Returns None if there is no number.
+    """
+    # Drop currency symbols, codes and spaces, so the sign is next to the number
+    signed = re.sub(r"[^0-9.,()+-]", "", str(text))
+    negative = (signed.startswith("-") or signed.endswith("-")
+                or (signed.startswith("(") and signed.endswith(")")))
+    digits = re.sub(r"[^0-9.,]", "", signed)
+    if not digits:
+        return None
+    # The last separator is the decimal one if 1-2 digits follow it
+    last = max(digits.rfind("."), digits.rfind(","))
+    if last != -1 and len(digits) - last - 1 in (1, 2):
+        whole = re.sub(r"[.,]", "", digits[:last])
+        digits = f"{whole}.{digits[last + 1:]}"
+    else:
+        digits = re.sub(r"[.,]", "", digits)
+    try:
+        value = float(digits)
+    except ValueError:
+        return None
+    return -value if negative else value
+
+
+def parse_any_date(text, date_format=None):
+    """Read a date in any of DATE_FORMATS (or date_format) as "YYYY-MM-DD", or None."""
+    text = str(text).strip()[:10]
+    for fmt in [date_format] if date_format else DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def expense_fingerprint(expense):
+    """Hash of what makes two rows the same purchase: date, item and amount."""
+    key = f"{expense['Date']}|{' '.join(str(expense['Item']).lower().split())}|{float(expense['Amount']):.2f}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def find_columns(header):
+    """Map each expense field to the index of its column in a CSV header."""
+    lowered = [name.strip().lower() for name in header]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in lowered:
+                columns[field] = lowered.index(alias)
+                break
+    return columns
+
+
+# --- Readers ----------------------------------------------------------------
+
+def read_csv_transactions(stream, date_format=None):
+    """
+    Yield raw transactions {Date, Item, Amount, Category} from a CSV text stream.
+
+    The delimiter (comma, semicolon or tab) is detected from the first lines.
+    Rows without a readable date or amount are yielded as None, so they can be counted.
+    """
+    # Finish the line the sample ends in, so sample + rest is the whole file
+    sample = stream.read(4096)
+    sample += stream.readline()
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(itertools.chain(io.StringIO(sample), stream), dialect)
+
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = find_columns(header)
+    missing = [field for field in ("Date", "Item", "Amount") if field not in columns]
+    if missing:
+        raise ValueError(f"Could not find column(s) {', '.join(missing)} in header: {header}")
+
+    for row in reader:
+        if not row or all(not cell.strip() for cell in row):
+            continue
+        try:
+            day = parse_any_date(row[columns["Date"]], date_format)
+            amount = parse_amount(row[columns["Amount"]])
+            item = row[columns["Item"]].strip()
+            category = row[columns["Category"]].strip() if "Category" in columns else ""
+        except IndexError:
+            yield None
+            continue
+        if day is None or amount is None:
+            yield None
+            continue
+        yield {"Date": day, "Item": item or "(no description)", "Amount": amount, "Category": category}
+
+
+OFX_TAG = re.compile(r"<(/?)(\w+)>([^<]*)")
+
+
+def read_ofx_tags(stream, chunk_size=65536):
+    """
+    Yield (is_closing, TAG, text after it) for every tag of an OFX stream.
+
+    Works on tags, not lines: many banks write the whole SGML file on one line.
+    """
+    buffer = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer += chunk
+        # Keep the last tag for the next round: its text may go on in the next chunk
+        end = buffer.rfind("<") if chunk else len(buffer)
+        for closing, tag, value in OFX_TAG.findall(buffer, 0, end):
+            yield closing == "/", tag.upper(), value.strip()
+        buffer = buffer[end:]
+        if not chunk:
+            return
+
+
+def read_ofx_transactions(stream):
+    """
+    Yield raw transactions from an OFX/QFX text stream (SGML or XML flavour).
+
+    Only the fields the app needs are read: DTPOSTED, TRNAMT, NAME and MEMO.
+    """
+    def finish(fields):
+        day = parse_any_date(fields.get("DTPOSTED", "")[:8], "%Y%m%d")
+        amount = parse_amount(fields.get("TRNAMT", ""))
+        if day is None or amount is None:
+            return None
+        item = fields.get("NAME") or fields.get("MEMO") or "(no description)"
+        return {"Date": day, "Item": item, "Amount": amount, "Category": ""}
+
+    current = None
+    for closing, tag, value in read_ofx_tags(stream):
+        if tag == "STMTTRN":
+            if current is not None:
+                # The last one was never closed
+                yield finish(current)
+            current = None if closing else {}
+            if closing:
+                continue
+        elif current is not None and not closing and value:
+            current.setdefault(tag, value)
+    if current is not None:
+        yield finish(current)
+
+
+def read_transactions(stream, filename, date_format=None):
+    """Pick the reader from the file name."""
+    if filename.lower().endswith((".ofx", ".qfx")):
+        return read_ofx_transactions(stream)
+    return read_csv_transactions(stream, date_format)
+
+
+# --- Import -----------------------------------------------------------------
+
+def next_timestamp_block():
+    """Start time for a new import's timestamps: now, or after the last one issued."""
+    now = datetime.now()
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    with _timestamp_lock:
+        return max(now, _last_timestamp)
+
+
+def reserve_timestamps_until(end):
+    global _last_timestamp
+    with _timestamp_lock:
+        _last_timestamp = max(_last_timestamp, end)
+
+
+class ImportStopped(Exception):
+    """A bulk write failed; .stats tells what was saved before it."""
+
+    def __init__(self, message, stats):
+        super().__init__(message)
+        self.stats = stats
+
+
+class DuplicateIndex:
+    """
+    Counts of expense fingerprints, to recognise rows that were already imported.
+
+    Built once from the existing expenses: O(n) to build, O(1) per check.
+    """
+
+    def __init__(self, expenses=()):
+        self.existing = Counter(expense_fingerprint(e) for e in expenses)
+        self.seen = Counter()
+
+    def is_duplicate(self, expense):
+        """True if this row is already stored (as often as it has now been seen in the file)."""
+        fingerprint = expense_fingerprint(expense)
+        self.seen[fingerprint] += 1
+        return self.seen[fingerprint] <= self.existing[fingerprint]
+
+
+def import_transactions(transactions, store, existing=(), chunk_size=1000, spending="auto",
+                        categorize=None, on_progress=None):
+    """
+    Normalize, de-duplicate and bulk-write transactions.
+
+    Args:
+        transactions: Iterable of raw transactions from read_transactions()
+        store: Where to write, anything with add_many() (see expense_storage.py)
+        existing: Expenses already stored, for duplicate detection
+        chunk_size: Transactions per bulk write
+        spending: Which amounts are expenses: "negative" (bank statements),
+            "positive" (expense lists), or "auto" (negative if the file has any)
+        categorize: Optional function(items) -> categories, called once per chunk
+            for the rows without a valid category (e.g. a CategoryModel)
+        on_progress: Optional function(stats) called after every chunk
+
+    Returns:
+        Dictionary of stats: read, added, duplicates, income, invalid, and the
+        list of added expenses under "expenses"
+
+    Raises:
+        ImportStopped if a bulk write fails (earlier chunks stay saved)
+    """
+    stats = {"read": 0, "added": 0, "duplicates": 0, "income": 0, "invalid": 0, "expenses": []}
+    duplicates = DuplicateIndex(existing)
+    # Unique timestamps (used for precise deletes), one millisecond apart and
+    # never overlapping an import that is still running
+    base_time = next_timestamp_block()
+    chunk = []
+    pending = []  # Transactions kept until "auto" knows the sign of spending
+
+    def flush():
+        if not chunk:
+            return
+        uncategorized = [expense for expense in chunk if expense["Category"] is None]
+        if uncategorized:
+            guesses = categorize([e["Item"] for e in uncategorized]) if categorize else []
+            for expense, category in itertools.zip_longest(uncategorized, guesses):
+                expense["Category"] = category if category in CATEGORIES else "Other"
+        success, message = store.add_many(chunk)
+        if not success:
+            raise ImportStopped(f"{message} (after {stats['added']} expenses were saved)", stats)
+        stats["added"] += len(chunk)
+        stats["expenses"].extend(chunk)
+        chunk.clear()
+        if on_progress:
+            on_progress(stats)
+
+    def take(transaction):
+        spent = -transaction["Amount"] if sign == "negative" else transaction["Amount"]
+        if spent <= 0:
+            stats["income"] += 1
+            return
+        expense = dict(transaction, Amount=round(spent, 2))
+        if expense["Category"] not in CATEGORIES:
+            expense["Category"] = None  # Filled in for the whole chunk in flush()
+        if duplicates.is_duplicate(expense):
+            stats["duplicates"] += 1
+            return
+        expense["Timestamp"] = (base_time + timedelta(milliseconds=stats["added"] + len(chunk))).isoformat(
+            timespec="milliseconds")
+        reserve_timestamps_until(base_time + timedelta(milliseconds=stats["added"] + len(chunk) + 1))
+        chunk.append(expense)
+        if len(chunk) >= chunk_size:
+            flush()
+
+    sign = None if spending == "auto" else spending
+    for transaction in transactions:
+        stats["read"] += 1
+        if transaction is None:
+            stats["invalid"] += 1
+            continue
+        if sign is None:
+            # Decide from the first chunk whether spending is negative or positive
+            pending.append(transaction)
+            if transaction["Amount"] < 0:
+                sign = "negative"
+            elif len(pending) >= chunk_size:
+                sign = "positive"
+            if sign is None:
+                continue
+            for waiting in pending:
+                take(waiting)
+            pending.clear()
+            continue
+        take(transaction)
+
+    if pending:
+        sign = "positive"
+        for waiting in pending:
+            take(waiting)
+    flush()
+    return stats
+
+
+def import_file(stream, filename, store, existing=(), **options):
+    """
+    Import a CSV or OFX file from a text stream (see import_transactions for options).
+    """
+    date_format = options.pop("date_format", None)
+    return import_transactions(read_transactions(stream, filename, date_format), store, existing, **options)
+
+
+def main():
+    from expense_storage import store_from_config
+
+    parser = argparse.ArgumentParser(description="Import a CSV or OFX bank export into the expenses store.")
+    parser.add_argument("file", help="CSV, OFX or QFX file")
+    parser.add_argument("--backend", choices=["sqlite", "parquet"], default="sqlite")
+    parser.add_argument("--path", help="Local database file (default: expenses.db / expenses.parquet)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Rows per bulk write (default: 1000)")
+    parser.add_argument("--spending", choices=["auto", "negative", "positive"], default="auto",
+                        help="Which amounts are expenses (default: negative if the file has any)")
+    parser.add_argument("--date-format", help="strptime format of the date column, e.g. %%m/%%d/%%Y")
+    args = parser.parse_args()
+
+    config = {"STORAGE_BACKEND": args.backend}
+    if args.path:
+        config["LOCAL_DB_PATH"] = args.path
+    store = store_from_config(config)
+
+    # Existing rows, for duplicate detection
+    _, recent, older = store.load_recent()
+    existing = recent + (store.load_older(older)[1] if older else [])
+
+    start = time.perf_counter()
+    with open(args.file, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+        stats = import_file(
+            f, args.file, store, existing,
+            chunk_size=args.chunk_size, spending=args.spending, date_format=args.date_format,
+            on_progress=lambda s: print(f"   {s['read']} read, {s['added']} added", file=sys.stderr),
+        )
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ {stats['added']} added, {stats['duplicates']} duplicates, "
+          f"{stats['income']} income rows skipped, {stats['invalid']} unreadable "
+          f"({stats['read']} rows in {elapsed:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
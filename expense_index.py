@@ -0,0 +1,194 @@
+"""
+Time-bucket index of expenses for fast date-range questions.
+
+For every category it keeps the expense dates in sorted order together with a
+running (cumulative) total of the amounts. The total of any date range is then
+the difference of two running totals, found with binary search: O(log n)
+instead of scanning every expense.
+
+Example:
+    index = ExpenseIndex(st.session_state.expenses)
+    index.total(date(2024, 1, 1), date(2024, 3, 31), ["Groceries"])
+    index.buckets(start, end, "Monthly")
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, timedelta
+
+GRANULARITIES = ["Daily", "Weekly", "Monthly"]
+
+
+def parse_date(text):
+    """"YYYY-MM-DD" (or a longer ISO timestamp) to a date, or None if it can't be read."""
+    try:
+        return date.fromisoformat(str(text)[:10])
+    except ValueError:
+        return None
+
+
+class CategorySeries:
+    """Sorted day numbers and running totals for one category."""
+
+    def __init__(self):
+        self.days = []       # date.toordinal() of every expense, sorted
+        self.amounts = []    # amounts in the same order
+        self.running = [0.0]  # running[i] = sum of the first i amounts
+
+    def add(self, day, amount):
+        if not self.days or day >= self.days[-1]:
+            # New expenses are usually the latest ones: O(1)
+            self.days.append(day)
+            self.amounts.append(amount)
+            self.running.append(self.running[-1] + amount)
+            return
+        position = bisect_right(self.days, day)
+        self.days.insert(position, day)
+        self.amounts.insert(position, amount)
+        self._rebuild_from(position)
+
+    def add_many(self, pairs):
+        """Add many (day, amount) pairs with one sort and one pass over the running totals."""
+        pairs = sorted(pairs, key=lambda pair: pair[0])
+        if not pairs:
+            return
+        position = bisect_right(self.days, pairs[0][0])
+        # Sorting is stable, so equal days keep the older expenses first, like add()
+        merged = sorted(list(zip(self.days[position:], self.amounts[position:])) + pairs, key=lambda pair: pair[0])
+        del self.days[position:], self.amounts[position:]
+        self.days.extend(day for day, _ in merged)
+        self.amounts.extend(amount for _, amount in merged)
+        self._rebuild_from(position)
+
+    def remove(self, day, amount):
+        """Remove one expense with this day and amount. Returns False if there is none."""
+        position = bisect_left(self.days, day)
+        while position < len(self.days) and self.days[position] == day:
+            if abs(self.amounts[position] - amount) < 0.005:
+                del self.days[position]
+                del self.amounts[position]
+                self._rebuild_from(position)
+                return True
+            position += 1
+        return False
+
+    def _rebuild_from(self, position):
+        del self.running[position + 1:]
+        for amount in self.amounts[position:]:
+            self.running.append(self.running[-1] + amount)
+
+    def total(self, first_day, last_day):
+        """Sum and count of amounts with first_day <= day <= last_day."""
+        lo = bisect_left(self.days, first_day)
+        hi = bisect_right(self.days, last_day)
+        return self.running[hi] - self.running[lo], hi - lo
+
+
+class ExpenseIndex:
+    """Per-category running totals over time, kept up to date one expense at a time."""
+
+    def __init__(self, expenses=()):
+        self.series = {}
+        self.count = 0
+        self.skipped = 0  # Expenses whose date could not be read
+        self.add_many(expenses)
+
+    def add(self, expense):
+        day = parse_date(expense.get("Date"))
+        self.count += 1
+        if day is None:
+            self.skipped += 1
+            return
+        series = self.series.setdefault(expense.get("Category", "Other"), CategorySeries())
+        series.add(day.toordinal(), float(expense.get("Amount") or 0.0))
+
+    def add_many(self, expenses):
+        """Add a batch of expenses (an import, a reload): each category is sorted once."""
+        new = {}
+        for expense in expenses:
+            day = parse_date(expense.get("Date"))
+            self.count += 1
+            if day is None:
+                self.skipped += 1
+                continue
+            new.setdefault(expense.get("Category", "Other"), []).append(
+                (day.toordinal(), float(expense.get("Amount") or 0.0)))
+        for category, pairs in new.items():
+            self.series.setdefault(category, CategorySeries()).add_many(pairs)
+
+    def remove(self, expense):
+        day = parse_date(expense.get("Date"))
+        self.count -= 1
+        if day is None:
+            self.skipped -= 1
+            return
+        series = self.series.get(expense.get("Category", "Other"))
+        if series is not None:
+            series.remove(day.toordinal(), float(expense.get("Amount") or 0.0))
+
+    def categories(self):
+        return sorted(name for name, series in self.series.items() if series.days)
+
+    def date_range(self):
+        """(first date, last date) of all indexed expenses, or None if empty."""
+        firsts = [s.days[0] for s in self.series.values() if s.days]
+        lasts = [s.days[-1] for s in self.series.values() if s.days]
+        if not firsts:
+            return None
+        return date.fromordinal(min(firsts)), date.fromordinal(max(lasts))
+
+    def total(self, start, end, categories=None):
+        """Total amount spent from start to end (inclusive) in the given categories."""
+        return sum(amount for amount, _ in self.totals_by_category(start, end, categories).values())
+
+    def totals_by_category(self, start, end, categories=None):
+        """{category: (amount, count)} for start..end, skipping empty categories."""
+        names = self.categories() if categories is None else categories
+        result = {}
+        for name in names:
+            series = self.series.get(name)
+            if series is None:
+                continue
+            amount, count = series.total(start.toordinal(), end.toordinal())
+            if count:
+                result[name] = (amount, count)
+        return result
+
+    def buckets(self, start, end, granularity="Daily", categories=None):
+        """
+        Totals per day, week (starting Monday) or month between start and end.
+
+        Returns:
+            List of (bucket_start_date, {category: amount}) in date order
+        """
+        names = self.categories() if categories is None else categories
+        result = []
+        for bucket_start, bucket_end in bucket_bounds(start, end, granularity):
+            amounts = {}
+            for name in names:
+                series = self.series.get(name)
+                if series is not None:
+                    amount, count = series.total(bucket_start.toordinal(), bucket_end.toordinal())
+                    if count:
+                        amounts[name] = amount
+            result.append((bucket_start, amounts))
+        return result
+
+
+def bucket_bounds(start, end, granularity):
+    """(first_day, last_day) of every day/week/month bucket that touches start..end."""
+    if granularity == "Weekly":
+        current = start - timedelta(days=start.weekday())
+    elif granularity == "Monthly":
+        current = start.replace(day=1)
+    else:
+        current = start
+
+    while current <= end:
+        if granularity == "Weekly":
+            following = current + timedelta(days=7)
+        elif granularity == "Monthly":
+            following = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            following = current + timedelta(days=1)
+        yield max(current, start), min(following - timedelta(days=1), end)
+        current = following
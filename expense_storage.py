@@ -0,0 +1,432 @@
+"""
+Storage backends for the expenses app.
+
+Every backend has the same small interface, so the page doesn't need to know
+where expenses are kept:
+
+    store.load_recent(months)  -> (success, expenses_or_error, older)
+    store.load_older(older)    -> (success, expenses_or_error)
+    store.add(expense)         -> (success, message)
+    store.add_many(expenses)   -> (success, message)   (bulk import)
+    store.delete(expense)      -> (success, message)
+    store.clear()              -> (success, message)
+    store.iter_expenses(start, end, categories, chunk_size)
+                               -> lists of up to chunk_size expenses (export)
+
+Backends:
+    SqliteStore   - local file with indexes on date, category and timestamp (default)
+    ParquetStore  - local Parquet file, kept in memory and rewritten on change
+    SheetsStore   - Google Sheets (single tab or partitioned, see sheet_partitions.py)
+    ReplicatedStore - a local store that copies every change to Google Sheets
+                      in the background
+
+Pick one in .streamlit/secrets.toml:
+    STORAGE_BACKEND = "sqlite"        # or "parquet" / "sheets"
+    LOCAL_DB_PATH = "expenses.db"
+    REPLICATE_TO_SHEETS = true        # local backends only; needs GOOGLE_SHEET_ID
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from datetime import date, timedelta
+
+from startup_profile import lazy_import
+
+PLACEHOLDER_SHEET_ID = "your-spreadsheet-id-here"
+COLUMNS = ["Date", "Item", "Amount", "Category", "Timestamp"]
+
+
+def cutoff_date(months):
+    """"YYYY-MM-DD" of roughly `months` months ago."""
+    return (date.today() - timedelta(days=31 * months)).isoformat()
+
+
+def matches(expense, start, end, categories):
+    """True if an expense is within start..end (dates or None) and in categories (or None = all)."""
+    if start is not None and expense["Date"] < str(start):
+        return False
+    if end is not None and expense["Date"] > str(end):
+        return False
+    return not categories or expense["Category"] in categories
+
+
+def same_expense(a, b):
+    """True if two expense dictionaries describe the same row."""
+    if a.get("Timestamp") and b.get("Timestamp"):
+        return a["Timestamp"] == b["Timestamp"]
+    return (a["Date"] == b["Date"] and a["Item"] == b["Item"] and a["Category"] == b["Category"]
+            and abs(float(a["Amount"]) - float(b["Amount"])) < 0.005)
+
+
+class SqliteStore:
+    """Expenses in a local SQLite file."""
+
+    label = "the local database"
+
+    def __init__(self, path="expenses.db"):
+        self.path = path
+        self.lock = threading.Lock()
+        # One connection shared by all sessions; the lock keeps it to one thread at a time
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS expenses (
+                id INTEGER PRIMARY KEY,
+                date TEXT NOT NULL,
+                item TEXT NOT NULL,
+                amount REAL NOT NULL,
+                category TEXT NOT NULL,
+                timestamp TEXT
+            );
+            CREATE INDEX IF NOT EXISTS expenses_date ON expenses (date);
+            CREATE INDEX IF NOT EXISTS expenses_category_date ON expenses (category, date);
+            CREATE INDEX IF NOT EXISTS expenses_timestamp ON expenses (timestamp);
+        """)
+        self.db.commit()
+
+    def _select(self, where, params):
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT date, item, amount, category, timestamp FROM expenses WHERE {where} ORDER BY id",
+                params,
+            ).fetchall()
+        return [self._to_expense(row) for row in rows]
+
+    @staticmethod
+    def _to_expense(row):
+        day, item, amount, category, timestamp = row
+        expense = {"Date": day, "Item": item, "Amount": amount, "Category": category}
+        if timestamp:
+            expense["Timestamp"] = timestamp
+        return expense
+
+    def iter_expenses(self, start=None, end=None, categories=None, chunk_size=1000):
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("date >= ?")
+            params.append(str(start))
+        if end is not None:
+            conditions.append("date <= ?")
+            params.append(str(end))
+        if categories:
+            conditions.append(f"category IN ({', '.join('?' * len(categories))})")
+            params.extend(categories)
+        query = ("SELECT date, item, amount, category, timestamp FROM expenses"
+                 + (" WHERE " + " AND ".join(conditions) if conditions else "") + " ORDER BY date, id")
+
+        # A separate connection reads a consistent snapshot (WAL) without
+        # blocking the app's writes while the export runs
+        db = sqlite3.connect(self.path) if self.path != ":memory:" else None
+        try:
+            if db is None:
+                with self.lock:
+                    rows = self.db.execute(query, params).fetchall()
+                for i in range(0, len(rows), chunk_size):
+                    yield [self._to_expense(row) for row in rows[i:i + chunk_size]]
+                return
+            cursor = db.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [self._to_expense(row) for row in rows]
+        finally:
+            if db is not None:
+                db.close()
+
+    def load_recent(self, months=3):
+        cutoff = cutoff_date(months)
+        try:
+            return True, self._select("date >= ?", (cutoff,)), cutoff
+        except sqlite3.Error as error:
+            return False, f"Database error: {error}", None
+
+    def load_older(self, older):
+        try:
+            return True, self._select("date < ?", (older,))
+        except sqlite3.Error as error:
+            return False, f"Database error: {error}"
+
+    def add(self, expense):
+        try:
+            with self.lock:
+                self.db.execute(
+                    "INSERT INTO expenses (date, item, amount, category, timestamp) VALUES (?, ?, ?, ?, ?)",
+                    (expense["Date"], expense["Item"], float(expense["Amount"]), expense["Category"],
+                     expense.get("Timestamp") or None),
+                )
+                self.db.commit()
+            return True, "Expense saved"
+        except sqlite3.Error as error:
+            return False, f"Database error: {error}"
+
+    def add_many(self, expenses):
+        try:
+            with self.lock:
+                # One transaction for all rows
+                self.db.executemany(
+                    "INSERT INTO expenses (date, item, amount, category, timestamp) VALUES (?, ?, ?, ?, ?)",
+                    [(e["Date"], e["Item"], float(e["Amount"]), e["Category"], e.get("Timestamp") or None)
+                     for e in expenses],
+                )
+                self.db.commit()
+            return True, f"{len(expenses)} expenses saved"
+        except sqlite3.Error as error:
+            return False, f"Database error: {error}"
+
+    def delete(self, expense, debug=False):
+        if expense.get("Timestamp"):
+            where, params = "timestamp = ?", (expense["Timestamp"],)
+        else:
+            where = "date = ? AND item = ? AND category = ? AND abs(amount - ?) < 0.005"
+            params = (expense["Date"], expense["Item"], expense["Category"], float(expense["Amount"]))
+        try:
+            with self.lock:
+                cursor = self.db.execute(
+                    f"DELETE FROM expenses WHERE id = (SELECT id FROM expenses WHERE {where} ORDER BY id LIMIT 1)",
+                    params,
+                )
+                self.db.commit()
+            if cursor.rowcount == 0:
+                return False, "Expense not found in the local database"
+            return True, "Expense deleted"
+        except sqlite3.Error as error:
+            return False, f"Database error: {error}"
+
+    def clear(self):
+        try:
+            with self.lock:
+                self.db.execute("DELETE FROM expenses")
+                self.db.commit()
+            return True, "All expenses cleared"
+        except sqlite3.Error as error:
+            return False, f"Database error: {error}"
+
+
+class ParquetStore:
+    """
+    Expenses in a local Parquet file (needs pandas and pyarrow).
+
+    The whole table is kept in memory and the file is rewritten after every
+    change, which suits read-heavy use and files that other tools read; for
+    many small writes SqliteStore is faster.
+    """
+
+    label = "the local Parquet file"
+
+    def __init__(self, path="expenses.parquet"):
+        import pandas as pd
+
+        self.pd = pd
+        self.path = path
+        self.lock = threading.Lock()
+        self.expenses = []
+        if os.path.exists(path):
+            frame = pd.read_parquet(path)
+            for record in frame.to_dict("records"):
+                expense = {key: record[key] for key in COLUMNS[:4]}
+                expense["Amount"] = float(expense["Amount"])
+                if record.get("Timestamp"):
+                    expense["Timestamp"] = record["Timestamp"]
+                self.expenses.append(expense)
+
+    def _save(self):
+        frame = self.pd.DataFrame(
+            [[e["Date"], e["Item"], e["Amount"], e["Category"], e.get("Timestamp", "")] for e in self.expenses],
+            columns=COLUMNS,
+        )
+        # Write a temporary file first, so a crash never leaves half a file
+        temporary = self.path + ".tmp"
+        frame.to_parquet(temporary, index=False)
+        os.replace(temporary, self.path)
+
+    def load_recent(self, months=3):
+        cutoff = cutoff_date(months)
+        with self.lock:
+            return True, [dict(e) for e in self.expenses if e["Date"] >= cutoff], cutoff
+
+    def load_older(self, older):
+        with self.lock:
+            return True, [dict(e) for e in self.expenses if e["Date"] < older]
+
+    def add(self, expense):
+        try:
+            with self.lock:
+                self.expenses.append(dict(expense))
+                self._save()
+            return True, "Expense saved"
+        except Exception as error:
+            return False, f"Parquet error: {error}"
+
+    def iter_expenses(self, start=None, end=None, categories=None, chunk_size=1000):
+        with self.lock:
+            selected = [dict(e) for e in self.expenses if matches(e, start, end, categories)]
+        selected.sort(key=lambda e: e["Date"])
+        for i in range(0, len(selected), chunk_size):
+            yield selected[i:i + chunk_size]
+
+    def add_many(self, expenses):
+        try:
+            with self.lock:
+                self.expenses.extend(dict(e) for e in expenses)
+                self._save()
+            return True, f"{len(expenses)} expenses saved"
+        except Exception as error:
+            return False, f"Parquet error: {error}"
+
+    def delete(self, expense, debug=False):
+        try:
+            with self.lock:
+                for i, stored in enumerate(self.expenses):
+                    if same_expense(stored, expense):
+                        del self.expenses[i]
+                        self._save()
+                        return True, "Expense deleted"
+            return False, "Expense not found in the local Parquet file"
+        except Exception as error:
+            return False, f"Parquet error: {error}"
+
+    def clear(self):
+        try:
+            with self.lock:
+                self.expenses = []
+                self._save()
+            return True, "All expenses cleared"
+        except Exception as error:
+            return False, f"Parquet error: {error}"
+
+
+class SheetsStore:
+    """Expenses in Google Sheets, in one tab or in time partitions."""
+
+    label = "Google Sheets"
+
+    def __init__(self, spreadsheet_id, scheme="none"):
+        self.spreadsheet_id = spreadsheet_id
+        self.scheme = scheme
+
+    @property
+    def partitions(self):
+        # The Google client libraries are only imported once Sheets is actually used
+        return lazy_import("sheet_partitions")
+
+    def load_recent(self, months=3):
+        return self.partitions.load_recent_expenses(self.spreadsheet_id, self.scheme, months)
+
+    def load_older(self, older):
+        return self.partitions.load_older_expenses(self.spreadsheet_id, self.scheme, older)
+
+    def add(self, expense):
+        return self.partitions.append_expense(self.spreadsheet_id, expense, self.scheme)
+
+    def add_many(self, expenses):
+        return self.partitions.append_expenses(self.spreadsheet_id, expenses, self.scheme)
+
+    def iter_expenses(self, start=None, end=None, categories=None, chunk_size=1000):
+        return self.partitions.iter_expenses(self.spreadsheet_id, self.scheme, start, end, categories, chunk_size)
+
+    def delete(self, expense, debug=False):
+        return self.partitions.delete_expense(self.spreadsheet_id, expense, self.scheme, debug=debug)
+
+    def clear(self):
+        return self.partitions.clear_all_expenses(self.spreadsheet_id, self.scheme)
+
+
+class ReplicatedStore:
+    """
+    A local store that also copies every change to a second store (Google Sheets).
+
+    Reads and writes only wait for the local store. Changes are sent to the
+    replica in order by one background thread; if the replica is unreachable
+    (offline, quota) the change is kept in `failed` so it can be retried.
+    """
+
+    def __init__(self, local, replica):
+        self.local = local
+        self.replica = replica
+        self.label = local.label
+        self.outbox = queue.Queue()
+        self.failed = []
+        self.replicated = 0
+        threading.Thread(target=self._replicate, daemon=True).start()
+
+    def load_recent(self, months=3):
+        return self.local.load_recent(months)
+
+    def load_older(self, older):
+        return self.local.load_older(older)
+
+    def iter_expenses(self, start=None, end=None, categories=None, chunk_size=1000):
+        return self.local.iter_expenses(start, end, categories, chunk_size)
+
+    def add(self, expense):
+        return self._then_replicate(self.local.add(expense), "add", expense)
+
+    def add_many(self, expenses):
+        return self._then_replicate(self.local.add_many(expenses), "add_many", list(expenses))
+
+    def delete(self, expense, debug=False):
+        return self._then_replicate(self.local.delete(expense, debug=debug), "delete", expense)
+
+    def clear(self):
+        return self._then_replicate(self.local.clear(), "clear")
+
+    def _then_replicate(self, result, operation, *args):
+        if result[0]:
+            self.outbox.put((operation, args))
+        return result
+
+    def _replicate(self):
+        while True:
+            operation, args = self.outbox.get()
+            try:
+                success, message = getattr(self.replica, operation)(*args)
+            except Exception as error:
+                success, message = False, str(error)
+            if success:
+                self.replicated += 1
+            else:
+                self.failed.append((operation, args, message))
+            self.outbox.task_done()
+
+    def retry_failed(self):
+        """Queue the changes that could not be replicated again."""
+        failed, self.failed = self.failed, []
+        for operation, args, _ in failed:
+            self.outbox.put((operation, args))
+        return len(failed)
+
+    def status(self):
+        """Numbers for the UI: changes waiting, sent and failed."""
+        return {"pending": self.outbox.qsize(), "replicated": self.replicated, "failed": len(self.failed)}
+
+
+def store_from_config(config):
+    """
+    Build the store described by the app's secrets (or any dict-like config).
+
+    Without STORAGE_BACKEND, Google Sheets is used if GOOGLE_SHEET_ID is set,
+    and the local SQLite file otherwise.
+    """
+    spreadsheet_id = config.get("GOOGLE_SHEET_ID", PLACEHOLDER_SHEET_ID)
+    has_sheet = bool(spreadsheet_id) and spreadsheet_id != PLACEHOLDER_SHEET_ID
+    backend = config.get("STORAGE_BACKEND", "sheets" if has_sheet else "sqlite")
+    scheme = config.get("SHEET_PARTITION", "none")
+
+    if backend == "sheets":
+        if not has_sheet:
+            raise ValueError("STORAGE_BACKEND is 'sheets' but GOOGLE_SHEET_ID is not set")
+        return SheetsStore(spreadsheet_id, scheme)
+    if backend == "sqlite":
+        store = SqliteStore(config.get("LOCAL_DB_PATH", "expenses.db"))
+    elif backend == "parquet":
+        store = ParquetStore(config.get("LOCAL_DB_PATH", "expenses.parquet"))
+    else:
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+    if config.get("REPLICATE_TO_SHEETS", False) and has_sheet:
+        return ReplicatedStore(store, SheetsStore(spreadsheet_id, scheme))
+    return store
@@ -1,43 +1,309 @@
+import time
+script_start = time.perf_counter()
+
+import io
+import uuid
 import streamlit as st
-import pandas as pd
-from datetime import datetime
-from google_sheets_helper import append_expense_to_sheet, setup_sheet_headers, load_expenses_from_sheet, clear_all_expenses_from_sheet, delete_expense_from_sheet
-from voice_parser import parse_expense_with_gemini, get_voice_input_examples
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from urllib.parse import urlencode
+from startup_profile import lazy_import, get_import_times
+from rerun_profiler import RerunProfiler, render_profiling_panel
+from expense_index import ExpenseIndex, GRANULARITIES, parse_date
+from expense_storage import ReplicatedStore, same_expense, store_from_config
+from change_feed import ChangeFeed
+from session_memory import SessionBudget, SharedSnapshot, estimate_size
+from voice_parser import parse_expense_with_gemini, parse_expense_locally, get_voice_input_examples
+from expense_import import CATEGORIES
+import api_metrics
+import expense_export
+# pandas, plotly and the Google Sheets client are imported only when a feature needs them
 # Audio recording will be added in future versions
 
 # Set page title
 st.title("💰 Expenses List")
 
+# Opt-in timing of each part of this rerun (see "Enable profiling" in the sidebar)
+profiler = RerunProfiler(enabled=st.session_state.get("profiling", False))
+
 # Initialize session state to store expenses
 if 'expenses' not in st.session_state:
     st.session_state.expenses = []
 
-# Google Sheets configuration
-SPREADSHEET_ID = st.secrets.get("GOOGLE_SHEET_ID", "your-spreadsheet-id-here")
+@st.cache_resource
+def get_store():
+    """Where expenses are saved: local SQLite/Parquet or Google Sheets (see expense_storage.py)."""
+    return store_from_config(st.secrets)
+
+
+store = get_store()
+
+
+@st.cache_resource
+def get_change_feed():
+    """Changes made by any open session of this app (see change_feed.py)."""
+    return ChangeFeed()
+
+
+feed = get_change_feed()
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+    st.session_state.feed_version = feed.version
+
+
+@st.cache_resource
+def get_session_budget():
+    """Memory budget shared by all sessions (see session_memory.py)."""
+    return SessionBudget(max_bytes=int(st.secrets.get("SESSION_MEMORY_MB", 512)) * 1024 * 1024,
+                         idle_seconds=int(st.secrets.get("SESSION_IDLE_MINUTES", 15)) * 60)
+
+
+@st.cache_resource
+def get_shared_snapshot():
+    """The last expense list an idle session gave back, for refilling sessions without storage."""
+    return SharedSnapshot()
+
+
+budget = get_session_budget()
+snapshot = get_shared_snapshot()
+
+def get_expense_index():
+    """The session's ExpenseIndex, rebuilt if it no longer matches the expense list."""
+    index = st.session_state.get("expense_index")
+    if index is None or index.count != len(st.session_state.expenses):
+        index = ExpenseIndex(st.session_state.expenses)
+        st.session_state.expense_index = index
+    return index
+
+
+def get_category_model():
+    """The session's category classifier, trained on the expense list (see category_model.py)."""
+    model = st.session_state.get("category_model")
+    if model is None or model.count != len(st.session_state.expenses):
+        category_model = lazy_import("category_model")
+        model = category_model.train_from_expenses(st.session_state.expenses, CATEGORIES)
+        st.session_state.category_model = model
+    return model
+
+
+def add_local_expense(expense):
+    """Add an expense to this session's list, its index and the category model."""
+    index = get_expense_index()
+    model = get_category_model()
+    st.session_state.expenses.append(expense)
+    index.add(expense)
+    model.learn([expense["Item"]], [expense["Category"]])
+
+
+def add_local_expenses(expenses):
+    """Add a batch of expenses (an import) with one index update instead of one per row."""
+    index = get_expense_index()
+    model = get_category_model()
+    st.session_state.expenses.extend(expenses)
+    index.add_many(expenses)
+    model.learn([e["Item"] for e in expenses], [e["Category"] for e in expenses])
+
+
+def delete_local_expense(i):
+    """Remove the i-th expense from this session's list, its index and the category model."""
+    index = get_expense_index()
+    model = get_category_model()
+    expense = st.session_state.expenses.pop(i)
+    index.remove(expense)
+    model.forget([expense["Item"]], [expense["Category"]])
+
+
+def publish_change(kind, expenses=()):
+    """Tell the other open sessions about a change made in this one."""
+    version = feed.publish(kind, expenses, origin=st.session_state.session_id)
+    # The list already has this change: if nobody published in between, count
+    # it as seen, so feed_version says what the list is current to
+    if version == st.session_state.feed_version + 1:
+        st.session_state.feed_version = version
+
+
+def apply_changes():
+    """Apply what other sessions changed since this session last looked. Returns the number of changes."""
+    version, changes = feed.changes_since(st.session_state.feed_version)
+    st.session_state.feed_version = version
+    if changes is None:
+        # Too far behind to catch up from the feed: load everything again
+        st.session_state.pop("data_loaded", None)
+        return 1
+    changes = [c for c in changes if c.origin != st.session_state.session_id]
+    for change in changes:
+        if change.kind == "add":
+            # Rows saved while this session was loading may already be in the list
+            known = {e.get("Timestamp") for e in st.session_state.expenses}
+            add_local_expenses([expense for expense in change.expenses
+                                if not expense.get("Timestamp") or expense["Timestamp"] not in known])
+        elif change.kind == "delete":
+            for expense in change.expenses:
+                for i in range(len(st.session_state.expenses) - 1, -1, -1):
+                    if same_expense(st.session_state.expenses[i], expense):
+                        delete_local_expense(i)
+                        break
+        elif change.kind == "clear":
+            st.session_state.expenses = []
+            st.session_state.pop("expense_index", None)
+            st.session_state.pop("category_model", None)
+    return len(changes)
+
+
+def session_data_size():
+    """Rough memory of this session's expense data, in bytes."""
+    return sum(estimate_size(st.session_state[key])
+               for key in ("expenses", "expense_index", "category_model") if key in st.session_state)
+
+
+def evict_session_data():
+    """Unload this session's expenses to save memory; the shared snapshot keeps a copy."""
+    # Catch up first: the snapshot must hold exactly the changes up to its version,
+    # or sessions filled from it would apply some of them twice
+    apply_changes()
+    if "data_loaded" in st.session_state:
+        snapshot.put(st.session_state.expenses, st.session_state.feed_version)
+    st.session_state.expenses = []
+    st.session_state.pop("expense_index", None)
+    st.session_state.pop("category_model", None)
+    st.session_state.evicted = True
+    budget.evicted(st.session_state.session_id)
+
+
+def rehydrate_session_data():
+    """Load an unloaded session again: from the shared snapshot if there is one, else from storage."""
+    del st.session_state.evicted
+    expenses, version = snapshot.get()
+    if expenses is None:
+        st.session_state.pop("data_loaded", None)  # The startup load below runs again
+        return
+    st.session_state.expenses = expenses
+    # apply_changes() catches up with everything after the snapshot
+    st.session_state.feed_version = version
+
+
+@st.fragment(run_every=30)
+def unload_when_idle():
+    """
+    Every 30 s: unload this session's data if it has been idle for a while or
+    all sessions together are over the memory budget.
+
+    Drawn at the end of the page, so a full rerun has already shown the data.
+    """
+    budget.touch(st.session_state.session_id)
+    if (not st.session_state.get("evicted") and "older_expenses" not in st.session_state
+            and budget.should_evict(st.session_state.session_id)):
+        evict_session_data()
+    if st.session_state.get("evicted"):
+        st.caption("💤 Expenses unloaded to save memory; they come back as soon as you use the page.")
+
+
+@st.fragment(run_every=3)
+def watch_changes():
+    """Check every 3 s whether another session changed something, then show it."""
+    if st.session_state.get("evicted"):
+        return  # Changes are caught up when the data comes back
+    _, changes = feed.changes_since(st.session_state.feed_version)
+    if changes is None or any(c.origin != st.session_state.session_id for c in changes):
+        st.session_state.auto_rerun = True
+        st.rerun()
+
+
+@st.cache_resource
+def background_loader():
+    """One small thread pool, shared by all sessions, for loading older history."""
+    return ThreadPoolExecutor(max_workers=2)
 
-# Load existing expenses from Google Sheets on startup
+
+def take_older_expenses():
+    """Put the older history in front of the list once it has arrived. Returns True if it did."""
+    future = st.session_state.get("older_expenses")
+    if future is None or not future.done():
+        return False
+    del st.session_state.older_expenses
+    success, older = future.result()
+    if success:
+        st.session_state.expenses = older + st.session_state.expenses
+        # The model learns the older rows instead of being retrained on everything
+        model = st.session_state.get("category_model")
+        if model is not None:
+            model.learn([e["Item"] for e in older], [e["Category"] for e in older])
+    else:
+        st.warning(f"Could not load older expenses: {older}")
+    return True
+
+
+@st.fragment(run_every=2)
+def merge_older_expenses():
+    """Check every 2 s whether the older history has arrived, then show it."""
+    if take_older_expenses():
+        st.session_state.auto_rerun = True
+        st.rerun()
+    elif "older_expenses" in st.session_state:
+        st.caption("⏳ Loading older expenses in the background...")
+
+
+# Data unloaded while the session was idle comes back before anything uses it
+if st.session_state.get("evicted"):
+    rehydrate_session_data()
+# Reruns started by the timers above don't count as the user doing something
+user_active = not st.session_state.pop("auto_rerun", False)
+
+# Catch up with the changes other sessions made since the last rerun
+changes_applied = apply_changes()
+if changes_applied and 'data_loaded' in st.session_state:
+    st.toast(f"🔄 {changes_applied} change(s) from another session")
+
+# Load existing expenses from storage on startup
 if 'data_loaded' not in st.session_state:
     st.session_state.data_loaded = True
+    # Changes published from now on are applied on top of what is loaded
+    st.session_state.feed_version = feed.version
     
-    if SPREADSHEET_ID != "your-spreadsheet-id-here":
-        with st.spinner("Loading expenses from Google Sheets..."):
-            try:
-                success, expenses_data = load_expenses_from_sheet(SPREADSHEET_ID)
-                if success:
-                    st.session_state.expenses = expenses_data
-                    st.success(f"Loaded {len(expenses_data)} expenses from Google Sheets!")
-                else:
-                    st.warning(f"Could not load from Google Sheets: {expenses_data}")
-            except Exception as e:
-                st.warning(f"Error loading from Google Sheets: {str(e)}")
-    else:
-        st.info("Google Sheets not configured. Add your spreadsheet ID to load existing data.")
+    with st.spinner(f"Loading expenses from {store.label}..."):
+        try:
+            # The last few months come first; older rows load in the background
+            with profiler.section("storage_io"):
+                success, expenses_data, older = store.load_recent()
+            if success:
+                st.session_state.expenses = expenses_data
+                st.success(f"Loaded {len(expenses_data)} expenses from {store.label}!")
+                if older:
+                    st.session_state.older_expenses = background_loader().submit(store.load_older, older)
+            else:
+                st.warning(f"Could not load from {store.label}: {expenses_data}")
+        except Exception as e:
+            st.warning(f"Error loading from {store.label}: {str(e)}")
+
+# A full rerun merges directly (a st.rerun() here would drop the click that caused it)
+take_older_expenses()
+if "older_expenses" in st.session_state:
+    merge_older_expenses()
+watch_changes()
+
+profiler.lap("initial load")
+
+# Optional Prometheus endpoint for the API metrics (http://localhost:<port>/metrics)
+if "METRICS_PORT" in st.secrets:
+    api_metrics.start_metrics_server(int(st.secrets["METRICS_PORT"]))
+
+# Optional streaming export endpoint (http://localhost:<port>/export.csv)
+if "EXPORT_PORT" in st.secrets:
+    expense_export.start_export_server(store, int(st.secrets["EXPORT_PORT"]))
 
 # Sidebar for adding new expenses
 st.sidebar.header("Add New Expense")
 
-# Debug toggle
+# Background copy to Google Sheets, if the local store replicates
+if isinstance(store, ReplicatedStore):
+    status = store.status()
+    st.sidebar.caption(f"☁️ Google Sheets sync: {status['pending']} waiting, {status['failed']} failed")
+    if status['failed'] and st.sidebar.button("🔁 Retry sync"):
+        store.retry_failed()
+
+# Debug toggles
 st.sidebar.checkbox("Enable debug logs", key="debug_logs")
+st.sidebar.checkbox("Enable profiling", key="profiling", help="Time each part of the page on every rerun")
 
 # Voice input section
 st.sidebar.subheader("🎤 AI-Powered Input")
@@ -53,47 +319,46 @@ voice_text_input = st.sidebar.text_input(
 
 # Process text-based voice input when button is clicked
 if voice_text_input and st.sidebar.button("🤖 Parse with Gemini"):
-    with st.spinner("Parsing with Gemini..."):
-        parsed_expense = parse_expense_with_gemini(voice_text_input)
+    # Clear cases are handled by the local model; only the rest go to Gemini
+    local_model = get_category_model()
+    parsed_expense = parse_expense_locally(voice_text_input, local_model)
+    parsed_locally = parsed_expense is not None
+    if not parsed_locally:
+        with st.spinner("Parsing with Gemini..."):
+            parsed_expense = parse_expense_with_gemini(voice_text_input, local_model)
+    if parsed_expense:
+        st.sidebar.success("✅ Parsed locally (no Gemini call needed)!" if parsed_locally else "✅ Parsed successfully!")
+        st.sidebar.json(parsed_expense)
         
-        if parsed_expense:
-            st.sidebar.success("✅ Parsed successfully!")
-            st.sidebar.json(parsed_expense)
-            
-            # Automatically add the expense to the list
-            new_expense = {
-                "Date": datetime.now().strftime("%Y-%m-%d"),
-                "Item": parsed_expense['item'],
-                "Amount": parsed_expense['amount'],
-                "Category": parsed_expense['category'],
-                # Hidden unique key for precise deletes in Google Sheets
-                "Timestamp": datetime.now().isoformat(timespec='milliseconds')
-            }
-            
-            # Add to expenses list
-            st.session_state.expenses.append(new_expense)
-            
-            # Try to save to Google Sheets if configured
-            if SPREADSHEET_ID != "your-spreadsheet-id-here":
-                try:
-                    # Setup headers if needed
-                    setup_sheet_headers(SPREADSHEET_ID)
-                    
-                    # Append to Google Sheet
-                    success, message = append_expense_to_sheet(SPREADSHEET_ID, new_expense)
-                    if success:
-                        st.sidebar.success(f"✅ Added {parsed_expense['item']} for €{parsed_expense['amount']:.2f} and saved to Google Sheets!")
-                    else:
-                        st.sidebar.warning(f"⚠️ Added {parsed_expense['item']} for €{parsed_expense['amount']:.2f} (Google Sheets: {message})")
-                except Exception as e:
-                    st.sidebar.warning(f"⚠️ Added {parsed_expense['item']} for €{parsed_expense['amount']:.2f} (Google Sheets error: {str(e)})")
+        # Automatically add the expense to the list
+        new_expense = {
+            "Date": datetime.now().strftime("%Y-%m-%d"),
+            "Item": parsed_expense['item'],
+            "Amount": parsed_expense['amount'],
+            "Category": parsed_expense['category'],
+            # Hidden unique key for precise deletes
+            "Timestamp": datetime.now().isoformat(timespec='milliseconds')
+        }
+        
+        # Add to expenses list
+        add_local_expense(new_expense)
+        publish_change("add", [new_expense])
+        
+        # Save it
+        try:
+            with profiler.section("storage_io"):
+                success, message = store.add(new_expense)
+            if success:
+                st.sidebar.success(f"✅ Added {parsed_expense['item']} for €{parsed_expense['amount']:.2f} and saved to {store.label}!")
             else:
-                st.sidebar.success(f"✅ Added {parsed_expense['item']} for €{parsed_expense['amount']:.2f}!")
-            
-            # Clear the input field
-            st.rerun()
-        else:
-            st.sidebar.error("❌ Could not parse the expense. Please try again or use manual input.")
+                st.sidebar.warning(f"⚠️ Added {parsed_expense['item']} for €{parsed_expense['amount']:.2f} (not saved: {message})")
+        except Exception as e:
+            st.sidebar.warning(f"⚠️ Added {parsed_expense['item']} for €{parsed_expense['amount']:.2f} (not saved: {str(e)})")
+        
+        # Clear the input field
+        st.rerun()
+    else:
+        st.sidebar.error("❌ Could not parse the expense. Please try again or use manual input.")
 
 
 # Voice input examples
@@ -109,7 +374,13 @@ st.sidebar.markdown("---")
 st.sidebar.subheader("✏️ Manual Input")
 expense_name = st.sidebar.text_input("What did you buy?")
 expense_amount = st.sidebar.number_input("How much did it cost?", min_value=0.0, step=0.01, format="%.2f")
-expense_category = st.sidebar.selectbox("Category", ["Groceries", "Restaurants", "Cafeteria", "Transportation", "Entertainment", "Shopping", "Bills", "Donations", "Other"])
+# Suggest a category from what was typed, learned from past expenses
+suggested_category = "Other"
+if expense_name:
+    category, confidence = get_category_model().predict_one(expense_name)
+    if confidence >= 0.5 and category in CATEGORIES:
+        suggested_category = category
+expense_category = st.sidebar.selectbox("Category", CATEGORIES, index=CATEGORIES.index(suggested_category))
 
 # Add expense button
 if st.sidebar.button("Add Expense"):
@@ -120,38 +391,102 @@ if st.sidebar.button("Add Expense"):
             "Item": expense_name,
             "Amount": expense_amount,
             "Category": expense_category,
-            # Hidden unique key for precise deletes in Google Sheets
+            # Hidden unique key for precise deletes
             "Timestamp": datetime.now().isoformat(timespec='milliseconds')
         }
         
         # Add to expenses list
-        st.session_state.expenses.append(new_expense)
+        add_local_expense(new_expense)
+        publish_change("add", [new_expense])
         
-        # Try to save to Google Sheets
-        if SPREADSHEET_ID != "your-spreadsheet-id-here":
-            try:
-                # Setup headers if needed
-                setup_sheet_headers(SPREADSHEET_ID)
-                
-                # Append to Google Sheet
-                success, message = append_expense_to_sheet(SPREADSHEET_ID, new_expense)
-                if success:
-                    st.sidebar.success(f"Added {expense_name} for €{expense_amount:.2f} and saved to Google Sheets!")
-                else:
-                    st.sidebar.warning(f"Added {expense_name} for €{expense_amount:.2f} (Google Sheets: {message})")
-            except Exception as e:
-                st.sidebar.warning(f"Added {expense_name} for €{expense_amount:.2f} (Google Sheets error: {str(e)})")
-        else:
-            st.sidebar.success(f"Added {expense_name} for €{expense_amount:.2f}")
+        # Save it
+        try:
+            with profiler.section("storage_io"):
+                success, message = store.add(new_expense)
+            if success:
+                st.sidebar.success(f"Added {expense_name} for €{expense_amount:.2f} and saved to {store.label}!")
+            else:
+                st.sidebar.warning(f"Added {expense_name} for €{expense_amount:.2f} (not saved: {message})")
+        except Exception as e:
+            st.sidebar.warning(f"Added {expense_name} for €{expense_amount:.2f} (not saved: {str(e)})")
     else:
         st.sidebar.error("Please fill in both name and amount!")
 
+# Bulk import from a bank export
+st.sidebar.markdown("---")
+with st.sidebar.expander("📥 Import CSV / OFX"):
+    uploaded = st.file_uploader("Bank export", type=["csv", "ofx", "qfx"])
+    spending = st.radio("Expenses are", ["auto", "negative", "positive"], horizontal=True,
+                        help="Bank statements show spending as negative amounts; 'auto' decides from the file")
+    if uploaded is not None and st.button("Import"):
+        expense_import = lazy_import("expense_import")
+        # Also compare against older expenses that are still loading
+        existing = list(st.session_state.expenses)
+        older_future = st.session_state.get("older_expenses")
+        if older_future is not None:
+            success, older = older_future.result()
+            if success:
+                existing = older + existing
+        progress = st.progress(0.0, text="Importing...")
+        try:
+            with profiler.section("storage_io"):
+                stats = expense_import.import_file(
+                    io.TextIOWrapper(uploaded, encoding="utf-8-sig", errors="replace", newline=""),
+                    uploaded.name, store, existing, spending=spending,
+                    categorize=lambda items: [c if p >= 0.5 else "Other"
+                                              for c, p in get_category_model().predict(items)],
+                    # How far into the file we are
+                    on_progress=lambda s: progress.progress(min(1.0, uploaded.tell() / max(1, uploaded.size)),
+                                                            text=f"{s['added']} added..."),
+                )
+            progress.progress(1.0, text="Done")
+            add_local_expenses(stats["expenses"])
+            publish_change("add", stats["expenses"])
+            st.success(f"✅ Imported {stats['added']} expenses ({stats['duplicates']} duplicates, "
+                       f"{stats['income']} income rows and {stats['invalid']} unreadable rows skipped)")
+        except expense_import.ImportStopped as e:
+            add_local_expenses(e.stats["expenses"])
+            publish_change("add", e.stats["expenses"])
+            st.error(f"Import stopped: {str(e)}")
+        except Exception as e:
+            st.error(f"Import failed: {str(e)}")
+
+profiler.lap("sidebar widgets")
+
 # Main content area
 st.header("Your Expenses")
 
 if st.session_state.expenses:
-    # Convert to DataFrame for better display
-    df = pd.DataFrame(st.session_state.expenses)
+    index = get_expense_index()
+    first_day, last_day = index.date_range() or (date.today(), date.today())
+
+    # Filters (the charts and totals below are answered from the index, not by re-scanning the list)
+    st.subheader("🔎 Filters")
+    filter_col1, filter_col2, filter_col3 = st.columns([2, 2, 1])
+    with filter_col1:
+        picked_dates = st.date_input("Date range", value=(first_day, last_day))
+    with filter_col2:
+        picked_categories = st.multiselect("Categories", index.categories(), placeholder="All categories")
+    with filter_col3:
+        granularity = st.radio("Trend", GRANULARITIES, index=2)
+
+    # While the end date is still being picked, date_input gives only the start date
+    if isinstance(picked_dates, (tuple, list)):
+        start_day = picked_dates[0] if picked_dates else first_day
+        end_day = picked_dates[1] if len(picked_dates) > 1 else last_day
+    else:
+        start_day = end_day = picked_dates
+    categories = picked_categories or None
+
+    def is_shown(expense):
+        if categories and expense['Category'] not in categories:
+            return False
+        day = parse_date(expense['Date'])
+        # Rows with an unreadable date can't be filtered, so they stay visible
+        return day is None or start_day <= day <= end_day
+
+    shown = [(i, expense) for i, expense in enumerate(st.session_state.expenses) if is_shown(expense)]
+    profiler.lap("filters")
     
     # Display expenses table with delete buttons
     st.subheader("📋 Your Expenses")
@@ -173,7 +508,8 @@ if st.session_state.expenses:
     st.markdown("---")
     
     # Create a custom display with delete buttons
-    for i, expense in enumerate(st.session_state.expenses):
+    button_keys = set()
+    for position, (i, expense) in enumerate(shown):
         col1, col2, col3, col4, col5 = st.columns([2, 1, 1, 1, 1])
         
         with col1:
@@ -198,52 +534,60 @@ if st.session_state.expenses:
         with col4:
             st.write(f"📅 {expense['Date']}")
         with col5:
-            if st.button("🗑️", key=f"delete_{i}", help="Delete this expense", type="secondary"):
+            # Keyed by the row's timestamp, so a click still means this row if
+            # changes from other sessions moved it in the list (old rows may share one)
+            button_key = f"delete_{expense.get('Timestamp')}"
+            if not expense.get('Timestamp') or button_key in button_keys:
+                button_key = f"delete_{i}"
+            button_keys.add(button_key)
+            if st.button("🗑️", key=button_key, help="Delete this expense", type="secondary"):
                 # Delete from local list
-                del st.session_state.expenses[i]
+                delete_local_expense(i)
+                publish_change("delete", [expense])
                 
-                # Delete from Google Sheets if configured
-                if SPREADSHEET_ID != "your-spreadsheet-id-here":
-                    try:
-                        success, message = delete_expense_from_sheet(SPREADSHEET_ID, expense, debug=bool(st.session_state.get("debug_logs", False)))
-                        if success:
-                            st.success(f"✅ Deleted {expense['Item']} from both app and Google Sheets!")
-                        else:
-                            st.warning(f"⚠️ Deleted from app, but Google Sheets error: {message}")
-                    except Exception as e:
-                        st.warning(f"⚠️ Deleted from app, but Google Sheets error: {str(e)}")
-                else:
-                    st.success(f"✅ Deleted {expense['Item']} from app!")
+                # Delete from storage
+                try:
+                    with profiler.section("storage_io"):
+                        success, message = store.delete(expense, debug=bool(st.session_state.get("debug_logs", False)))
+                    if success:
+                        st.success(f"✅ Deleted {expense['Item']} from both app and {store.label}!")
+                    else:
+                        st.warning(f"⚠️ Deleted from app, but {store.label} error: {message}")
+                except Exception as e:
+                    st.warning(f"⚠️ Deleted from app, but {store.label} error: {str(e)}")
                 
 
                 st.rerun()
         
         # Add a subtle separator between rows
-        if i < len(st.session_state.expenses) - 1:
+        if position < len(shown) - 1:
             st.markdown("---")
     
+    if not shown:
+        st.info("No expenses match these filters.")
+
+    profiler.lap("table widgets")
+
     # Calculate and display total
-    total_spent = df['Amount'].sum()
+    category_totals = index.totals_by_category(start_day, end_day, categories)
+    total_spent = sum(amount for amount, _ in category_totals.values())
     st.metric("Total Spent", f"€{total_spent:.2f}")
     
     # Show expenses by category
     st.subheader("Expenses by Category")
-    category_totals = df.groupby('Category')['Amount'].sum().sort_values(ascending=False)
+    ranked = sorted(category_totals.items(), key=lambda item: item[1][0], reverse=True)
+    trend = index.buckets(start_day, end_day, granularity, categories)
+    profiler.lap("index queries")
     
     # Create a colorful bar chart
-    import plotly.express as px
-    
-    # Convert to DataFrame for plotly
-    category_df = category_totals.reset_index()
-    category_df.columns = ['Category', 'Amount']
+    px = lazy_import("plotly.express")
     
     # Create bar chart with different colors
     fig = px.bar(
-        category_df, 
-        x='Category', 
-        y='Amount',
+        x=[name for name, _ in ranked],
+        y=[amount for _, (amount, _) in ranked],
         title="Expenses by Category",
-        color='Category',
+        color=[name for name, _ in ranked],
         color_discrete_sequence=px.colors.qualitative.Set3
     )
     
@@ -256,6 +600,47 @@ if st.session_state.expenses:
     )
     
     st.plotly_chart(fig, use_container_width=True)
+
+    # Spending over time, stacked by category
+    st.subheader(f"{granularity} Trend")
+    trend_days, trend_categories, trend_amounts = [], [], []
+    for bucket_start, amounts in trend:
+        for name, amount in amounts.items():
+            trend_days.append(bucket_start)
+            trend_categories.append(name)
+            trend_amounts.append(amount)
+    trend_fig = px.bar(
+        x=trend_days,
+        y=trend_amounts,
+        color=trend_categories,
+        title=f"{granularity} spending",
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+    trend_fig.update_layout(
+        barmode="stack",
+        xaxis_title="Date",
+        yaxis_title="Amount (€)",
+        legend_title="Category",
+        height=400
+    )
+    st.plotly_chart(trend_fig, use_container_width=True)
+    profiler.lap("plotly figure")
+
+    # Export what the filters above show, read straight from storage
+    with st.expander("📤 Export"):
+        export_format = st.radio("Format", list(expense_export.FORMATS), horizontal=True, key="export_format")
+        st.download_button(
+            f"Download {export_format.upper()}",
+            # A function, so the file is only built when the button is clicked
+            data=lambda: expense_export.export_bytes(store, export_format, start_day, end_day, categories),
+            file_name=expense_export.export_file_name(export_format, start_day, end_day),
+            mime=expense_export.FORMATS[export_format],
+            on_click="ignore",
+        )
+        if "EXPORT_PORT" in st.secrets:
+            # The endpoint streams the file while it is read, for very large histories
+            query = urlencode([("start", start_day), ("end", end_day)] + [("category", c) for c in categories or []])
+            st.markdown(f"[Stream the export](http://localhost:{int(st.secrets['EXPORT_PORT'])}/export.{export_format}?{query})")
     
     # Clear all expenses button with confirmation
     if st.button("🗑️ Clear All Expenses", type="secondary"):
@@ -263,26 +648,27 @@ if st.session_state.expenses:
     
     # Show confirmation dialog if needed
     if st.session_state.get('show_clear_confirmation', False):
-        st.warning("⚠️ This will delete ALL expenses from both the app and Google Sheets!")
+        st.warning(f"⚠️ This will delete ALL expenses from both the app and {store.label}!")
         
         col1, col2 = st.columns(2)
         with col1:
             if st.button("✅ Yes, Delete All", type="primary"):
                 # Clear local expenses
                 st.session_state.expenses = []
+                st.session_state.pop("expense_index", None)
+                st.session_state.pop("category_model", None)
+                publish_change("clear")
                 
-                # Clear Google Sheets if configured
-                if SPREADSHEET_ID != "your-spreadsheet-id-here":
-                    try:
-                        success, message = clear_all_expenses_from_sheet(SPREADSHEET_ID)
-                        if success:
-                            st.success("✅ All expenses cleared from both app and Google Sheets!")
-                        else:
-                            st.warning(f"⚠️ Cleared from app, but Google Sheets error: {message}")
-                    except Exception as e:
-                        st.warning(f"⚠️ Cleared from app, but Google Sheets error: {str(e)}")
-                else:
-                    st.success("✅ All expenses cleared from app!")
+                # Clear storage
+                try:
+                    with profiler.section("storage_io"):
+                        success, message = store.clear()
+                    if success:
+                        st.success(f"✅ All expenses cleared from both app and {store.label}!")
+                    else:
+                        st.warning(f"⚠️ Cleared from app, but {store.label} error: {message}")
+                except Exception as e:
+                    st.warning(f"⚠️ Cleared from app, but {store.label} error: {str(e)}")
                 
                 # Reset confirmation state
                 st.session_state.show_clear_confirmation = False
@@ -304,3 +690,33 @@ st.markdown("1. Fill in the form on the left sidebar")
 st.markdown("2. Click 'Add Expense' to save it")
 st.markdown("3. View your expenses and spending summary below")
 st.markdown("4. Use 'Clear All Expenses' to start over")
+
+profiler.lap("footer")
+
+# Report this session's memory, so idle sessions can be unloaded when needed
+budget.touch(st.session_state.session_id, session_data_size(), active=user_active)
+unload_when_idle()
+
+profiler.finish()
+if st.session_state.get("profiling", False):
+    render_profiling_panel()
+
+# Debug panels (only shown with debug logs on)
+if st.session_state.get("debug_logs", False):
+    with st.expander("⏱️ Startup profile"):
+        st.write(f"This rerun took {time.perf_counter() - script_start:.3f} s")
+        import_times = get_import_times()
+        if import_times:
+            for module_name, seconds in import_times:
+                st.write(f"• `{module_name}`: {seconds:.3f} s")
+        else:
+            st.write("No heavy modules loaded yet.")
+
+    with st.expander("📈 API metrics"):
+        api_metrics.render_metrics_panel()
+
+    with st.expander("🧠 Session memory"):
+        memory = budget.status()
+        st.write(f"This session: {session_data_size() / 1024 / 1024:.1f} MB")
+        st.write(f"All sessions: {memory['bytes'] / 1024 / 1024:.1f} MB of {memory['max_bytes'] / 1024 / 1024:.0f} MB "
+                 f"({memory['loaded']} of {memory['sessions']} sessions loaded, {memory['evictions']} unloads so far)")
@@ -0,0 +1,343 @@
+"""
+A local stand-in for the Google Sheets v4 API, used by the benchmarks.
+
+It answers the same calls google_sheets_helper makes:
+    service.spreadsheets().values().get/append/update/clear(...).execute()
+    service.spreadsheets().get(...).execute()
+    service.spreadsheets().batchUpdate(...).execute()
+
+Every call can wait a configurable latency and fail with a 429 quota error,
+and every call is counted so we can see how many requests an operation makes.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+
+def column_to_index(letters):
+    """Turn a column name like "A" or "AB" into a 0-based index."""
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + (ord(letter) - ord('A') + 1)
+    return index - 1
+
+
+def parse_range(a1_range):
+    """
+    Split an A1 range like "Sheet1!A2:E" into its parts.
+
+    Returns:
+        Tuple of (sheet_title, first_row, last_row, first_col, last_col), with
+        0-based row/column indexes and None for "until the end"
+    """
+    if '!' in a1_range:
+        title, cells = a1_range.split('!', 1)
+        title = title.strip("'")
+    else:
+        title, cells = 'Sheet1', a1_range
+    parts = cells.split(':')
+
+    def split_cell(cell):
+        match = re.match(r'^([A-Za-z]*)(\d*)$', cell)
+        letters, digits = match.group(1), match.group(2)
+        col = column_to_index(letters) if letters else None
+        row = int(digits) - 1 if digits else None
+        return row, col
+
+    start_row, start_col = split_cell(parts[0])
+    if len(parts) > 1:
+        end_row, end_col = split_cell(parts[1])
+    else:
+        end_row, end_col = start_row, start_col
+    return title, start_row or 0, end_row, start_col or 0, end_col
+
+
+# Google Sheets stores dates as days since this day
+SERIAL_EPOCH = datetime(1899, 12, 30)
+
+
+class SerialDate(float):
+    """A date cell: a serial number that is displayed as YYYY-MM-DD."""
+
+    def display(self):
+        return (SERIAL_EPOCH + timedelta(days=self)).strftime("%Y-%m-%d")
+
+
+def to_serial_date(text):
+    return SerialDate((datetime.strptime(text, "%Y-%m-%d") - SERIAL_EPOCH).days)
+
+
+def user_entered(value):
+    """Mimic USER_ENTERED input: numeric text becomes a number, YYYY-MM-DD a date."""
+    if isinstance(value, str):
+        if re.match(r'^\d{4}-\d{2}-\d{2}$', value):
+            return to_serial_date(value)
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+def formatted(value):
+    """Mimic FORMATTED_VALUE output: everything comes back as text."""
+    if isinstance(value, SerialDate):
+        return value.display()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def unformatted(value, datetime_render):
+    """Mimic UNFORMATTED_VALUE output: numbers stay numbers."""
+    if isinstance(value, SerialDate):
+        return value.display() if datetime_render == 'FORMATTED_STRING' else float(value)
+    return value
+
+
+class FakeRequest:
+    """Like googleapiclient's HttpRequest: nothing happens until execute()."""
+
+    def __init__(self, service, operation, handler):
+        self.service = service
+        self.operation = operation
+        self.handler = handler
+
+    def execute(self, num_retries=0):
+        return self.service.call(self.operation, self.handler)
+
+
+class FakeValues:
+    def __init__(self, service):
+        self.service = service
+
+    def get(self, spreadsheetId, range, valueRenderOption='FORMATTED_VALUE',
+            dateTimeRenderOption='SERIAL_NUMBER', fields=None, **kwargs):
+        return FakeRequest(self.service, 'values.get',
+                           lambda: self.service.read(range, valueRenderOption, dateTimeRenderOption, fields))
+
+    def batchGet(self, spreadsheetId, ranges, valueRenderOption='FORMATTED_VALUE',
+                 dateTimeRenderOption='SERIAL_NUMBER', fields=None, **kwargs):
+        return FakeRequest(self.service, 'values.batchGet', lambda: {
+            'valueRanges': [self.service.read(r, valueRenderOption, dateTimeRenderOption) for r in ranges]
+        })
+
+    def append(self, spreadsheetId, range, body, valueInputOption='RAW', **kwargs):
+        return FakeRequest(self.service, 'values.append',
+                           lambda: self.service.append(range, body.get('values', []), valueInputOption))
+
+    def update(self, spreadsheetId, range, body, valueInputOption='RAW', **kwargs):
+        return FakeRequest(self.service, 'values.update',
+                           lambda: self.service.update(range, body.get('values', []), valueInputOption))
+
+    def clear(self, spreadsheetId, range, body=None, **kwargs):
+        return FakeRequest(self.service, 'values.clear',
+                           lambda: self.service.clear(range))
+
+
+class FakeSpreadsheets:
+    def __init__(self, service):
+        self.service = service
+
+    def values(self):
+        return FakeValues(self.service)
+
+    def get(self, spreadsheetId, **kwargs):
+        return FakeRequest(self.service, 'spreadsheets.get', self.service.metadata)
+
+    def batchUpdate(self, spreadsheetId, body):
+        return FakeRequest(self.service, 'spreadsheets.batchUpdate',
+                           lambda: self.service.batch_update(body.get('requests', [])))
+
+    # googleapiclient exposes both spellings
+    batch_update = batchUpdate
+
+
+class FakeSheetsService:
+    """
+    In-memory spreadsheet with Google Sheets-like behaviour.
+
+    Args:
+        latency: Seconds every call waits before answering
+        jitter: Extra random wait, up to this many seconds
+        error_rate: Chance (0-1) that a call fails with HTTP 429
+        calls_per_minute: Fail with HTTP 429 above this many calls per minute (None = no limit)
+        seed: Random seed, so runs are repeatable
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, calls_per_minute=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls_per_minute = calls_per_minute
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.errors = Counter()
+        self.recent_calls = []
+        # sheet title -> (sheetId, list of rows)
+        self.sheets = {'Sheet1': (0, [])}
+
+    # --- Setup helpers used by benchmarks -------------------------------
+
+    def rows(self, title='Sheet1'):
+        """Direct access to the rows of a tab (no latency, not counted)."""
+        if title not in self.sheets:
+            self.sheets[title] = (len(self.sheets), [])
+        return self.sheets[title][1]
+
+    def reset_counters(self):
+        with self.lock:
+            self.calls.clear()
+            self.errors.clear()
+
+    def spreadsheets(self):
+        return FakeSpreadsheets(self)
+
+    # --- Request plumbing -------------------------------------------------
+
+    def call(self, operation, handler):
+        with self.lock:
+            self.calls[operation] += 1
+            now = time.monotonic()
+            self.recent_calls = [t for t in self.recent_calls if now - t < 60]
+            self.recent_calls.append(now)
+            over_quota = self.calls_per_minute is not None and len(self.recent_calls) > self.calls_per_minute
+            random_failure = self.error_rate and self.random.random() < self.error_rate
+            wait = self.latency + (self.random.random() * self.jitter if self.jitter else 0)
+
+        if wait:
+            time.sleep(wait)
+        if over_quota or random_failure:
+            with self.lock:
+                self.errors[operation] += 1
+            raise quota_error()
+        with self.lock:
+            return handler()
+
+    # --- Operations -------------------------------------------------------
+
+    def read(self, a1_range, render='FORMATTED_VALUE', datetime_render='SERIAL_NUMBER', fields=None):
+        title, first_row, last_row, first_col, last_col = parse_range(a1_range)
+        rows = self.rows(title)
+        selected = rows[first_row:None if last_row is None else last_row + 1]
+        values = []
+        for row in selected:
+            cells = row[first_col:None if last_col is None else last_col + 1]
+            # Sheets drops trailing empty cells
+            while cells and cells[-1] in ('', None):
+                cells = cells[:-1]
+            if render == 'FORMATTED_VALUE':
+                cells = [formatted(c) for c in cells]
+            else:
+                cells = [unformatted(c, datetime_render) for c in cells]
+            values.append(list(cells))
+        # Sheets drops trailing empty rows
+        while values and not values[-1]:
+            values.pop()
+        # A "values" field mask leaves out the other keys
+        result = {} if fields == 'values' else {'range': a1_range, 'majorDimension': 'ROWS'}
+        if values:
+            result['values'] = values
+        return result
+
+    def append(self, a1_range, new_rows, input_option):
+        title = parse_range(a1_range)[0]
+        rows = self.rows(title)
+        start = len(rows)
+        for row in new_rows:
+            rows.append([user_entered(c) if input_option == 'USER_ENTERED' else c for c in row])
+        return {'updates': {'updatedRange': f"{title}!A{start + 1}", 'updatedRows': len(new_rows)}}
+
+    def update(self, a1_range, new_rows, input_option):
+        title, first_row, _, first_col, _ = parse_range(a1_range)
+        rows = self.rows(title)
+        for offset, new_row in enumerate(new_rows):
+            index = first_row + offset
+            while len(rows) <= index:
+                rows.append([])
+            row = rows[index]
+            for col_offset, value in enumerate(new_row):
+                col = first_col + col_offset
+                while len(row) <= col:
+                    row.append('')
+                row[col] = user_entered(value) if input_option == 'USER_ENTERED' else value
+        return {'updatedRows': len(new_rows)}
+
+    def clear(self, a1_range):
+        title, first_row, last_row, first_col, last_col = parse_range(a1_range)
+        rows = self.rows(title)
+        for row in rows[first_row:None if last_row is None else last_row + 1]:
+            end = len(row) if last_col is None else min(len(row), last_col + 1)
+            for col in range(first_col, end):
+                row[col] = ''
+        return {'clearedRange': a1_range}
+
+    def metadata(self):
+        return {'sheets': [
+            # New tabs have a 1000-row grid that grows as rows are appended
+            {'properties': {'sheetId': sheet_id, 'title': title, 'gridProperties': {'rowCount': max(1000, len(rows))}}}
+            for title, (sheet_id, rows) in self.sheets.items()
+        ]}
+
+    def batch_update(self, requests):
+        replies = []
+        for request in requests:
+            if 'deleteDimension' in request:
+                rng = request['deleteDimension']['range']
+                rows = self.rows_by_id(rng['sheetId'])
+                del rows[rng['startIndex']:rng['endIndex']]
+            elif 'addSheet' in request:
+                title = request['addSheet']['properties']['title']
+                self.rows(title)
+                replies.append({'addSheet': {'properties': {'title': title, 'sheetId': self.sheets[title][0]}}})
+                continue
+            elif 'appendCells' in request:
+                rows = self.rows_by_id(request['appendCells']['sheetId'])
+                for row in request['appendCells']['rows']:
+                    rows.append([
+                        next(iter(cell.get('userEnteredValue', {'stringValue': ''}).values()))
+                        for cell in row.get('values', [])
+                    ])
+            replies.append({})
+        return {'replies': replies}
+
+    def rows_by_id(self, sheet_id):
+        for sid, rows in self.sheets.values():
+            if sid == sheet_id:
+                return rows
+        raise quota_error(400, "No grid with id")
+
+
+def quota_error(status=429, message="Quota exceeded for quota metric 'Read requests'"):
+    """Build the same HttpError googleapiclient raises for a failed request."""
+    resp = httplib2.Response({'status': status, 'reason': 'Too Many Requests' if status == 429 else 'Bad Request'})
+    content = json.dumps({'error': {'code': status, 'message': message}}).encode('utf-8')
+    return HttpError(resp, content)
+
+
+def make_expense_rows(count, seed=0, start=datetime(2020, 1, 1), step_minutes=37):
+    """Synthetic expense rows in the Date/Item/Amount/Category/Timestamp layout."""
+    rng = random.Random(seed)
+    items = ['Lunch', 'Coffee', 'Bus ticket', 'Groceries', 'Cinema', 'Electricity', 'Book', 'Taxi']
+    categories = ['Restaurants', 'Cafeteria', 'Transportation', 'Groceries', 'Entertainment', 'Bills', 'Shopping', 'Other']
+    rows = []
+    for i in range(count):
+        when = start + timedelta(minutes=i * step_minutes, milliseconds=i % 1000)
+        k = rng.randrange(len(items))
+        rows.append([
+            to_serial_date(when.strftime("%Y-%m-%d")),
+            items[k],
+            round(rng.uniform(1, 120), 2),
+            categories[k],
+            when.isoformat(timespec='milliseconds'),
+        ])
+    return rows
@@ -0,0 +1,61 @@
+"""
+A local stand-in for the Open-Meteo marine API, used by the wave dashboard's
+"fake" mode and for trying the cache without internet access.
+
+It answers the same call as wave_forecast.OpenMeteoSource:
+    source.fetch(start, end) -> (hours, values)
+
+The waves are made up but repeatable: a long swell that builds and fades
+over a few days plus a daily wind sea, so the same hour always has the same
+height. Every call can wait a configurable latency, and every call is
+recorded so we can see which hours a refresh asked for.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+HOUR = 3600
+
+
+class FakeMarineSource:
+    """
+    Made-up hourly wave data for any time range.
+
+    Args:
+        latency: Seconds every fetch waits, like a slow upstream server
+        fail: If True, every fetch raises (to see how the page copes)
+    """
+
+    def __init__(self, latency=0.0, fail=False):
+        self.latency = latency
+        self.fail = fail
+        self.calls = []  # (start, end) of every fetch, in epoch seconds
+        self.lock = threading.Lock()
+
+    def fetch(self, start, end):
+        """
+        Hourly values from start to end (epoch seconds, both included).
+
+        Returns:
+            (hours as int64 epoch seconds, {variable: float32 array})
+        """
+        with self.lock:
+            self.calls.append((start, end))
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail:
+            raise ConnectionError("Fake marine source is down")
+
+        hours = np.arange(start - start % HOUR, end + 1, HOUR, dtype=np.int64)
+        days = hours / 86400.0
+        swell = 3.0 + 2.5 * np.sin(2 * np.pi * days / 5.0) + 1.5 * np.sin(2 * np.pi * days / 11.0 + 1.0)
+        wind_sea = 0.4 * np.sin(2 * np.pi * days + 0.5)
+        height = np.clip(swell + wind_sea, 0.3, None)
+        return hours, {
+            "wave_height": height.astype(np.float32),
+            "wave_period": (9.0 + 1.8 * swell).astype(np.float32),
+            "wave_direction": ((290.0 + 20.0 * np.sin(2 * np.pi * days / 7.0)) % 360).astype(np.float32),
+            "swell_wave_height": np.clip(swell, 0.2, None).astype(np.float32),
+        }
@@ -2,19 +2,38 @@ import os
 import base64
 import json
 import pickle
+from datetime import datetime, timedelta
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import streamlit as st
+import sheets_scheduler
 
 
 # If modifying these scopes, delete the file token.pickle.
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
+# The tab expenses live in when the sheet is not split into partitions
+DEFAULT_SHEET = 'Sheet1'
+
+NOT_FOUND_MESSAGE = "Expense not found in Google Sheet"
+
+
+def a1(sheet_title, cells):
+    """A1 range in a tab, e.g. a1('Expenses 2024', 'A2:E') -> "'Expenses 2024'!A2:E"."""
+    return "'" + sheet_title.replace("'", "''") + "'!" + cells
+
+
 def get_google_sheets_service():
-    """Get authenticated Google Sheets service."""
+    """
+    Get authenticated Google Sheets service.
+
+    Builds a new service on every call. Keep it that way: a service's HTTP
+    connection is not thread-safe, and sheets_scheduler sends requests from
+    several threads.
+    """
     creds = None
     
     # Check if we're in Streamlit Cloud (has GOOGLE_CREDENTIALS in secrets)
@@ -65,13 +84,14 @@ def get_google_sheets_service():
     service = build('sheets', 'v4', credentials=creds)
     return service
 
-def append_expense_to_sheet(spreadsheet_id, expense_data):
+def append_expense_to_sheet(spreadsheet_id, expense_data, sheet_title=DEFAULT_SHEET):
     """
     Append expense data to Google Sheet.
     
     Args:
         spreadsheet_id: The ID of the Google Sheet
         expense_data: Dictionary with expense information
+        sheet_title: Tab to append to
     """
     try:
         service = get_google_sheets_service()
@@ -93,12 +113,14 @@ def append_expense_to_sheet(spreadsheet_id, expense_data):
             'values': values
         }
         
-        result = service.spreadsheets().values().append(
-            spreadsheetId=spreadsheet_id,
-            range='Sheet1!A:E',  # Include Timestamp column
-            valueInputOption='USER_ENTERED',
-            body=body
-        ).execute()
+        # Appends waiting at the same moment are merged into one request
+        result = sheets_scheduler.append(
+            service,
+            spreadsheet_id,
+            a1(sheet_title, 'A:E'),  # Include Timestamp column
+            body['values'],
+            value_input_option='USER_ENTERED'
+        )
         
         return True, "Expense added to Google Sheet successfully!"
         
@@ -107,18 +129,56 @@ def append_expense_to_sheet(spreadsheet_id, expense_data):
     except Exception as error:
         return False, f"An unexpected error occurred: {error}"
 
-def setup_sheet_headers(spreadsheet_id):
+def expense_to_row(expense_data):
+    """The sheet row (A:E) for an expense."""
+    return [
+        expense_data['Date'],
+        expense_data['Item'],
+        expense_data['Amount'],
+        expense_data['Category'],
+        expense_data.get('Timestamp', ''),
+    ]
+
+
+def append_expenses_to_sheet(spreadsheet_id, expenses, sheet_title=DEFAULT_SHEET, rows_per_request=5000):
     """
-    Set up headers in the Google Sheet if they don't exist.
+    Append many expenses with as few requests as possible (bulk import).
+
+    Args:
+        spreadsheet_id: The ID of the Google Sheet
+        expenses: List of expense dictionaries
+        sheet_title: Tab to append to
+        rows_per_request: Rows per values.append call, to keep requests well under the size limit
+
+    Returns:
+        Tuple of (success, message)
+    """
+    try:
+        service = get_google_sheets_service()
+        rows = [expense_to_row(expense) for expense in expenses]
+        for start in range(0, len(rows), rows_per_request):
+            sheets_scheduler.append(service, spreadsheet_id, a1(sheet_title, 'A:E'),
+                                    rows[start:start + rows_per_request], value_input_option='USER_ENTERED')
+        return True, f"{len(rows)} expenses added to Google Sheet"
+
+    except HttpError as error:
+        return False, f"An error occurred: {error}"
+    except Exception as error:
+        return False, f"An unexpected error occurred: {error}"
+
+def setup_sheet_headers(spreadsheet_id, sheet_title=DEFAULT_SHEET):
+    """
+    Set up headers in the Google Sheet (or the given tab) if they don't exist.
     """
     try:
         service = get_google_sheets_service()
         
         # Check if the sheet has headers
-        result = service.spreadsheets().values().get(
+        result = sheets_scheduler.execute(service.spreadsheets().values().get(
             spreadsheetId=spreadsheet_id,
-            range='Sheet1!A1:E1'
-        ).execute()
+            range=a1(sheet_title, 'A1:E1'),
+            fields='values'
+        ), 'values.get')
         
         values = result.get('values', [])
         
@@ -129,78 +189,195 @@ def setup_sheet_headers(spreadsheet_id):
                 'values': header_values
             }
             
-            service.spreadsheets().values().update(
+            sheets_scheduler.execute(service.spreadsheets().values().update(
                 spreadsheetId=spreadsheet_id,
-                range='Sheet1!A1:E1',
+                range=a1(sheet_title, 'A1:E1'),
                 valueInputOption='USER_ENTERED',
                 body=body
-            ).execute()
+            ), 'values.update', body)
         else:
             # If headers exist but Timestamp column is missing, extend headers to include it
             existing_headers = values[0]
             if 'Timestamp' not in existing_headers:
                 # Append Timestamp header in column E
-                service.spreadsheets().values().update(
+                body = {'values': [['Timestamp']]}
+                sheets_scheduler.execute(service.spreadsheets().values().update(
                     spreadsheetId=spreadsheet_id,
-                    range='Sheet1!E1',
+                    range=a1(sheet_title, 'E1'),
                     valueInputOption='USER_ENTERED',
-                    body={'values': [['Timestamp']]}
-                ).execute()
+                    body=body
+                ), 'values.update', body)
             
         return True, "Sheet headers set up successfully!"
         
     except Exception as error:
         return False, f"Error setting up sheet headers: {error}"
 
-def load_expenses_from_sheet(spreadsheet_id):
+# Google Sheets counts dates as days since this day ("serial numbers")
+SERIAL_EPOCH = datetime(1899, 12, 30)
+
+# Ask for typed values (numbers as numbers, dates as serial numbers) and only the
+# "values" field of the response, instead of text formatted for display
+TYPED_READ = {
+    'valueRenderOption': 'UNFORMATTED_VALUE',
+    'dateTimeRenderOption': 'SERIAL_NUMBER',
+    'fields': 'values',
+}
+
+
+def serial_to_date(value):
+    """Turn a date cell into "YYYY-MM-DD" (it may be a serial number or already text)."""
+    if isinstance(value, (int, float)):
+        return (SERIAL_EPOCH + timedelta(days=value)).strftime("%Y-%m-%d")
+    return str(value)
+
+
+def serial_to_timestamp(value):
+    """Turn a timestamp cell into ISO text with milliseconds, like the app writes it."""
+    if isinstance(value, (int, float)):
+        return (SERIAL_EPOCH + timedelta(days=value)).isoformat(timespec='milliseconds')
+    return str(value)
+
+
+def row_to_expense(row):
     """
-    Load all expenses from Google Sheet.
+    Turn one typed sheet row into an expense dictionary.
+
+    Returns None for rows without the base 4 columns.
+    """
+    if len(row) < 4:  # Make sure we have base 4 columns
+        return None
+    amount = row[2]
+    if not isinstance(amount, (int, float)):
+        # Old rows may hold the amount as text
+        try:
+            amount = float(str(amount).replace(',', '.')) if amount != '' else 0.0
+        except ValueError:
+            amount = 0.0
+    expense = {
+        "Date": serial_to_date(row[0]),
+        "Item": str(row[1]),
+        "Amount": float(amount),
+        "Category": str(row[3])
+    }
+    # Optionally include Timestamp if present (column E)
+    if len(row) >= 5 and row[4] != '':
+        expense["Timestamp"] = serial_to_timestamp(row[4])
+    return expense
+
+
+def rows_to_expenses(rows):
+    """Turn typed sheet rows into expense dictionaries, skipping incomplete rows."""
+    expenses = []
+    for row in rows:
+        expense = row_to_expense(row)
+        if expense is not None:
+            expenses.append(expense)
+    return expenses
+
+
+def read_expense_rows(service, spreadsheet_id, first_row, last_row=None, priority=sheets_scheduler.INTERACTIVE,
+                      sheet_title=DEFAULT_SHEET):
+    """
+    Read rows first_row..last_row (1-based, inclusive; None = to the end) as expenses.
+    """
+    a1_range = a1(sheet_title, f"A{first_row}:E{last_row if last_row else ''}")
+    result = sheets_scheduler.execute(service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=a1_range,
+        **TYPED_READ
+    ), 'values.get', priority=priority)
+    return rows_to_expenses(result.get('values', []))
+
+
+def load_expenses_from_sheet(spreadsheet_id, first_row=2, last_row=None, priority=sheets_scheduler.INTERACTIVE,
+                             sheet_title=DEFAULT_SHEET):
+    """
+    Load expenses from Google Sheet (all of them by default).
     
     Args:
         spreadsheet_id: The ID of the Google Sheet
+        first_row: First sheet row to read (row 1 is the header)
+        last_row: Last sheet row to read, or None for all rows
+        priority: sheets_scheduler.INTERACTIVE or sheets_scheduler.BACKGROUND
+        sheet_title: Tab to read
         
     Returns:
         Tuple of (success, data_or_error_message)
     """
     try:
         service = get_google_sheets_service()
-        
-        # Get all data from the sheet (starting from row 2 to skip headers)
-        result = service.spreadsheets().values().get(
-            spreadsheetId=spreadsheet_id,
-            range='Sheet1!A2:E'  # Skip header row, include Timestamp
-        ).execute()
-        
-        values = result.get('values', [])
-        
-        # Convert to list of dictionaries
-        expenses = []
-        for row in values:
-            if len(row) >= 4:  # Make sure we have base 4 columns
-                expense = {
-                    "Date": row[0],
-                    "Item": row[1],
-                    "Amount": float(row[2]) if row[2] else 0.0,
-                    "Category": row[3]
-                }
-                # Optionally include Timestamp if present (column E)
-                if len(row) >= 5 and row[4]:
-                    expense["Timestamp"] = row[4]
-                expenses.append(expense)
-        
-        return True, expenses
+        return True, read_expense_rows(service, spreadsheet_id, first_row, last_row, priority, sheet_title)
         
     except HttpError as error:
         return False, f"Google Sheets error: {error}"
     except Exception as error:
         return False, f"Error loading expenses: {error}"
 
-def clear_all_expenses_from_sheet(spreadsheet_id):
+
+def load_recent_expenses(spreadsheet_id, months=3, page_size=1000, sheet_title=DEFAULT_SHEET):
+    """
+    Load the most recent expenses first, reading the sheet from the bottom up.
+
+    Rows are appended over time, so the newest ones are at the bottom. Pages of
+    page_size rows are read upwards until a page reaches back more than
+    `months` months (or the top of the sheet is reached).
+
+    Args:
+        spreadsheet_id: The ID of the Google Sheet
+        months: How many months of history to load now
+        page_size: Rows per request
+        sheet_title: Tab to read
+
+    Returns:
+        Tuple of (success, expenses_or_error_message, remaining_last_row).
+        remaining_last_row is the last sheet row that was NOT loaded yet
+        (rows 2..remaining_last_row are older), or None if everything was loaded.
+    """
+    try:
+        service = get_google_sheets_service()
+
+        # Grid size of the tab: an upper bound for the last row with data
+        metadata = sheets_scheduler.execute(service.spreadsheets().get(
+            spreadsheetId=spreadsheet_id,
+            fields='sheets.properties(title,gridProperties.rowCount)'
+        ), 'spreadsheets.get')
+        row_count = None
+        for s in metadata.get('sheets', []):
+            props = s.get('properties', {})
+            if props.get('title') == sheet_title:
+                row_count = props.get('gridProperties', {}).get('rowCount')
+        if not row_count or row_count <= page_size + 1:
+            # Small sheet: one request for everything
+            return True, read_expense_rows(service, spreadsheet_id, 2, sheet_title=sheet_title), None
+
+        cutoff = (datetime.now() - timedelta(days=31 * months)).strftime("%Y-%m-%d")
+        pages = []
+        last_row = row_count
+        while last_row >= 2:
+            first_row = max(2, last_row - page_size + 1)
+            page = read_expense_rows(service, spreadsheet_id, first_row, last_row, sheet_title=sheet_title)
+            pages.append(page)
+            last_row = first_row - 1
+            # Stop once this page already reaches back past the cutoff
+            if page and page[0]["Date"] < cutoff:
+                break
+
+        expenses = [expense for page in reversed(pages) for expense in page]
+        return True, expenses, last_row if last_row >= 2 else None
+
+    except HttpError as error:
+        return False, f"Google Sheets error: {error}", None
+    except Exception as error:
+        return False, f"Error loading expenses: {error}", None
+
+def clear_all_expenses_from_sheet(spreadsheet_id, sheet_title=DEFAULT_SHEET):
     """
     Clear all expense data from Google Sheet (keep headers).
     
     Args:
         spreadsheet_id: The ID of the Google Sheet
+        sheet_title: Tab to clear
         
     Returns:
         Tuple of (success, message)
@@ -209,10 +386,10 @@ def clear_all_expenses_from_sheet(spreadsheet_id):
         service = get_google_sheets_service()
         
         # Clear all data except headers (rows 2 onwards)
-        service.spreadsheets().values().clear(
+        sheets_scheduler.execute(service.spreadsheets().values().clear(
             spreadsheetId=spreadsheet_id,
-            range='Sheet1!A2:E'
-        ).execute()
+            range=a1(sheet_title, 'A2:E')
+        ), 'values.clear')
         
         return True, "All expenses cleared from Google Sheet successfully!"
         
@@ -221,13 +398,14 @@ def clear_all_expenses_from_sheet(spreadsheet_id):
     except Exception as error:
         return False, f"Error clearing expenses: {error}"
 
-def delete_expense_from_sheet(spreadsheet_id, expense_data, debug: bool = False):
+def delete_expense_from_sheet(spreadsheet_id, expense_data, debug: bool = False, sheet_title=DEFAULT_SHEET):
     """
     Delete a specific expense from Google Sheet by finding and removing the row.
     
     Args:
         spreadsheet_id: The ID of the Google Sheet
         expense_data: Dictionary with expense information to delete
+        sheet_title: Tab the expense is in
         
     Returns:
         Tuple of (success, message)
@@ -238,13 +416,32 @@ def delete_expense_from_sheet(spreadsheet_id, expense_data, debug: bool = False)
         if service is None:
             return False, "Failed to initialize Google Sheets service."
 
-        # Get all data from the sheet
-        result = service.spreadsheets().values().get(
-            spreadsheetId=spreadsheet_id,
-            range='Sheet1!A:E'
-        ).execute()
-        
-        values = result.get('values', [])
+        row_to_delete = None
+        has_ts = 'Timestamp' in expense_data and str(expense_data.get('Timestamp', '')).strip() != ''
+
+        # Fast path: only read the Timestamp column and look for an exact match
+        if has_ts:
+            result = sheets_scheduler.execute(service.spreadsheets().values().get(
+                spreadsheetId=spreadsheet_id,
+                range=a1(sheet_title, 'E:E'),
+                **TYPED_READ
+            ), 'values.get')
+            wanted = str(expense_data['Timestamp']).strip()
+            for i, row in enumerate(result.get('values', [])):
+                if i > 0 and row and serial_to_timestamp(row[0]).strip() == wanted:
+                    row_to_delete = i + 1
+                    break
+
+        # Otherwise get all data from the sheet, typed like load_expenses_from_sheet
+        # reads it, so dates compare as "YYYY-MM-DD" whatever the sheet's locale
+        values = []
+        if row_to_delete is None:
+            result = sheets_scheduler.execute(service.spreadsheets().values().get(
+                spreadsheetId=spreadsheet_id,
+                range=a1(sheet_title, 'A:E'),
+                **TYPED_READ
+            ), 'values.get')
+            values = result.get('values', [])
         if debug:
             try:
                 st.write("[DEBUG] Loaded rows:", len(values))
@@ -253,14 +450,12 @@ def delete_expense_from_sheet(spreadsheet_id, expense_data, debug: bool = False)
                 pass
         
         # Find the row to delete (search through all rows including headers)
-        row_to_delete = None
-        has_ts = 'Timestamp' in expense_data and str(expense_data.get('Timestamp', '')).strip() != ''
         for i, row in enumerate(values):
             if len(row) >= 4:
                 if i == 0:
                     continue  # Skip header row
                 # Prefer exact match on Timestamp if both payload and row include it
-                if has_ts and len(row) >= 5 and str(row[4]).strip() == str(expense_data['Timestamp']).strip():
+                if has_ts and len(row) >= 5 and serial_to_timestamp(row[4]).strip() == str(expense_data['Timestamp']).strip():
                     row_to_delete = i + 1
                     break
                 # Fallback legacy match if no Timestamp or not found
@@ -281,10 +476,10 @@ def delete_expense_from_sheet(spreadsheet_id, expense_data, debug: bool = False)
                 else:
                     amount_matches = str(row[2]) == str(expense_data['Amount'])
 
-                if (row[0] == expense_data['Date'] and 
-                    row[1] == expense_data['Item'] and 
+                if (serial_to_date(row[0]) == expense_data['Date'] and 
+                    str(row[1]) == str(expense_data['Item']) and 
                     amount_matches and 
-                    row[3] == expense_data['Category']):
+                    str(row[3]) == str(expense_data['Category'])):
                     row_to_delete = i + 1  # +1 because Google Sheets uses 1-based indexing
                     break
         
@@ -294,20 +489,25 @@ def delete_expense_from_sheet(spreadsheet_id, expense_data, debug: bool = False)
                     st.write("[DEBUG] No matching row found for:", expense_data)
                 except Exception:
                     pass
-            return False, "Expense not found in Google Sheet"
+            return False, NOT_FOUND_MESSAGE
         
         # Use a simpler approach - clear the specific row and shift up
         # First, get the sheet info to get the correct sheet ID
-        sheet_metadata = service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
-        # Prefer the sheet titled 'Sheet1', else fallback to the first sheet
+        sheet_metadata = sheets_scheduler.execute(service.spreadsheets().get(
+            spreadsheetId=spreadsheet_id,
+            fields='sheets.properties(sheetId,title)'
+        ), 'spreadsheets.get')
+        # Prefer the sheet with this title; the default tab falls back to the first sheet
         sheet_id = None
         for s in sheet_metadata.get('sheets', []):
             props = s.get('properties', {})
-            if props.get('title') == 'Sheet1':
+            if props.get('title') == sheet_title:
                 sheet_id = props.get('sheetId')
                 break
-        if sheet_id is None and sheet_metadata.get('sheets'):
+        if sheet_id is None and sheet_title == DEFAULT_SHEET and sheet_metadata.get('sheets'):
             sheet_id = sheet_metadata['sheets'][0]['properties']['sheetId']
+        if sheet_id is None:
+            return False, f"Tab '{sheet_title}' not found in Google Sheet"
         if debug:
             try:
                 st.write("[DEBUG] Using sheet_id:", sheet_id, "for deletion at row", row_to_delete)
@@ -328,10 +528,10 @@ def delete_expense_from_sheet(spreadsheet_id, expense_data, debug: bool = False)
             }]
         }
 
-        service.spreadsheets().batch_update(
+        sheets_scheduler.execute(service.spreadsheets().batch_update(
             spreadsheetId=spreadsheet_id,
             body=request_body
-        ).execute()
+        ), 'spreadsheets.batchUpdate', request_body)
         
         return True, "Expense deleted from Google Sheet successfully!"
         
@@ -0,0 +1,339 @@
+"""
+Run the tools (job scraper, video downloader, form automation, mouse jiggle)
+as background jobs, so the landing page (app.py) stays responsive.
+
+Every job runs in its own worker process. Its printed output is sent back
+line by line over the job's own pipe, so the page can show the log and a
+progress bar while it runs. Cancelling kills the worker; since no other
+job shares its pipe, a message cut off halfway can't block anyone else.
+At most `max_workers` jobs run at once, and each tool has its own limit
+too (one mouse jiggler is plenty); extra jobs wait in a queue.
+Finished jobs are kept in job_history.jsonl.
+
+Example:
+    runner = JobRunner()
+    job_id = runner.submit("video_downloader", urls=["https://youtu.be/..."])
+    runner.job(job_id).status      # "queued", "running", "done", "failed" or "cancelled"
+    runner.job(job_id).log         # Last lines printed by the tool
+    runner.active_jobs()           # Safe copies for showing on a page
+"""
+
+import importlib
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import re
+import sys
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+
+HISTORY_FILE = "job_history.jsonl"
+LOG_LINES = 500  # Lines of output kept per job
+
+# What each tool runs: "module:function", how many may run at once, and
+# the inputs the landing page asks for (name -> label)
+TOOLS = {
+    "job_scraper": {
+        "label": "🔎 Job Scraper",
+        "target": "job_runner:scrape_jobs",
+        "max_parallel": 2,
+        "inputs": {},
+    },
+    "video_downloader": {
+        "label": "🎬 Video Downloader",
+        "target": "job_runner:download_videos",
+        "max_parallel": 2,
+        "inputs": {"urls": "Video or playlist URLs (one per line)"},
+    },
+    "form_automation": {
+        "label": "📝 Form Automation",
+        "target": "automate_form:open_form_and_submit",
+        "max_parallel": 2,
+        "inputs": {"url": "Google Form URL"},
+    },
+    "mouse_jiggle": {
+        "label": "🖱️ Mouse Jiggle",
+        "target": "job_runner:jiggle_mouse",
+        "max_parallel": 1,
+        "inputs": {},
+    },
+}
+
+# "42%" anywhere in a line counts as progress
+PERCENT = re.compile(r"(\d{1,3}(?:\.\d+)?)%")
+
+
+def scrape_jobs():
+    """Job scraper entry point for a job: the scraper prints its errors, so fail the job here."""
+    import job_scraper
+    if not job_scraper.scrape_jobs():
+        raise RuntimeError("The scrape failed (see the log)")
+
+
+def download_videos(urls):
+    """Video downloader entry point for a job: a list of URLs, downloaded as a queue."""
+    import video_downloader
+    if isinstance(urls, str):
+        urls = [u.strip() for u in urls.splitlines() if u.strip()]
+    results = video_downloader.download_queue(urls, workers=2, fragments=4)
+    failed = [url for url, success, _ in results if not success]
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(urls)} downloads failed")
+
+
+def jiggle_mouse():
+    """Mouse jiggle entry point for a job: runs until the job is cancelled."""
+    import mouse_jiggle
+    print("Mouse jiggler started. Cancel the job to stop it.")
+    mouse_jiggle.run_fixed(10, 2)
+
+
+class _PipeWriter:
+    """Stands in for sys.stdout in a worker: sends every finished line to the runner."""
+
+    def __init__(self, connection, job_id):
+        self.connection = connection
+        self.job_id = job_id
+        self.buffer = ""
+        # Tools may print from several threads; a pipe needs one send at a time
+        self.lock = threading.Lock()
+
+    def send(self, message):
+        with self.lock:
+            self.connection.send(message)
+
+    def write(self, text):
+        # yt-dlp and friends use \r to redraw a line; treat it as a new line
+        self.buffer += text.replace("\r", "\n")
+        *lines, self.buffer = self.buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                self.send(("log", self.job_id, line))
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+def _run_job(job_id, target, kwargs, connection):
+    """Runs in the worker process: call the tool, report its output and how it ended."""
+    writer = sys.stdout = sys.stderr = _PipeWriter(connection, job_id)
+    try:
+        module_name, function_name = target.split(":")
+        function = getattr(importlib.import_module(module_name), function_name)
+        function(**kwargs)
+        writer.write("\n")
+        writer.send(("done", job_id, None))
+    except BaseException as e:
+        traceback.print_exc()
+        writer.write("\n")
+        writer.send(("done", job_id, f"{type(e).__name__}: {e}"))
+
+
+class Job:
+    """One run of a tool, as the landing page sees it."""
+
+    def __init__(self, tool, kwargs, job_id=None):
+        self.id = job_id or uuid.uuid4().hex[:8]
+        self.tool = tool
+        self.kwargs = kwargs
+        self.status = "queued"
+        self.error = None
+        self.progress = None  # 0-1, from the last "NN%" the tool printed
+        self.log = deque(maxlen=LOG_LINES)
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.process = None
+        self.connection = None  # Our end of the worker's pipe; only the collector reads it
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def to_dict(self):
+        return {
+            "id": self.id, "tool": self.tool, "kwargs": self.kwargs, "status": self.status,
+            "error": self.error, "progress": self.progress, "submitted_at": self.submitted_at,
+            "started_at": self.started_at, "finished_at": self.finished_at, "log_tail": list(self.log)[-20:],
+        }
+
+
+class JobRunner:
+    """
+    Starts queued jobs in worker processes and collects their output.
+
+    Args:
+        max_workers: Jobs running at the same time, over all tools
+        history_file: Where finished jobs are recorded (None = keep them in memory only)
+        tools: Tool definitions (default: TOOLS)
+    """
+
+    def __init__(self, max_workers=3, history_file=HISTORY_FILE, tools=None):
+        self.max_workers = max_workers
+        self.history_file = history_file
+        self.tools = tools or TOOLS
+        self.jobs = {}  # id -> Job, oldest first
+        self.lock = threading.Lock()
+        # "spawn": workers start clean, without a copy of the Streamlit server
+        self.context = multiprocessing.get_context("spawn")
+        self.history = self.load_history()
+        threading.Thread(target=self._collect, daemon=True).start()
+
+    def submit(self, tool, **kwargs):
+        """Queue a run of a tool; returns the job id."""
+        if tool not in self.tools:
+            raise ValueError(f"Unknown tool: {tool}")
+        job = Job(tool, kwargs)
+        with self.lock:
+            self.jobs[job.id] = job
+        self._start_waiting()
+        return job.id
+
+    def cancel(self, job_id):
+        """Stop a queued or running job. Returns True if it was stopped."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            process = job.process
+            self._finish(job, "cancelled", None)
+        if process is not None and process.is_alive():
+            process.terminate()
+        self._start_waiting()
+        return True
+
+    def job(self, job_id):
+        return self.jobs.get(job_id)
+
+    def active_jobs(self):
+        """
+        Queued and running jobs, oldest first, as dictionaries (see Job.to_dict).
+
+        They are copies made under the lock, so the page can read them while
+        the collector thread keeps adding log lines.
+        """
+        with self.lock:
+            return [job.to_dict() for job in self.jobs.values() if not job.finished]
+
+    def finished_jobs(self, limit=20):
+        """Finished jobs, newest first: this server's, then older ones from the history file."""
+        with self.lock:
+            recent = [job.to_dict() for job in self.jobs.values() if job.finished]
+        recent.sort(key=lambda j: j["finished_at"] or 0, reverse=True)
+        return (recent + self.history)[:limit]
+
+    def load_history(self, limit=200):
+        if not self.history_file or not os.path.exists(self.history_file):
+            return []
+        entries = []
+        with open(self.history_file, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+        return entries[::-1][:limit]
+
+    def _finish(self, job, status, error):
+        # Called with the lock held
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        if self.history_file:
+            with open(self.history_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(job.to_dict()) + "\n")
+
+    def _start_waiting(self):
+        """Start queued jobs while there is room, oldest first."""
+        with self.lock:
+            running = [j for j in self.jobs.values() if j.status == "running"]
+            for job in self.jobs.values():
+                if len(running) >= self.max_workers:
+                    break
+                if job.status != "queued":
+                    continue
+                same_tool = sum(1 for j in running if j.tool == job.tool)
+                if same_tool >= self.tools[job.tool].get("max_parallel", 1):
+                    continue
+                # A pipe per job: a worker killed while sending only breaks its own pipe
+                reader, writer = self.context.Pipe(duplex=False)
+                job.process = self.context.Process(
+                    target=_run_job, args=(job.id, self.tools[job.tool]["target"], job.kwargs, writer),
+                    daemon=True)
+                job.process.start()
+                writer.close()  # The worker has its own copy
+                job.connection = reader
+                job.status = "running"
+                job.started_at = time.time()
+                running.append(job)
+
+    def _collect(self):
+        """Background thread: read the workers' messages and notice workers that died."""
+        while True:
+            try:
+                changed = self._collect_once()
+            except Exception:
+                # Never let one bad message stop the log and status updates of every job
+                traceback.print_exc()
+                time.sleep(1.0)
+                continue
+            if changed:
+                self._start_waiting()
+
+    def _collect_once(self, timeout=0.5):
+        with self.lock:
+            readers = {job.connection: job for job in self.jobs.values()
+                       if job.connection is not None and not job.finished}
+            # Pipes of cancelled jobs are thrown away, whatever is left in them
+            for job in self.jobs.values():
+                if job.finished and job.connection is not None:
+                    job.connection.close()
+                    job.connection = None
+        if readers:
+            ready = multiprocessing.connection.wait(list(readers), timeout)
+        else:
+            time.sleep(timeout)
+            ready = []
+
+        messages = []
+        for connection in ready:
+            job = readers[connection]
+            try:
+                messages.append((job, connection.recv()))
+            except Exception:
+                # The worker is gone (EOF) or sent something unreadable: stop reading this pipe
+                with self.lock:
+                    if job.connection is connection:
+                        job.connection = None
+                connection.close()
+
+        changed = False
+        with self.lock:
+            for job, (kind, _, value) in messages:
+                if job.finished:
+                    continue
+                if kind == "log":
+                    job.log.append(value)
+                    match = PERCENT.search(value)
+                    if match:
+                        job.progress = min(1.0, float(match.group(1)) / 100)
+                elif kind == "done":
+                    self._finish(job, "failed" if value else "done", value)
+                    changed = True
+            # A worker that crashed (or was killed) without saying "done"
+            for job in self.jobs.values():
+                if job.status != "running" or job.connection is not None:
+                    continue
+                exitcode = job.process.exitcode
+                if exitcode is not None:
+                    self._finish(job, "failed", f"Worker stopped with exit code {exitcode}")
+                    changed = True
+        return changed
@@ -1,167 +1,312 @@
 # Job Scraper - BambooHR Careers Page (Improved Version)
 # This program opens a browser, goes to the BambooHR jobs page, and scrapes job listings
 # Uses multiple strategies to find job listings
+#
+# The browser is only used to load the page. The strategies run on the page's
+# HTML (one download instead of one browser call per element), which also lets
+# benchmark_scraper.py replay saved pages without a browser.
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 import time
 import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+JOB_URL = "https://people.bamboohr.com/careers"
+
+# Look for job-related keywords
+JOB_KEYWORDS = ['engineer', 'developer', 'manager', 'analyst', 'coordinator', 'specialist', 'director', 'lead', 'senior', 'junior']
+
+# Elements with job-related classes or IDs: (tag or None for any tag, attribute, text it contains)
+JOB_SELECTORS = [
+    (None, 'class', 'job'), (None, 'class', 'position'), (None, 'class', 'career'), (None, 'class', 'opening'),
+    (None, 'id', 'job'), (None, 'id', 'position'), (None, 'id', 'career'), (None, 'id', 'opening'),
+    ('div', 'class', 'card'), ('div', 'class', 'item'), ('div', 'class', 'listing'),
+]
+
+# Tags whose content is never shown on the page
+HIDDEN_TAGS = {'head', 'script', 'style', 'noscript', 'template', 'svg'}
+# Tags that never have a closing tag
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+# Tags that start a new line in the rendered text
+BLOCK_TAGS = {'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'footer', 'form',
+              'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre',
+              'section', 'table', 'tr', 'ul'}
+
+
+class Element:
+    """One HTML element: its tag, attributes, children and direct text pieces."""
+
+    def __init__(self, tag, attrs, parent):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children = []  # Elements and text strings, in page order
+        self.has_own_text = False
+        self._text = None
+
+    def text(self):
+        """Visible text of the element, like Selenium's element.text."""
+        if self._text is None:
+            parts = []
+            self._collect_text(parts)
+            lines = [' '.join(line.split()) for line in ''.join(parts).split('\n')]
+            self._text = '\n'.join(line for line in lines if line)
+        return self._text
+
+    def _collect_text(self, parts):
+        if self.tag in HIDDEN_TAGS:
+            return
+        if self.tag in BLOCK_TAGS:
+            parts.append('\n')
+        for child in self.children:
+            if isinstance(child, str):
+                parts.append(child)
+            else:
+                child._collect_text(parts)
+        if self.tag in BLOCK_TAGS:
+            parts.append('\n')
+
+    def is_hidden(self):
+        element = self
+        while element is not None:
+            if element.tag in HIDDEN_TAGS:
+                return True
+            element = element.parent
+        return False
+
+
+class PageParser(HTMLParser):
+    """Builds a tree of Elements from an HTML page using only the standard library."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Element('document', {}, None)
+        self.current = self.root
+        self.elements = []
+        self.title = ''
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        element = Element(tag, {name: value or '' for name, value in attrs}, self.current)
+        self.current.children.append(element)
+        self.elements.append(element)
+        if tag == 'title':
+            self._in_title = True
+        if tag not in VOID_TAGS:
+            self.current = element
+
+    def handle_startendtag(self, tag, attrs):
+        element = Element(tag, {name: value or '' for name, value in attrs}, self.current)
+        self.current.children.append(element)
+        self.elements.append(element)
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._in_title = False
+        # Close the nearest open element with this tag (browsers forgive missing end tags)
+        element = self.current
+        while element is not self.root and element.tag != tag:
+            element = element.parent
+        if element is not self.root:
+            self.current = element.parent
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        self.current.children.append(data)
+        if data.strip():
+            self.current.has_own_text = True
+
+
+def has_job_keyword(text):
+    text = text.lower()
+    return any(keyword in text for keyword in JOB_KEYWORDS)
+
+
+def extract_jobs_from_html(html, page_url=JOB_URL, verbose=False):
+    """
+    Run all scraping strategies on a page's HTML.
+
+    Args:
+        html: The page source
+        page_url: Address of the page, used to turn relative links into full ones
+        verbose: Print what each strategy finds, like the live scraper does
+
+    Returns:
+        Dictionary with the page title, the combined findings list and the
+        number of elements visited
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+
+    parser = PageParser()
+    parser.feed(html)
+    parser.close()
+    elements = [e for e in parser.elements if not e.is_hidden()]
+    body = next((e for e in elements if e.tag == 'body'), parser.root)
+
+    # Strategy 1: Look for common job-related text patterns
+    log("\n=== Strategy 1: Looking for job-related text ===")
+    page_text = body.text().lower()
+    found_keywords = [keyword for keyword in JOB_KEYWORDS if keyword in page_text]
+    log(f"Found job-related keywords: {found_keywords}")
+
+    # Strategy 2: Look for links that might be job postings
+    log("\n=== Strategy 2: Looking for job links ===")
+    job_links = []
+    for link in elements:
+        if link.tag != 'a':
+            continue
+        href = link.attrs.get('href')
+        text = link.text().strip()
+        # Look for links that might be jobs
+        if href and has_job_keyword(text):
+            job_links.append(f"Link: {text} -> {urljoin(page_url, href)}")
+            log(f"Found potential job link: {text[:50]}...")
+
+    # Strategy 3: Look for elements with job-related classes or IDs
+    log("\n=== Strategy 3: Looking for job elements ===")
+    for tag, attribute, needle in JOB_SELECTORS:
+        count = sum(1 for e in elements
+                    if (tag is None or e.tag == tag) and needle in e.attrs.get(attribute, ''))
+        if count:
+            selector = f"{tag or ''}[{attribute}*='{needle}']"
+            log(f"Found {count} elements with selector: {selector}")
+
+    # Strategy 4: Look for any text that looks like job titles
+    log("\n=== Strategy 4: Looking for job title patterns ===")
+    potential_jobs = []
+    for element in elements:
+        if not element.has_own_text:
+            continue
+        text = element.text().strip()
+        # Look for text that might be job titles (2-5 words, title case)
+        if (len(text.split()) >= 2 and len(text.split()) <= 5 and
+                text.istitle() and has_job_keyword(text)):
+            potential_jobs.append(text)
+
+    # Remove duplicates (keeping page order) and show results
+    unique_potential_jobs = list(dict.fromkeys(potential_jobs))
+    log(f"Found {len(unique_potential_jobs)} potential job titles:")
+    for i, job in enumerate(unique_potential_jobs[:10]):  # Show first 10
+        log(f"  {i+1}. {job}")
+
+    # Strategy 5: Look for any clickable elements that might be jobs
+    log("\n=== Strategy 5: Looking for clickable job elements ===")
+    clickable_jobs = []
+    for element in elements:
+        if not ('onclick' in element.attrs or 'href' in element.attrs or element.attrs.get('role') == 'button'):
+            continue
+        text = element.text().strip()
+        if text and len(text) > 5 and len(text) < 100 and has_job_keyword(text):
+            clickable_jobs.append(text)
+
+    # Combine all findings
+    all_findings = []
+    all_findings.extend([f"LINK: {link}" for link in job_links])
+    all_findings.extend([f"TITLE: {job}" for job in unique_potential_jobs])
+    all_findings.extend([f"CLICKABLE: {job}" for job in clickable_jobs])
+
+    return {
+        'title': ' '.join(parser.title.split()),
+        'findings': all_findings,
+        'elements_visited': len(parser.elements),
+    }
+
+
+def write_findings(path, page_title, page_url, findings, verbose=False):
+    """Save findings in the scraped_jobs.txt format."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("BambooHR Job Listings - Improved Scraper\n")
+        f.write("=" * 60 + "\n\n")
+        f.write(f"Page Title: {page_title}\n")
+        f.write(f"Page URL: {page_url}\n")
+        f.write(f"Total findings: {len(findings)}\n\n")
+
+        for i, finding in enumerate(findings, 1):
+            f.write(f"{i}. {finding}\n")
+            if verbose:
+                print(f"{i}. {finding}")
+
+
+def read_findings(path):
+    """Read the findings back from a file written by write_findings."""
+    findings = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            match = re.match(r'^\d+\. (.*)$', line.rstrip('\n'))
+            if match:
+                findings.append(match.group(1))
+    return findings
+
 
 def scrape_jobs():
     """
     Opens a browser, navigates to BambooHR careers page, and scrapes job listings
     Uses multiple strategies to find jobs on the page
+
+    Returns:
+        True if the page was scraped, False if an error stopped it
     """
+    from browser_service import lease_browser
+
     print("Starting improved job scraper...")
-    
-    # Create a new browser window
-    driver = webdriver.Chrome()
-    
+
+    # Borrow a warm browser from browser_service.py if it runs, else start a
+    # headless one that skips images, fonts, media and trackers
+    browser = lease_browser()
+    driver = browser.driver
+    broken = False
+
     try:
         # Navigate to the BambooHR careers page
         print("Opening BambooHR careers page...")
-        driver.get("https://people.bamboohr.com/careers")
-        
+        driver.get(JOB_URL)
+
         # Wait for the page to load completely
         print("Waiting for page to load...")
         time.sleep(5)
-        
+
         # Get page information for debugging
         print(f"Page title: {driver.title}")
         print(f"Current URL: {driver.current_url}")
-        
-        # Strategy 1: Look for common job-related text patterns
-        print("\n=== Strategy 1: Looking for job-related text ===")
-        page_text = driver.find_element(By.TAG_NAME, "body").text.lower()
-        
-        # Look for job-related keywords
-        job_keywords = ['engineer', 'developer', 'manager', 'analyst', 'coordinator', 'specialist', 'director', 'lead', 'senior', 'junior']
-        found_keywords = [keyword for keyword in job_keywords if keyword in page_text]
-        print(f"Found job-related keywords: {found_keywords}")
-        
-        # Strategy 2: Look for links that might be job postings
-        print("\n=== Strategy 2: Looking for job links ===")
-        all_links = driver.find_elements(By.TAG_NAME, "a")
-        job_links = []
-        
-        for link in all_links:
-            try:
-                href = link.get_attribute("href")
-                text = link.text.strip()
-                
-                # Look for links that might be jobs
-                if href and any(keyword in text.lower() for keyword in job_keywords):
-                    job_links.append(f"Link: {text} -> {href}")
-                    print(f"Found potential job link: {text[:50]}...")
-            except:
-                continue
-        
-        # Strategy 3: Look for elements with job-related classes or IDs
-        print("\n=== Strategy 3: Looking for job elements ===")
-        job_selectors = [
-            "[class*='job']", "[class*='position']", "[class*='career']", "[class*='opening']",
-            "[id*='job']", "[id*='position']", "[id*='career']", "[id*='opening']",
-            "div[class*='card']", "div[class*='item']", "div[class*='listing']"
-        ]
-        
-        all_job_elements = []
-        for selector in job_selectors:
-            try:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                all_job_elements.extend(elements)
-                if elements:
-                    print(f"Found {len(elements)} elements with selector: {selector}")
-            except:
-                continue
-        
-        # Strategy 4: Look for any text that looks like job titles
-        print("\n=== Strategy 4: Looking for job title patterns ===")
-        all_text_elements = driver.find_elements(By.XPATH, "//*[text()]")
-        potential_jobs = []
-        
-        for element in all_text_elements:
-            try:
-                text = element.text.strip()
-                # Look for text that might be job titles (2-5 words, title case)
-                if (len(text.split()) >= 2 and len(text.split()) <= 5 and 
-                    text.istitle() and 
-                    any(keyword in text.lower() for keyword in job_keywords)):
-                    potential_jobs.append(text)
-            except:
-                continue
-        
-        # Remove duplicates and show results
-        unique_potential_jobs = list(set(potential_jobs))
-        print(f"Found {len(unique_potential_jobs)} potential job titles:")
-        for i, job in enumerate(unique_potential_jobs[:10]):  # Show first 10
-            print(f"  {i+1}. {job}")
-        
-        # Strategy 5: Look for any clickable elements that might be jobs
-        print("\n=== Strategy 5: Looking for clickable job elements ===")
-        clickable_elements = driver.find_elements(By.XPATH, "//*[@onclick or @href or @role='button']")
-        clickable_jobs = []
-        
-        for element in clickable_elements:
-            try:
-                text = element.text.strip()
-                if (text and len(text) > 5 and len(text) < 100 and 
-                    any(keyword in text.lower() for keyword in job_keywords)):
-                    clickable_jobs.append(text)
-            except:
-                continue
-        
-        # Combine all findings
-        all_findings = []
-        
-        if job_links:
-            all_findings.extend([f"LINK: {link}" for link in job_links])
-        
-        if unique_potential_jobs:
-            all_findings.extend([f"TITLE: {job}" for job in unique_potential_jobs])
-        
-        if clickable_jobs:
-            all_findings.extend([f"CLICKABLE: {job}" for job in clickable_jobs])
-        
+
+        # Grab the whole page once and run every strategy on it
+        page_source = driver.page_source
+        result = extract_jobs_from_html(page_source, driver.current_url, verbose=True)
+        all_findings = result['findings']
+
         # Save all findings
         if all_findings:
             print(f"\n=== SUMMARY: Found {len(all_findings)} potential job listings ===")
-            
-            with open("scraped_jobs.txt", "w", encoding="utf-8") as f:
-                f.write("BambooHR Job Listings - Improved Scraper\n")
-                f.write("=" * 60 + "\n\n")
-                f.write(f"Page Title: {driver.title}\n")
-                f.write(f"Page URL: {driver.current_url}\n")
-                f.write(f"Total findings: {len(all_findings)}\n\n")
-                
-                for i, finding in enumerate(all_findings, 1):
-                    f.write(f"{i}. {finding}\n")
-                    print(f"{i}. {finding}")
-            
+
+            write_findings("scraped_jobs.txt", driver.title, driver.current_url, all_findings, verbose=True)
+
             print(f"\nAll findings saved to 'scraped_jobs.txt'")
-            
+
         else:
             print("\n=== No job listings found with any strategy ===")
             print("This might mean:")
             print("1. The page uses JavaScript to load jobs dynamically")
             print("2. Jobs are loaded from an external API")
             print("3. The page structure is very different")
-            
+
             # Save page source for manual inspection
             with open("page_source.html", "w", encoding="utf-8") as f:
-                f.write(driver.page_source)
+                f.write(page_source)
             print("Page source saved to 'page_source.html' for manual inspection")
-    
+
     except Exception as e:
         print(f"An error occurred: {e}")
         import traceback
         traceback.print_exc()
-    
+        broken = True
+
     finally:
-        # Close the browser
-        print("\nClosing browser...")
-        driver.quit()
+        # Give the browser back (or close it if it was started just for this run)
+        print("\nReleasing browser..." if browser.pooled else "\nClosing browser...")
+        browser.release(broken=broken)
+
+    return not broken
 
 if __name__ == "__main__":
     scrape_jobs()
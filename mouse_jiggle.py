@@ -1,4 +1,11 @@
+import argparse
+import ctypes
+import platform
+import re
+import shutil
+import subprocess
 import time
+from datetime import datetime
 
 try:
     import pyautogui
@@ -8,7 +15,140 @@ except Exception as import_error:
     raise import_error
 
 
+def get_idle_seconds():
+    """
+    Return how many seconds since the last keyboard/mouse input, or None if unknown.
+
+    Works on Windows (GetLastInputInfo), macOS (ioreg) and Linux with xprintidle installed.
+    """
+    system = platform.system()
+    try:
+        if system == "Windows":
+            class LASTINPUTINFO(ctypes.Structure):
+                _fields_ = [("cbSize", ctypes.c_uint), ("dwTime", ctypes.c_uint)]
+
+            info = LASTINPUTINFO()
+            info.cbSize = ctypes.sizeof(info)
+            if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+                return None
+            millis = (ctypes.windll.kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF
+            return millis / 1000.0
+        if system == "Darwin":
+            output = subprocess.run(["ioreg", "-c", "IOHIDSystem"], capture_output=True, text=True, timeout=5).stdout
+            match = re.search(r'"HIDIdleTime" = (\d+)', output)
+            return int(match.group(1)) / 1e9 if match else None
+        if shutil.which("xprintidle"):
+            output = subprocess.run(["xprintidle"], capture_output=True, text=True, timeout=5).stdout
+            return int(output.strip()) / 1000.0
+    except Exception:
+        return None
+    return None
+
+
+def parse_active_hours(text):
+    """
+    Turn "09:00-18:00" into a pair of datetime.time objects.
+
+    Returns None when text is empty, meaning "always active".
+    """
+    if not text:
+        return None
+    start_text, end_text = text.split("-")
+    start = datetime.strptime(start_text.strip(), "%H:%M").time()
+    end = datetime.strptime(end_text.strip(), "%H:%M").time()
+    return start, end
+
+
+def seconds_until_active(active_hours, now=None):
+    """
+    Return 0 if we are inside the active-hours window, else seconds until it opens.
+
+    Windows that cross midnight (e.g. 22:00-06:00) are supported.
+    """
+    if active_hours is None:
+        return 0
+    now = now or datetime.now()
+    start, end = active_hours
+    current = now.time()
+    if start <= end:
+        inside = start <= current < end
+    else:
+        inside = current >= start or current < end
+    if inside:
+        return 0
+    opens = now.replace(hour=start.hour, minute=start.minute, second=0, microsecond=0)
+    wait = (opens - now).total_seconds()
+    if wait < 0:
+        wait += 24 * 3600
+    return wait
+
+
+def nudge(dx):
+    """Move the mouse a few pixels and straight back, so the pointer ends where it was."""
+    x, y = pyautogui.position()
+    pyautogui.moveTo(x + dx, y)
+    pyautogui.moveTo(x, y)
+
+
+def run_fixed(dx, delay_seconds, active_hours=None):
+    """Original behaviour: nudge every delay_seconds, whether the user is active or not."""
+    toggle = True
+    while True:
+        wait = seconds_until_active(active_hours)
+        if wait > 0:
+            time.sleep(wait)
+            continue
+        # Get current position and nudge slightly left/right to avoid big jumps
+        x, y = pyautogui.position()
+        if toggle:
+            pyautogui.moveTo(x + dx, y)
+        else:
+            pyautogui.moveTo(x - dx, y)
+        toggle = not toggle
+        time.sleep(delay_seconds)
+
+
+def run_idle_aware(dx, idle_threshold, active_hours, min_sleep=1.0, margin=10.0):
+    """
+    Only nudge when the user has been idle for almost idle_threshold seconds.
+
+    Instead of polling on a fixed timer, each sleep lasts until the earliest
+    moment the next nudge could be needed: while the user is working the
+    process sleeps for most of the threshold, and outside active hours it
+    sleeps until the window opens.
+    """
+    # Nudge a little before the computer would go to sleep
+    margin = min(margin, idle_threshold * 0.2)
+    while True:
+        wait = seconds_until_active(active_hours)
+        if wait > 0:
+            print(f"Outside active hours, sleeping {wait / 60:.0f} min.")
+            time.sleep(wait)
+            continue
+
+        idle = get_idle_seconds()
+        if idle is None:
+            print("Could not read the system idle time, falling back to fixed jiggling.")
+            run_fixed(dx, 2, active_hours)
+            return
+
+        remaining = idle_threshold - margin - idle
+        if remaining <= 0:
+            nudge(dx)
+            # The nudge resets the idle timer, so the next one is a full threshold away
+            remaining = idle_threshold - margin
+
+        time.sleep(max(min_sleep, remaining))
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Keep the computer awake by moving the mouse.")
+    parser.add_argument("--idle-threshold", type=float, default=0,
+                        help="Sleep timeout of your computer in seconds; enables idle-aware mode (e.g. 300)")
+    parser.add_argument("--active-hours", default="",
+                        help="Only jiggle during this window, e.g. 09:00-18:00")
+    args = parser.parse_args()
+
     print("Mouse jiggler started. Press Ctrl+C to stop.")
     dx = 10  # small movement in pixels
     delay_seconds = 2  # move every N seconds
@@ -16,25 +156,15 @@ def main():
     # Failsafe: moving mouse to a corner stops pyautogui by default.
     pyautogui.FAILSAFE = True
 
-    toggle = True
-    while True:
-        try:
-            # Get current position and nudge slightly left/right to avoid big jumps
-            x, y = pyautogui.position()
-            if toggle:
-                pyautogui.moveTo(x + dx, y)
-            else:
-                pyautogui.moveTo(x - dx, y)
-            toggle = not toggle
-            time.sleep(delay_seconds)
-        except KeyboardInterrupt:
-            print("\nMouse jiggler stopped.")
-            break
+    try:
+        if args.idle_threshold > 0:
+            print(f"Idle-aware mode: nudging only after ~{args.idle_threshold:.0f} s without input.")
+            run_idle_aware(dx, args.idle_threshold, parse_active_hours(args.active_hours))
+        else:
+            run_fixed(dx, delay_seconds, parse_active_hours(args.active_hours))
+    except KeyboardInterrupt:
+        print("\nMouse jiggler stopped.")
 
 
 if __name__ == "__main__":
     main()
-
-
-
-
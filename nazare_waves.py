@@ -0,0 +1,109 @@
+import time
+
+import numpy as np
+import streamlit as st
+
+from startup_profile import lazy_import
+from wave_forecast import HOUR, NAZARE, WaveForecast, OpenMeteoSource
+
+# Set page configuration
+st.set_page_config(
+    page_title="Nazaré Waves",
+    page_icon="🌊",
+    layout="wide"
+)
+
+st.title("🌊 Wave Height in Nazaré")
+st.caption("Praia do Norte, hourly forecast from Open-Meteo")
+
+
+def setting(name, default):
+    """A value from .streamlit/secrets.toml, or the default if it isn't set there."""
+    try:
+        return st.secrets.get(name, default)
+    except Exception:
+        return default  # No secrets file at all
+
+
+@st.cache_resource
+def get_forecast():
+    """
+    The cached forecast, shared by every viewer of this page.
+
+    Set WAVE_SOURCE = "fake" in secrets to use made-up data (no internet needed).
+    """
+    if setting("WAVE_SOURCE", "open-meteo") == "fake":
+        from fake_waves import FakeMarineSource
+        source = FakeMarineSource()
+    else:
+        source = OpenMeteoSource(*NAZARE)
+    return WaveForecast(source, setting("WAVE_CACHE_PATH", "wave_cache.npz"))
+
+
+forecast = get_forecast()
+
+
+def to_datetimes(hours):
+    return hours.astype("datetime64[s]")
+
+
+@st.fragment(run_every=60)
+def show_waves():
+    """Draw the page from the cache; check once a minute whether a refresh brought new data."""
+    # Never waits for the API: a stale cache is shown while a refresh runs in the background
+    forecast.refresh_in_background()
+    data = forecast.data
+    now = time.time()
+
+    if len(data.hours) == 0:
+        if forecast.last_error:
+            st.error(f"❌ Could not get the forecast: {forecast.last_error}")
+        else:
+            st.info("⏳ Fetching the first forecast... this page updates by itself.")
+        return
+
+    # Current conditions and the next 24 hours
+    current = data.at(now)
+    _, next_day = data.window(now, now + 24 * HOUR)
+    col1, col2, col3, col4 = st.columns(4)
+    if current:
+        col1.metric("Wave height now", f"{current['wave_height']:.1f} m")
+        col2.metric("Period", f"{current['wave_period']:.0f} s")
+        col3.metric("Direction", f"{current['wave_direction']:.0f}°")
+    if next_day.shape[1] and not np.isnan(next_day[0]).all():
+        col4.metric("Highest in next 24 h", f"{np.nanmax(next_day[0]):.1f} m")
+
+    go = lazy_import("plotly.graph_objects")
+
+    # Hourly: the last 3 days and the forecast
+    hours, values = data.window(now - 3 * 24 * HOUR, data.hours[-1])
+    hourly_fig = go.Figure()
+    hourly_fig.add_trace(go.Scatter(x=to_datetimes(hours), y=values[0], name="Wave height", mode="lines"))
+    hourly_fig.add_trace(go.Scatter(x=to_datetimes(hours), y=values[3], name="Swell", mode="lines",
+                                    line=dict(dash="dot")))
+    hourly_fig.add_vline(x=int(now * 1000), line_dash="dash", line_color="gray")
+    hourly_fig.update_layout(title="Hourly wave height (m)", yaxis_title="m", height=380,
+                             margin=dict(l=0, r=0, t=40, b=0))
+    st.plotly_chart(hourly_fig, use_container_width=True)
+
+    # Daily min / mean / max, already summed up when the data was refreshed
+    days = data.days.astype("datetime64[s]")
+    daily_fig = go.Figure()
+    daily_fig.add_trace(go.Bar(x=days, y=data.daily[:, 2] - data.daily[:, 0], base=data.daily[:, 0],
+                               name="Min to max", marker_color="lightblue"))
+    daily_fig.add_trace(go.Scatter(x=days, y=data.daily[:, 1], name="Mean", mode="lines+markers"))
+    daily_fig.update_layout(title="Daily wave height (m)", yaxis_title="m", height=320,
+                            margin=dict(l=0, r=0, t=40, b=0))
+    st.plotly_chart(daily_fig, use_container_width=True)
+
+    # Freshness
+    age = int((now - data.fetched_at) // 60)
+    status = f"Updated {age} min ago"
+    if forecast.refreshing:
+        status += " · 🔄 refreshing..."
+    st.caption(status)
+    if forecast.last_error:
+        st.warning(f"⚠️ Last refresh failed ({forecast.last_error}); showing the cached forecast.")
+
+
+show_waves()
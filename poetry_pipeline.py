@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Quote > Haiku > Image > Email (exercise 03 in 03_integrations.py, Gemini version).
+
+Each poem goes through four stages:
+    1. quote:  a random quote
+    2. haiku:  Gemini writes a haiku about the quote
+    3. image:  Gemini draws the haiku
+    4. email:  the image is emailed with the title "Your AI poetry"
+
+Several poems move through the stages at the same time (asyncio). Each stage
+has its own limit on parallel calls, so a batch takes about as long as its
+slowest stage instead of the sum of all of them.
+
+Every stage's result is saved in poetry_cache/, under a hash of the stage
+and its input. A rerun with the same input skips the finished stages: a
+failed email doesn't cost a new haiku and image, and a poem that was
+already emailed isn't sent again. Emails are remembered per seed, so a new
+run that happens to pick the same quote still sends its own email.
+
+Settings come from environment variables or .streamlit/secrets.toml:
+    GEMINI_API_KEY
+    EMAIL_TO, EMAIL_FROM
+    SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_TLS ("true"/"false")
+
+Examples:
+    python poetry_pipeline.py --count 5
+    python poetry_pipeline.py --count 3 --seed 7          # the same 3 quotes every time
+    python poetry_pipeline.py --offline                   # no API calls, emails saved as .eml files
+
+    # Local SMTP server that prints the emails (pip install aiosmtpd):
+    python -m aiosmtpd -n -l localhost:1025
+    SMTP_HOST=localhost SMTP_PORT=1025 SMTP_TLS=false python poetry_pipeline.py --offline
+"""
+
+import argparse
+import asyncio
+import hashlib
+import html
+import json
+import os
+import random
+import smtplib
+import time
+import tomllib
+from email.message import EmailMessage
+
+import api_metrics
+
+CACHE_DIR = "poetry_cache"
+SUBJECT = "Your AI poetry"
+
+QUOTES = [
+    "The only way to do great work is to love what you do. - Steve Jobs",
+    "In the middle of difficulty lies opportunity. - Albert Einstein",
+    "What we think, we become. - Buddha",
+    "The journey of a thousand miles begins with one step. - Lao Tzu",
+    "Simplicity is the ultimate sophistication. - Leonardo da Vinci",
+    "It always seems impossible until it's done. - Nelson Mandela",
+    "Be yourself; everyone else is already taken. - Oscar Wilde",
+    "Whoever is happy will make others happy too. - Anne Frank",
+    "The best time to plant a tree was 20 years ago. The second best time is now. - Proverb",
+    "Not all those who wander are lost. - J.R.R. Tolkien",
+    "Happiness depends upon ourselves. - Aristotle",
+    "Turn your wounds into wisdom. - Oprah Winfrey",
+    "The sea, once it casts its spell, holds one in its net of wonder forever. - Jacques Cousteau",
+    "Knowing yourself is the beginning of all wisdom. - Aristotle",
+    "Well done is better than well said. - Benjamin Franklin",
+    "Dwell on the beauty of life. Watch the stars, and see yourself running with them. - Marcus Aurelius",
+]
+
+
+def load_settings(path=os.path.join(".streamlit", "secrets.toml")):
+    """Settings from .streamlit/secrets.toml, overridden by environment variables."""
+    settings = {}
+    try:
+        with open(path, "rb") as f:
+            settings.update(tomllib.load(f))
+    except (OSError, tomllib.TOMLDecodeError):
+        pass
+    for name in ("GEMINI_API_KEY", "EMAIL_TO", "EMAIL_FROM", "SMTP_HOST", "SMTP_PORT",
+                 "SMTP_USER", "SMTP_PASSWORD", "SMTP_TLS"):
+        if name in os.environ:
+            settings[name] = os.environ[name]
+    return settings
+
+
+# --- Cache ------------------------------------------------------------------
+
+class StageCache:
+    """Stage results on disk, stored under a hash of what produced them."""
+
+    def __init__(self, folder=CACHE_DIR):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def key(self, stage, version, value):
+        data = json.dumps([stage, version, value], sort_keys=True, ensure_ascii=False)
+        return f"{stage}-{hashlib.sha256(data.encode('utf-8')).hexdigest()[:32]}"
+
+    def get(self, key):
+        try:
+            with open(os.path.join(self.folder, key + ".json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, value):
+        # Write next to it, then swap, so a crash never leaves half a file
+        path = os.path.join(self.folder, key + ".json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    def put_bytes(self, data, extension):
+        """Save bytes under their own hash (images); returns the file name."""
+        name = f"{hashlib.sha256(data).hexdigest()[:32]}.{extension}"
+        path = os.path.join(self.folder, name)
+        if not os.path.exists(path):
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        return name
+
+    def get_bytes(self, name):
+        with open(os.path.join(self.folder, name), "rb") as f:
+            return f.read()
+
+
+# --- Stages -----------------------------------------------------------------
+
+class Stage:
+    """
+    One step of the pipeline.
+
+    Args:
+        name: Used in cache keys and progress output
+        run: async function(value) -> JSON-able result
+        parallel: How many items this stage works on at the same time
+        version: Change it when `run` changes, so old cached results aren't used
+        inputs: Names of the earlier results it needs, passed as a dictionary;
+            None means just the previous stage's result
+    """
+
+    def __init__(self, name, run, parallel=2, version=1, inputs=None):
+        self.name = name
+        self.run = run
+        self.parallel = parallel
+        self.version = version
+        self.inputs = inputs
+
+
+def pick_quote(seed):
+    return random.Random(seed).choice(QUOTES)
+
+
+def gemini_haiku_writer(api_key, model_name="gemini-2.5-flash"):
+    """Stage function: quote -> haiku text, written by Gemini."""
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel(model_name)
+
+    def write(quote):
+        prompt = (f'Write one haiku (5-7-5 syllables, three lines) inspired by this quote:\n"{quote}"\n'
+                  "Return only the three lines of the haiku.")
+        with api_metrics.track_call("gemini", "generate_content", len(prompt.encode("utf-8"))) as call:
+            response = model.generate_content(prompt)
+            call["response_bytes"] = len(response.text.encode("utf-8"))
+        return response.text.strip().strip("`").strip()
+
+    async def run(quote):
+        # The SDK blocks, so it runs in a thread while other poems keep moving
+        return await asyncio.to_thread(write, quote)
+    return run
+
+
+def gemini_image_maker(api_key, cache, model_name="gemini-2.5-flash-image"):
+    """
+    Stage function: haiku -> image file in the cache, drawn by Gemini.
+
+    Image output needs the newer Gemini SDK (pip install google-genai).
+    """
+    try:
+        from google import genai
+    except ImportError as e:
+        raise RuntimeError("Gemini images need the google-genai package: pip install google-genai") from e
+    client = genai.Client(api_key=api_key)
+
+    def draw(haiku):
+        prompt = f"A calm, beautiful illustration for this haiku, without any text:\n{haiku}"
+        with api_metrics.track_call("gemini", "generate_image", len(prompt.encode("utf-8"))) as call:
+            response = client.models.generate_content(model=model_name, contents=prompt)
+            for part in response.candidates[0].content.parts:
+                if part.inline_data is not None:
+                    call["response_bytes"] = len(part.inline_data.data)
+                    extension = part.inline_data.mime_type.split("/")[-1]
+                    return {"file": cache.put_bytes(part.inline_data.data, extension),
+                            "mime": part.inline_data.mime_type}
+        raise RuntimeError("Gemini returned no image")
+
+    async def run(haiku):
+        return await asyncio.to_thread(draw, haiku)
+    return run
+
+
+def offline_haiku_writer(quote):
+    """Stand-in for Gemini: three short lines from the quote's own words."""
+    words = quote.split(" - ")[0].replace(",", "").replace(".", "").split()
+    lines = [" ".join(words[0:3]), " ".join(words[3:7]), " ".join(words[7:10]) or "and so it goes"]
+    return "\n".join(line.lower() for line in lines if line)
+
+
+def offline_image_maker(cache):
+    """Stand-in for Gemini: the haiku drawn as an SVG card."""
+    async def run(haiku):
+        lines = "".join(f'<text x="40" y="{110 + 50 * i}">{html.escape(line)}</text>'
+                        for i, line in enumerate(haiku.splitlines()))
+        svg = ('<svg xmlns="http://www.w3.org/2000/svg" width="640" height="320">'
+               '<rect width="100%" height="100%" fill="#1d3557"/>'
+               f'<g fill="#f1faee" font-family="Georgia" font-size="28">{lines}</g></svg>')
+        return {"file": cache.put_bytes(svg.encode("utf-8"), "svg"), "mime": "image/svg+xml"}
+    return run
+
+
+# --- Email ------------------------------------------------------------------
+
+class SmtpMailer:
+    """Sends through an SMTP server (Gmail, or a local debugging server)."""
+
+    def __init__(self, host, port=587, user=None, password=None, tls=True):
+        self.host = host
+        self.port = int(port)
+        self.user = user
+        self.password = password
+        self.tls = tls
+
+    def send(self, message):
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            if self.tls:
+                smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password)
+            smtp.send_message(message)
+        return f"smtp://{self.host}:{self.port}"
+
+
+class FileMailer:
+    """Saves emails as .eml files instead of sending them (open them with any mail program)."""
+
+    def __init__(self, folder="outbox"):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def send(self, message):
+        path = os.path.join(self.folder, f"{int(time.time() * 1000)}-{random.randrange(10**6)}.eml")
+        with open(path, "wb") as f:
+            f.write(message.as_bytes())
+        return path
+
+
+def mailer_from_settings(settings, offline=False):
+    """SMTP if SMTP_HOST is set; otherwise .eml files in outbox/ (offline) or an error."""
+    if settings.get("SMTP_HOST"):
+        return SmtpMailer(settings["SMTP_HOST"], settings.get("SMTP_PORT", 587),
+                          settings.get("SMTP_USER"), settings.get("SMTP_PASSWORD"),
+                          str(settings.get("SMTP_TLS", "true")).lower() != "false")
+    if offline:
+        return FileMailer()
+    raise RuntimeError("Set SMTP_HOST (and EMAIL_TO) to send emails, or use --offline")
+
+
+def email_sender(mailer, cache, to_address, from_address):
+    """Stage function: the finished poem -> email receipt."""
+    def send(poem):
+        message = EmailMessage()
+        message["Subject"] = SUBJECT
+        message["From"] = from_address
+        message["To"] = to_address
+        message.set_content(f"{poem['haiku']}\n\nInspired by: {poem['quote']}\n")
+        maintype, subtype = poem["image"]["mime"].split("/", 1)
+        message.add_attachment(cache.get_bytes(poem["image"]["file"]), maintype=maintype,
+                               subtype=subtype, filename=f"poem.{poem['image']['file'].rsplit('.', 1)[-1]}")
+        return {"sent_to": to_address, "via": mailer.send(message)}
+
+    async def run(poem):
+        return await asyncio.to_thread(send, poem)
+    return run
+
+
+# --- Pipeline ---------------------------------------------------------------
+
+async def run_pipeline(seeds, stages, cache, on_progress=None):
+    """
+    Send every seed through all stages, many at the same time.
+
+    A stage's result is stored in the poem under the stage's name. The
+    stage's input (the previous result, or the fields in `inputs`) is also
+    its cache key, so the same input never runs the same stage twice.
+
+    Returns:
+        List of (poem dictionary, error or None), in the order of the seeds
+    """
+    limits = {stage.name: asyncio.Semaphore(stage.parallel) for stage in stages}
+
+    async def process(seed):
+        poem = {"seed": seed}
+        previous = "seed"
+        for stage in stages:
+            value = poem[previous] if stage.inputs is None else {name: poem[name] for name in stage.inputs}
+            key = cache.key(stage.name, stage.version, value)
+            result = cache.get(key)
+            if result is None:
+                async with limits[stage.name]:
+                    try:
+                        result = await stage.run(value)
+                    except Exception as e:
+                        return poem, f"{stage.name}: {e}"
+                cache.put(key, result)
+                if on_progress:
+                    on_progress(seed, stage.name, False)
+            elif on_progress:
+                on_progress(seed, stage.name, True)
+            poem[stage.name] = result
+            previous = stage.name
+        return poem, None
+
+    return await asyncio.gather(*(process(seed) for seed in seeds))
+
+
+def build_stages(settings, cache, offline=False, parallel=4):
+    if offline:
+        haiku = Stage("haiku", lambda quote: asyncio.to_thread(offline_haiku_writer, quote), parallel, version="offline")
+        image = Stage("image", offline_image_maker(cache), parallel, version="offline")
+    else:
+        if not settings.get("GEMINI_API_KEY"):
+            raise RuntimeError("GEMINI_API_KEY is not set (or use --offline)")
+        haiku = Stage("haiku", gemini_haiku_writer(settings["GEMINI_API_KEY"]), parallel)
+        image = Stage("image", gemini_image_maker(settings["GEMINI_API_KEY"], cache), parallel)
+
+    async def quote(seed):
+        return pick_quote(seed)
+
+    to_address = settings.get("EMAIL_TO") or "me@localhost"
+    from_address = settings.get("EMAIL_FROM") or settings.get("SMTP_USER") or "poetry@localhost"
+    email = Stage("email", email_sender(mailer_from_settings(settings, offline), cache, to_address, from_address),
+                  parallel=2, inputs=["seed", "quote", "haiku", "image"])
+    return [Stage("quote", quote, parallel), haiku, image, email]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quote > Gemini haiku > image > email, for several poems at once.")
+    parser.add_argument("--count", type=int, default=1, help="Number of poems (default: 1)")
+    parser.add_argument("--seed", type=int, help="Pick the same quotes every time (reruns use the cache)")
+    parser.add_argument("--parallel", type=int, default=4, help="Calls at the same time per stage (default: 4)")
+    parser.add_argument("--offline", action="store_true", help="No API calls; emails go to outbox/ unless SMTP_HOST is set")
+    args = parser.parse_args()
+
+    settings = load_settings()
+    cache = StageCache()
+    try:
+        stages = build_stages(settings, cache, args.offline, args.parallel)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return
+
+    base = args.seed if args.seed is not None else random.randrange(10**9)
+    seeds = [base + i for i in range(args.count)]
+
+    sent = set()  # Seeds whose email went out in this run (not from the cache)
+
+    def on_progress(seed, stage, cached):
+        print(f"  poem {seed - base + 1}: {stage} {'(cached)' if cached else 'done'}")
+        if stage == "email" and not cached:
+            sent.add(seed)
+
+    start = time.perf_counter()
+    results = asyncio.run(run_pipeline(seeds, stages, cache, on_progress))
+    finished = sum(1 for _, error in results if error is None)
+    print(f"\n✅ {len(sent)} of {len(results)} poems emailed in {time.perf_counter() - start:.1f} s")
+    if finished > len(sent):
+        print(f"ℹ️ {finished - len(sent)} were already emailed in an earlier run with the same seed")
+    for poem, error in results:
+        if error:
+            print(f"❌ Poem for seed {poem['seed']} stopped at {error} (rerun to retry from there)")
+
+
+if __name__ == "__main__":
+    main()
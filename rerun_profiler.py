@@ -0,0 +1,212 @@
+"""
+Opt-in profiling of Streamlit reruns.
+
+Times named sections of a script on every rerun, keeps a rolling history per
+session, and can take a sampling-profiler snapshot of one rerun on demand.
+
+Usage in a page:
+    profiler = RerunProfiler(enabled=st.session_state.get("profiling", False))
+    ...build the sidebar...
+    profiler.lap("sidebar")          # time since the previous lap
+    with profiler.section("sheets_io"):
+        ...                          # time of this block (also counted in its lap)
+    profiler.finish()
+    render_profiling_panel()
+"""
+
+import csv
+import io
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import streamlit as st
+
+# How many reruns / snapshots each session keeps
+HISTORY_SIZE = 200
+SNAPSHOTS_KEPT = 5
+
+
+class SamplingProfiler:
+    """
+    Looks at one thread's call stack every few milliseconds and counts the stacks.
+
+    Cheap enough to leave on for a whole rerun, and it sees time spent inside
+    C extensions (pandas, plotly) that timers around our own code can't split up.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.counts
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+
+def collapsed_stacks(counts):
+    """Snapshot in the 'collapsed stack' format that flamegraph tools read."""
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+def top_functions(counts, limit=15):
+    """Functions where most samples ended (self time), as (name, samples) pairs."""
+    leaves = Counter()
+    for stack, count in counts.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    return leaves.most_common(limit)
+
+
+class RerunProfiler:
+    """
+    Times sections of one rerun of a Streamlit script.
+
+    When disabled, section() returns a do-nothing context manager, so the
+    profiling calls can stay in the page at almost no cost.
+    """
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.sampler = None
+        if not enabled:
+            return
+
+        history = st.session_state.setdefault("rerun_history", deque(maxlen=HISTORY_SIZE))
+        # A rerun that ended early (st.rerun() or an error) never reached finish();
+        # keep what was measured until then
+        unfinished = st.session_state.pop("rerun_in_progress", None)
+        if unfinished is not None:
+            unfinished["interrupted"] = True
+            history.append(unfinished)
+
+        # Same for a sampling profile that was still running
+        old_sampler = st.session_state.pop("active_sampler", None)
+        if old_sampler is not None:
+            old_sampler.stop()
+
+        self.start = time.perf_counter()
+        self.last_lap = self.start
+        self.record = {
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "total_ms": 0.0,
+            "interrupted": False,
+            "sections": {},
+        }
+        st.session_state.rerun_in_progress = self.record
+
+        if st.session_state.pop("profile_next_rerun", False):
+            self.sampler = SamplingProfiler(threading.get_ident())
+            self.sampler.start()
+            st.session_state.active_sampler = self.sampler
+
+    def lap(self, name):
+        """Add the time since the previous lap (or the start) to section `name`."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        sections = self.record["sections"]
+        sections[name] = sections.get(name, 0.0) + (now - self.last_lap) * 1000
+        self.record["total_ms"] = (now - self.start) * 1000
+        self.last_lap = now
+
+    def section(self, name):
+        """Context manager that adds the time of its block to section `name`."""
+        if not self.enabled:
+            return nullcontext()
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            sections = self.record["sections"]
+            sections[name] = sections.get(name, 0.0) + (now - start) * 1000
+            self.record["total_ms"] = (now - self.start) * 1000
+
+    def finish(self):
+        """Close this rerun's record and store it in the session history."""
+        if not self.enabled:
+            return
+        self.record["total_ms"] = (time.perf_counter() - self.start) * 1000
+        st.session_state.pop("rerun_in_progress", None)
+        st.session_state.rerun_history.append(self.record)
+
+        if self.sampler is not None:
+            st.session_state.pop("active_sampler", None)
+            counts = self.sampler.stop()
+            snapshots = st.session_state.setdefault("profile_snapshots", deque(maxlen=SNAPSHOTS_KEPT))
+            snapshots.append({
+                "started": self.record["started"],
+                "samples": self.sampler.samples,
+                "counts": counts,
+            })
+
+
+def history_csv(history):
+    """Rerun history as CSV text: one row per rerun, one column per section."""
+    section_names = sorted({name for record in history for name in record["sections"]})
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["started", "total_ms", "interrupted"] + section_names)
+    for record in history:
+        writer.writerow(
+            [record["started"], f"{record['total_ms']:.2f}", record["interrupted"]]
+            + [f"{record['sections'].get(name, 0.0):.2f}" for name in section_names]
+        )
+    return output.getvalue()
+
+
+def render_profiling_panel():
+    """Show the last rerun's sections, the history and the sampling snapshots."""
+    history = list(st.session_state.get("rerun_history", []))
+    with st.expander("🔬 Rerun profile"):
+        if history:
+            last = history[-1]
+            st.write(f"Last rerun: {last['total_ms']:.1f} ms" + (" (interrupted)" if last["interrupted"] else ""))
+            for name, ms in sorted(last["sections"].items(), key=lambda item: item[1], reverse=True):
+                st.write(f"• {name}: {ms:.1f} ms")
+            st.line_chart([record["total_ms"] for record in history])
+            st.download_button("Download rerun history (CSV)", history_csv(history), file_name="rerun_history.csv")
+        else:
+            st.write("The profile shows up from the next rerun.")
+
+        if st.button("📸 Take a sampling profile of the next rerun"):
+            st.session_state.profile_next_rerun = True
+            st.rerun()
+
+        snapshots = list(st.session_state.get("profile_snapshots", []))
+        if snapshots:
+            latest = snapshots[-1]
+            st.write(f"Snapshot from {latest['started']} ({latest['samples']} samples), busiest functions:")
+            for name, count in top_functions(latest["counts"]):
+                st.write(f"• `{name}`: {count}")
+            st.download_button("Download snapshot (collapsed stacks)", collapsed_stacks(latest["counts"]),
+                               file_name="rerun_profile.folded")
@@ -0,0 +1,177 @@
+"""
+Keep the memory of all expense-app sessions within a budget.
+
+Every open tab of expenses_list.py holds its own expense list, index and
+category model. This module:
+    - estimates how much memory each session's data takes
+    - unloads the data of sessions nobody has used for a while, and of the
+      least recently used sessions when all of them together go over the budget
+    - keeps one shared copy of the last unloaded list, so a session that comes
+      back is filled again from memory (plus the change feed) instead of storage
+
+The page does the unloading itself: its periodic fragment asks
+should_evict() and, if so, drops its data. The next time the user does
+anything, the data is loaded again before the page is drawn.
+
+Example:
+    budget = SessionBudget(max_bytes=512 * 1024 * 1024, idle_seconds=900)
+    budget.touch(session_id, estimate_size(data), active=True)
+    if budget.should_evict(session_id):
+        ...
+"""
+
+import sys
+import threading
+import time
+
+# Sessions that haven't checked in for this long are closed tabs; they stop counting
+GONE_AFTER = 10 * 60
+# Never unload a session the user touched this recently, even over budget
+PROTECTED_SECONDS = 60
+
+
+def estimate_size(obj, sample=100, _seen=None):
+    """
+    Approximate memory of an object and what it refers to, in bytes.
+
+    Large lists are measured from a sample of their items, so this stays fast
+    for 100k expenses. Objects shared by several sessions are counted fully
+    by each of them.
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    # numpy arrays are recognized without importing numpy, which is slow to load
+    if type(obj).__module__ == "numpy" and hasattr(obj, "nbytes"):
+        return sys.getsizeof(obj) if obj.base is None else obj.nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        items = list(obj.items())
+        picked = items[:: max(1, len(items) // sample)]
+        measured = sum(estimate_size(k, sample, seen) + estimate_size(v, sample, seen) for k, v in picked)
+        return size + measured * len(items) // max(1, len(picked))
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        items = list(obj)
+        picked = items[:: max(1, len(items) // sample)]
+        measured = sum(estimate_size(item, sample, seen) for item in picked)
+        return size + measured * len(items) // max(1, len(picked))
+    if hasattr(obj, "__dict__"):
+        return size + estimate_size(vars(obj), sample, seen)
+    return size
+
+
+class SessionBudget:
+    """
+    Memory use and last activity of every session, shared by all of them.
+
+    Args:
+        max_bytes: Memory all sessions' data may take together
+        idle_seconds: A session unused for this long gives its data back
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024, idle_seconds=15 * 60):
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.sessions = {}  # session id -> {"bytes", "active_at", "seen_at"}
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def touch(self, session_id, nbytes=None, active=False, now=None):
+        """
+        Record that a session is still open.
+
+        Args:
+            nbytes: Its current data size, if it was measured
+            active: The user did something (not just a timed refresh)
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            entry = self.sessions.setdefault(session_id, {"bytes": 0, "active_at": now, "seen_at": now})
+            entry["seen_at"] = now
+            if active:
+                entry["active_at"] = now
+            if nbytes is not None:
+                entry["bytes"] = nbytes
+            # Closed tabs don't check in any more
+            for other in [s for s, e in self.sessions.items() if now - e["seen_at"] > GONE_AFTER]:
+                del self.sessions[other]
+
+    def total_bytes(self):
+        with self.lock:
+            return sum(e["bytes"] for e in self.sessions.values())
+
+    def should_evict(self, session_id, now=None):
+        """
+        True if this session should unload its data: it is idle, or it is one
+        of the least recently used sessions that must go to get under budget.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is None or entry["bytes"] == 0:
+                return False
+            idle_for = now - entry["active_at"]
+            if idle_for > self.idle_seconds:
+                return True
+            if idle_for < PROTECTED_SECONDS:
+                return False
+            # Over budget: unload least recently used sessions first, until it fits
+            excess = sum(e["bytes"] for e in self.sessions.values()) - self.max_bytes
+            for other, other_entry in sorted(self.sessions.items(), key=lambda item: item[1]["active_at"]):
+                if excess <= 0:
+                    return False
+                if other_entry["bytes"] == 0 or now - other_entry["active_at"] < PROTECTED_SECONDS:
+                    continue
+                if other == session_id:
+                    return True
+                excess -= other_entry["bytes"]
+            return False
+
+    def evicted(self, session_id):
+        """Record that a session unloaded its data."""
+        with self.lock:
+            if session_id in self.sessions:
+                self.sessions[session_id]["bytes"] = 0
+            self.evictions += 1
+
+    def status(self):
+        with self.lock:
+            return {
+                "sessions": len(self.sessions),
+                "loaded": sum(1 for e in self.sessions.values() if e["bytes"]),
+                "bytes": sum(e["bytes"] for e in self.sessions.values()),
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+
+class SharedSnapshot:
+    """
+    The most recent expense list an unloading session gave back, with the
+    change feed version it is up to date with.
+
+    Expense dictionaries are never changed after they are made, so sessions
+    filled from the snapshot share them and only pay for their own list.
+    """
+
+    def __init__(self):
+        self.expenses = None
+        self.version = -1
+        self.lock = threading.Lock()
+
+    def put(self, expenses, version):
+        with self.lock:
+            if version >= self.version:
+                self.expenses = list(expenses)
+                self.version = version
+
+    def get(self):
+        """(copy of the list, version), or (None, -1) if nothing was given back yet."""
+        with self.lock:
+            if self.expenses is None:
+                return None, -1
+            return list(self.expenses), self.version
@@ -0,0 +1,489 @@
+"""
+Time-partitioned storage of expenses in Google Sheets.
+
+Instead of one ever-growing "Sheet1", expenses are split into one tab per year
+("Expenses 2024") or per month ("Expenses 2024-03"). A small "Partitions" tab
+(the manifest) lists every partition and where it lives:
+
+    Partition | Spreadsheet ID | Tab
+    2024      |                | Expenses 2024
+    2023      | 1AbC...        | Expenses 2023     <- moved to an archive spreadsheet
+
+An empty Spreadsheet ID means the main spreadsheet, so an old partition can be
+moved to another spreadsheet by moving its tab and filling in the ID.
+
+Writes go straight to the partition of the expense's date (one append, plus a
+one-time tab creation for a new period). Loads read only the partitions that
+cover the requested months; older ones can be read later in the background.
+
+Rows still in the old "Sheet1" are treated as the oldest partition ("legacy")
+until they are moved with:
+    python sheet_partitions.py migrate SPREADSHEET_ID --scheme year
+
+Every function also accepts scheme="none", which keeps the single-tab layout,
+so the page can call this module whatever the configuration.
+"""
+
+import argparse
+import calendar
+import threading
+import time
+from datetime import date, timedelta
+
+import google_sheets_helper as sheets
+import sheets_scheduler
+from expense_index import parse_date
+from googleapiclient.errors import HttpError
+
+SCHEMES = ("none", "year", "month")
+MANIFEST_TAB = "Partitions"
+LEGACY = "legacy"
+HEADERS = ['Date', 'Item', 'Amount', 'Category', 'Timestamp']
+
+# How long a loaded manifest is trusted before it is read again (other
+# sessions or processes may have added partitions)
+MANIFEST_TTL = 300
+
+_lock = threading.Lock()
+# spreadsheet_id -> (loaded_at, {partition_key: (spreadsheet_id, tab)})
+_manifests = {}
+
+
+# --- Partition keys ---------------------------------------------------------
+
+def partition_key(date_text, scheme):
+    """
+    Partition an expense date belongs to: "2024" (year) or "2024-03" (month).
+
+    Returns None if the date can't be read.
+    """
+    day = parse_date(date_text)
+    if day is None:
+        return None
+    return f"{day.year:04d}" if scheme == "year" else f"{day.year:04d}-{day.month:02d}"
+
+
+def partition_tab(key):
+    return f"Expenses {key}"
+
+
+def partition_bounds(key):
+    """(first_day, last_day) covered by a partition key."""
+    if key == LEGACY:
+        return date.min, date.max
+    if len(key) == 4:
+        year = int(key)
+        return date(year, 1, 1), date(year, 12, 31)
+    year, month = int(key[:4]), int(key[5:7])
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+# --- Manifest ---------------------------------------------------------------
+
+def read_manifest(service, spreadsheet_id):
+    """Read the Partitions tab as {key: (spreadsheet_id, tab)} (empty if there is none)."""
+    try:
+        result = sheets_scheduler.execute(service.spreadsheets().values().get(
+            spreadsheetId=spreadsheet_id,
+            range=sheets.a1(MANIFEST_TAB, 'A2:C'),
+            fields='values'
+        ), 'values.get')
+    except HttpError as error:
+        # 400 "Unable to parse range": no partition was created yet
+        if getattr(error.resp, 'status', None) == 400:
+            return {}
+        raise
+
+    entries = {}
+    for row in result.get('values', []):
+        if not row or not str(row[0]).strip():
+            continue
+        key = str(row[0]).strip()
+        location = str(row[1]).strip() if len(row) > 1 and str(row[1]).strip() else spreadsheet_id
+        tab = str(row[2]).strip() if len(row) > 2 and str(row[2]).strip() else partition_tab(key)
+        entries[key] = (location, tab)
+    return entries
+
+
+def get_manifest(service, spreadsheet_id, refresh=False):
+    """The manifest of a spreadsheet, cached for MANIFEST_TTL seconds."""
+    with _lock:
+        cached = _manifests.get(spreadsheet_id)
+    if cached and not refresh and time.monotonic() - cached[0] < MANIFEST_TTL:
+        return cached[1]
+    entries = read_manifest(service, spreadsheet_id)
+    with _lock:
+        _manifests[spreadsheet_id] = (time.monotonic(), entries)
+    return entries
+
+
+def add_tab(service, spreadsheet_id, title):
+    """Create a tab; an already existing tab with this title is fine."""
+    body = {'requests': [{'addSheet': {'properties': {'title': title}}}]}
+    try:
+        sheets_scheduler.execute(service.spreadsheets().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body=body
+        ), 'spreadsheets.batchUpdate', body)
+    except HttpError as error:
+        if 'already exists' not in str(error):
+            raise
+
+
+def write_headers(service, spreadsheet_id, title, headers):
+    body = {'values': [headers]}
+    sheets_scheduler.execute(service.spreadsheets().values().update(
+        spreadsheetId=spreadsheet_id,
+        range=sheets.a1(title, 'A1'),
+        valueInputOption='RAW',
+        body=body
+    ), 'values.update', body)
+
+
+def ensure_partition(service, spreadsheet_id, key):
+    """
+    Location of a partition, creating its tab and manifest row the first time.
+
+    Returns:
+        Tuple of (spreadsheet_id, tab)
+    """
+    entries = get_manifest(service, spreadsheet_id)
+    if key in entries:
+        return entries[key]
+
+    # Another session may have created it since we last looked
+    entries = get_manifest(service, spreadsheet_id, refresh=True)
+    if key in entries:
+        return entries[key]
+
+    if not entries:
+        add_tab(service, spreadsheet_id, MANIFEST_TAB)
+        write_headers(service, spreadsheet_id, MANIFEST_TAB, ['Partition', 'Spreadsheet ID', 'Tab'])
+
+    tab = partition_tab(key)
+    add_tab(service, spreadsheet_id, tab)
+    write_headers(service, spreadsheet_id, tab, HEADERS)
+    sheets_scheduler.append(service, spreadsheet_id, sheets.a1(MANIFEST_TAB, 'A:C'), [[key, '', tab]],
+                            value_input_option='RAW')
+
+    with _lock:
+        entries = dict(entries)
+        entries[key] = (spreadsheet_id, tab)
+        _manifests[spreadsheet_id] = (time.monotonic(), entries)
+    return spreadsheet_id, tab
+
+
+def locate(service, spreadsheet_id, expense, scheme):
+    """Where an existing expense should be: its partition, or "Sheet1" for legacy rows."""
+    key = partition_key(expense.get('Date'), scheme)
+    entries = get_manifest(service, spreadsheet_id)
+    if key in entries:
+        return entries[key]
+    return spreadsheet_id, sheets.DEFAULT_SHEET
+
+
+# --- Reads ------------------------------------------------------------------
+
+def ordered_locations(spreadsheet_id, entries, keys):
+    """(spreadsheet_id, tab) of keys in date order, with the legacy tab first."""
+    locations = []
+    for key in sorted(keys, key=lambda k: (k != LEGACY, k)):
+        locations.append((spreadsheet_id, sheets.DEFAULT_SHEET) if key == LEGACY else entries[key])
+    return locations
+
+
+def read_locations(service, locations, priority=sheets_scheduler.INTERACTIVE):
+    """
+    Read whole partitions, with one values.batchGet per spreadsheet.
+
+    Returns:
+        List of expenses in the order of locations
+    """
+    by_spreadsheet = {}
+    for spreadsheet_id, tab in locations:
+        by_spreadsheet.setdefault(spreadsheet_id, []).append(tab)
+
+    rows_by_location = {}
+    for spreadsheet_id, tabs in by_spreadsheet.items():
+        result = sheets_scheduler.execute(service.spreadsheets().values().batchGet(
+            spreadsheetId=spreadsheet_id,
+            ranges=[sheets.a1(tab, 'A2:E') for tab in tabs],
+            valueRenderOption=sheets.TYPED_READ['valueRenderOption'],
+            dateTimeRenderOption=sheets.TYPED_READ['dateTimeRenderOption'],
+            fields='valueRanges.values'
+        ), 'values.batchGet', priority=priority)
+        for tab, value_range in zip(tabs, result.get('valueRanges', [])):
+            rows_by_location[(spreadsheet_id, tab)] = value_range.get('values', [])
+
+    expenses = []
+    for location in locations:
+        expenses.extend(sheets.rows_to_expenses(rows_by_location.get(location, [])))
+    return expenses
+
+
+def load_recent_expenses(spreadsheet_id, scheme, months=3):
+    """
+    Load the partitions that cover the last `months` months.
+
+    Args:
+        spreadsheet_id: The ID of the main Google Sheet
+        scheme: "none", "year" or "month"
+        months: How many months of history to load now
+
+    Returns:
+        Tuple of (success, expenses_or_error_message, older). Pass `older` to
+        load_older_expenses() to get the rest, or it is None if nothing is left.
+    """
+    if scheme == "none":
+        return sheets.load_recent_expenses(spreadsheet_id, months)
+
+    try:
+        service = sheets.get_google_sheets_service()
+        entries = get_manifest(service, spreadsheet_id, refresh=True)
+        cutoff = date.today() - timedelta(days=31 * months)
+        recent = [key for key in entries if partition_bounds(key)[1] >= cutoff]
+        older = [key for key in entries if key not in recent] + [LEGACY]
+        expenses = read_locations(service, ordered_locations(spreadsheet_id, entries, recent))
+        return True, expenses, older
+
+    except HttpError as error:
+        return False, f"Google Sheets error: {error}", None
+    except Exception as error:
+        return False, f"Error loading expenses: {error}", None
+
+
+def load_older_expenses(spreadsheet_id, scheme, older, priority=sheets_scheduler.BACKGROUND):
+    """
+    Load what load_recent_expenses() left out.
+
+    Returns:
+        Tuple of (success, data_or_error_message)
+    """
+    if scheme == "none":
+        return sheets.load_expenses_from_sheet(spreadsheet_id, last_row=older, priority=priority)
+
+    try:
+        service = sheets.get_google_sheets_service()
+        entries = get_manifest(service, spreadsheet_id)
+        keys = [key for key in older if key == LEGACY or key in entries]
+        return True, read_locations(service, ordered_locations(spreadsheet_id, entries, keys), priority)
+
+    except HttpError as error:
+        return False, f"Google Sheets error: {error}"
+    except Exception as error:
+        return False, f"Error loading expenses: {error}"
+
+
+def iter_expenses(spreadsheet_id, scheme, start=None, end=None, categories=None, chunk_size=1000):
+    """
+    Yield expenses in lists of up to chunk_size, reading one page of rows at a time.
+
+    Only partitions that overlap start..end are read (plus the legacy tab),
+    at background priority so the app's own requests go first.
+    """
+    service = sheets.get_google_sheets_service()
+    if scheme == "none":
+        locations = [(spreadsheet_id, sheets.DEFAULT_SHEET)]
+    else:
+        entries = get_manifest(service, spreadsheet_id, refresh=True)
+        keys = [LEGACY] + [
+            key for key in entries
+            if (start is None or partition_bounds(key)[1] >= start) and (end is None or partition_bounds(key)[0] <= end)
+        ]
+        locations = ordered_locations(spreadsheet_id, entries, keys)
+
+    for location, tab in locations:
+        first_row = 2
+        while True:
+            last_row = first_row + chunk_size - 1
+            result = sheets_scheduler.execute(service.spreadsheets().values().get(
+                spreadsheetId=location,
+                range=sheets.a1(tab, f"A{first_row}:E{last_row}"),
+                **sheets.TYPED_READ
+            ), 'values.get', priority=sheets_scheduler.BACKGROUND)
+            rows = result.get('values', [])
+            chunk = [
+                expense for expense in sheets.rows_to_expenses(rows)
+                if (start is None or expense['Date'] >= str(start))
+                and (end is None or expense['Date'] <= str(end))
+                and (not categories or expense['Category'] in categories)
+            ]
+            if chunk:
+                yield chunk
+            # Sheets leaves out trailing empty rows, so a short page is the last one
+            if len(rows) < chunk_size:
+                break
+            first_row = last_row + 1
+
+
+# --- Writes -----------------------------------------------------------------
+
+def append_expense(spreadsheet_id, expense, scheme):
+    """
+    Append an expense to the partition of its date.
+
+    Returns:
+        Tuple of (success, message)
+    """
+    if scheme == "none":
+        sheets.setup_sheet_headers(spreadsheet_id)
+        return sheets.append_expense_to_sheet(spreadsheet_id, expense)
+
+    key = partition_key(expense.get('Date'), scheme)
+    if key is None:
+        # Without a readable date there is no partition; keep it with the legacy rows
+        return sheets.append_expense_to_sheet(spreadsheet_id, expense)
+    try:
+        service = sheets.get_google_sheets_service()
+        location, tab = ensure_partition(service, spreadsheet_id, key)
+    except Exception as error:
+        return False, f"Error preparing partition {key}: {error}"
+    return sheets.append_expense_to_sheet(location, expense, sheet_title=tab)
+
+
+def append_expenses(spreadsheet_id, expenses, scheme):
+    """
+    Append many expenses, with one bulk append per partition.
+
+    Returns:
+        Tuple of (success, message)
+    """
+    if scheme == "none":
+        sheets.setup_sheet_headers(spreadsheet_id)
+        return sheets.append_expenses_to_sheet(spreadsheet_id, expenses)
+
+    groups = {}
+    for expense in expenses:
+        groups.setdefault(partition_key(expense.get('Date'), scheme), []).append(expense)
+    try:
+        service = sheets.get_google_sheets_service()
+        for key in sorted(groups, key=lambda k: (k is not None, k)):
+            if key is None:
+                location, tab = spreadsheet_id, sheets.DEFAULT_SHEET
+            else:
+                location, tab = ensure_partition(service, spreadsheet_id, key)
+            success, message = sheets.append_expenses_to_sheet(location, groups[key], sheet_title=tab)
+            if not success:
+                return False, f"{tab}: {message}"
+    except Exception as error:
+        return False, f"Error writing partitions: {error}"
+    return True, f"{len(expenses)} expenses added to {len(groups)} partition(s)"
+
+
+def delete_expense(spreadsheet_id, expense, scheme, debug=False):
+    """
+    Delete an expense from its partition (or from the legacy tab).
+
+    Returns:
+        Tuple of (success, message)
+    """
+    if scheme == "none":
+        return sheets.delete_expense_from_sheet(spreadsheet_id, expense, debug=debug)
+
+    try:
+        service = sheets.get_google_sheets_service()
+        location, tab = locate(service, spreadsheet_id, expense, scheme)
+    except Exception as error:
+        return False, f"Error finding partition: {error}"
+    success, message = sheets.delete_expense_from_sheet(location, expense, debug=debug, sheet_title=tab)
+    if not success and message == sheets.NOT_FOUND_MESSAGE and tab != sheets.DEFAULT_SHEET:
+        # Not migrated yet
+        return sheets.delete_expense_from_sheet(spreadsheet_id, expense, debug=debug)
+    return success, message
+
+
+def clear_all_expenses(spreadsheet_id, scheme):
+    """
+    Clear every partition and the legacy tab (headers and manifest stay).
+
+    Returns:
+        Tuple of (success, message)
+    """
+    if scheme == "none":
+        return sheets.clear_all_expenses_from_sheet(spreadsheet_id)
+
+    try:
+        service = sheets.get_google_sheets_service()
+        entries = get_manifest(service, spreadsheet_id, refresh=True)
+    except Exception as error:
+        return False, f"Error clearing expenses: {error}"
+    for location, tab in [(spreadsheet_id, sheets.DEFAULT_SHEET)] + list(entries.values()):
+        success, message = sheets.clear_all_expenses_from_sheet(location, sheet_title=tab)
+        if not success:
+            return False, f"{tab}: {message}"
+    return True, f"All expenses cleared from {len(entries) + 1} tab(s)!"
+
+
+def migrate_legacy(spreadsheet_id, scheme):
+    """
+    Move the rows of "Sheet1" into partitions.
+
+    Rows that can't be read as an expense (too few columns, or a date that
+    can't be read) stay in Sheet1 exactly as they were.
+
+    Returns:
+        Tuple of ({partition_key: rows_moved}, number of rows left in Sheet1)
+    """
+    service = sheets.get_google_sheets_service()
+    result = sheets_scheduler.execute(service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=sheets.a1(sheets.DEFAULT_SHEET, 'A2:E'),
+        **sheets.TYPED_READ
+    ), 'values.get')
+
+    groups = {}
+    kept = []  # Raw rows that stay in Sheet1
+    for row in result.get('values', []):
+        expense = sheets.row_to_expense(row)
+        key = partition_key(expense['Date'], scheme) if expense else None
+        if key is None:
+            kept.append(row)
+        else:
+            groups.setdefault(key, []).append(expense)
+
+    for key in sorted(groups):
+        location, tab = ensure_partition(service, spreadsheet_id, key)
+        sheets_scheduler.append(service, location, sheets.a1(tab, 'A:E'), [sheets.expense_to_row(e) for e in groups[key]])
+
+    # Only clear Sheet1 once every row has been written elsewhere
+    sheets_scheduler.execute(service.spreadsheets().values().clear(
+        spreadsheetId=spreadsheet_id,
+        range=sheets.a1(sheets.DEFAULT_SHEET, 'A2:E')
+    ), 'values.clear')
+    if kept:
+        # RAW writes the values back exactly as they were read
+        body = {'values': kept}
+        sheets_scheduler.execute(service.spreadsheets().values().update(
+            spreadsheetId=spreadsheet_id,
+            range=sheets.a1(sheets.DEFAULT_SHEET, 'A2'),
+            valueInputOption='RAW',
+            body=body
+        ), 'values.update', body)
+    return {key: len(rows) for key, rows in groups.items()}, len(kept)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage time-partitioned expense tabs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate = subparsers.add_parser("migrate", help="Move the rows of Sheet1 into partitions")
+    migrate.add_argument("spreadsheet_id")
+    migrate.add_argument("--scheme", choices=["year", "month"], default="year")
+    show = subparsers.add_parser("show", help="Print the manifest")
+    show.add_argument("spreadsheet_id")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        moved, kept = migrate_legacy(args.spreadsheet_id, args.scheme)
+        for key, count in sorted(moved.items()):
+            print(f"✅ {partition_tab(key)}: {count} rows")
+        print(f"Moved {sum(moved.values())} rows into {len(moved)} partition(s)")
+        if kept:
+            print(f"⚠️ {kept} row(s) could not be read as expenses and were left in {sheets.DEFAULT_SHEET}")
+    else:
+        service = sheets.get_google_sheets_service()
+        for key, (location, tab) in sorted(get_manifest(service, args.spreadsheet_id).items()):
+            print(f"{key:<10} {tab:<20} {location}")
+
+
+if __name__ == "__main__":
+    main()
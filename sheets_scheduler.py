@@ -0,0 +1,243 @@
+"""
+Shared request scheduler for the Google Sheets API.
+
+All Sheets calls of the app process go through one queue so that, together,
+they stay just under the per-minute quota instead of bursting into 429 errors:
+    - a token bucket limits how many requests start per minute
+    - interactive requests (what a user is waiting for) run before background ones
+    - 429 and 5xx answers are retried with exponential backoff and jitter, and a
+      429 pauses the whole bucket, not just the request that hit it
+    - appends to the same range that are waiting in the queue are merged into
+      one API call
+
+Requests run on worker threads, so each caller must use its own service
+object (see SheetsScheduler).
+
+Example:
+    result = sheets_scheduler.execute(service.spreadsheets().values().get(...), 'values.get')
+    sheets_scheduler.append(service, spreadsheet_id, 'Sheet1!A:E', rows)
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import api_metrics
+
+# Priorities: lower runs first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Google's default quota is 60 read and 60 write requests per minute per user;
+# stay a little below it
+DEFAULT_REQUESTS_PER_MINUTE = 55
+DEFAULT_BURST = 10
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Allows `rate_per_minute` requests per minute on average, and up to `burst` at once.
+    """
+
+    def __init__(self, rate_per_minute, burst):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Wait until a request may start, then use one token."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for a while (after the server said "too many requests")."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+
+class SheetsScheduler:
+    """
+    Runs queued Sheets requests on background worker threads.
+
+    Args:
+        requests_per_minute: Average request rate allowed
+        burst: Requests that may start at once after a quiet period
+        max_retries: Retries for 429/5xx answers before giving up
+        base_delay: First backoff delay in seconds (doubles on every retry)
+        max_delay: Longest backoff delay in seconds
+        workers: Threads sending requests
+
+    Requests made from the same googleapiclient service share its
+    httplib2.Http, which is not thread-safe. This is only safe because
+    every caller builds its own service (get_google_sheets_service() makes a
+    new one per call) and waits for its request before sending the next.
+    Never hand the scheduler requests from one shared service object.
+    """
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, burst=DEFAULT_BURST,
+                 max_retries=5, base_delay=1.0, max_delay=32.0, workers=2):
+        self.bucket = TokenBucket(requests_per_minute, burst)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.queue = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        for _ in range(workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    # --- Public API -------------------------------------------------------
+
+    def execute(self, request, operation, body=None, priority=INTERACTIVE):
+        """
+        Queue one request and wait for its result.
+
+        Raises the same HttpError as request.execute() if it still fails after retries.
+        """
+        job = {'kind': 'request', 'request': request, 'operation': operation, 'body': body}
+        return self._submit(job, priority).result()
+
+    def append(self, service, spreadsheet_id, a1_range, rows, value_input_option='USER_ENTERED',
+               priority=INTERACTIVE):
+        """
+        Queue rows to append and wait until they are written.
+
+        Appends to the same spreadsheet and range that are waiting at the same
+        time are sent as one values.append call.
+        """
+        job = {
+            'kind': 'append',
+            'service': service,
+            'merge_key': (spreadsheet_id, a1_range, value_input_option),
+            'rows': list(rows),
+        }
+        return self._submit(job, priority).result()
+
+    # --- Internals --------------------------------------------------------
+
+    def _submit(self, job, priority):
+        job['future'] = Future()
+        with self.condition:
+            heapq.heappush(self.queue, (priority, next(self.counter), job))
+            self.condition.notify()
+        return job['future']
+
+    def _next_jobs(self):
+        """Take the most urgent job, plus every queued append it can be merged with."""
+        with self.condition:
+            while not self.queue:
+                self.condition.wait()
+            _, _, job = heapq.heappop(self.queue)
+            jobs = [job]
+            if job['kind'] == 'append':
+                keep = []
+                for entry in self.queue:
+                    other = entry[2]
+                    if other['kind'] == 'append' and other['merge_key'] == job['merge_key']:
+                        jobs.append(other)
+                    else:
+                        keep.append(entry)
+                if len(jobs) > 1:
+                    heapq.heapify(keep)
+                    self.queue = keep
+            return jobs
+
+    def _worker(self):
+        while True:
+            jobs = self._next_jobs()
+            first = jobs[0]
+            if first['kind'] == 'append':
+                spreadsheet_id, a1_range, value_input_option = first['merge_key']
+                body = {'values': [row for job in jobs for row in job['rows']]}
+                operation = 'values.append'
+                make_request = lambda: first['service'].spreadsheets().values().append(
+                    spreadsheetId=spreadsheet_id,
+                    range=a1_range,
+                    valueInputOption=value_input_option,
+                    body=body,
+                )
+            else:
+                body = first['body']
+                operation = first['operation']
+                request = first['request']
+                make_request = lambda: request
+
+            try:
+                result = self._run_with_retries(make_request, operation, body)
+            except Exception as error:
+                for job in jobs:
+                    job['future'].set_exception(error)
+            else:
+                for job in jobs:
+                    job['future'].set_result(result)
+
+    def _run_with_retries(self, make_request, operation, body):
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                return api_metrics.execute(make_request(), operation, body)
+            except Exception as error:
+                status = api_metrics.error_status(error)
+                if status not in RETRYABLE_STATUSES or attempt >= self.max_retries:
+                    raise
+                # Exponential backoff with full jitter
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if status == 429:
+                    # Everyone backs off, so we don't keep hitting the quota
+                    self.bucket.pause(delay)
+                else:
+                    time.sleep(delay)
+                attempt += 1
+                api_metrics.record_retry('sheets', operation)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The scheduler shared by every session of the app process."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = SheetsScheduler()
+        return _scheduler
+
+
+def configure(**options):
+    """
+    Replace the shared scheduler, e.g. configure(requests_per_minute=300) for a
+    project with a raised quota. Takes the same options as SheetsScheduler.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = SheetsScheduler(**options)
+        return _scheduler
+
+
+def execute(request, operation, body=None, priority=INTERACTIVE):
+    """Run a request through the shared scheduler (see SheetsScheduler.execute)."""
+    return get_scheduler().execute(request, operation, body, priority)
+
+
+def append(service, spreadsheet_id, a1_range, rows, value_input_option='USER_ENTERED', priority=INTERACTIVE):
+    """Append rows through the shared scheduler (see SheetsScheduler.append)."""
+    return get_scheduler().append(service, spreadsheet_id, a1_range, rows, value_input_option, priority)
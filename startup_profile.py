@@ -0,0 +1,33 @@
+import importlib
+import sys
+import time
+
+# How long each lazily imported module took to load, in seconds.
+# Streamlit keeps imported modules between reruns, so this fills up once per server process.
+IMPORT_TIMES = {}
+
+
+def lazy_import(module_name):
+    """
+    Import a module the first time a feature needs it, and time the import.
+
+    Args:
+        module_name: Dotted module name, e.g. "plotly.express"
+
+    Returns:
+        The imported module
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    IMPORT_TIMES[module_name] = time.perf_counter() - start
+    return module
+
+
+def get_import_times():
+    """
+    Return (module_name, seconds) pairs, slowest import first.
+    """
+    return sorted(IMPORT_TIMES.items(), key=lambda item: item[1], reverse=True)
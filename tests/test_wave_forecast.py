@@ -0,0 +1,174 @@
+"""Tests for wave_forecast.py, run against the local stand-in source (fake_waves.py)."""
+
+import threading
+
+import numpy as np
+import pytest
+
+import wave_forecast
+from fake_waves import FakeMarineSource
+from wave_forecast import DAY, HOUR, VARIABLES, WaveForecast, daily_summary
+
+# A fixed "now" on a day boundary plus half an hour, so the tests don't depend on the clock
+NOW = 1_700_006_400 + 1800
+CURRENT_HOUR = NOW - NOW % HOUR
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "waves.npz")
+
+
+def make_forecast(cache_path, source=None, **kwargs):
+    kwargs.setdefault("past_days", 2)
+    kwargs.setdefault("forecast_days", 3)
+    return WaveForecast(source or FakeMarineSource(), cache_path, **kwargs)
+
+
+def test_missing_range_without_cache(cache_path):
+    forecast = make_forecast(cache_path)
+    assert forecast.missing_range(NOW) == (CURRENT_HOUR - 2 * DAY, CURRENT_HOUR + 3 * DAY)
+
+
+def test_missing_range_with_cache_starts_at_the_current_hour(cache_path):
+    forecast = make_forecast(cache_path)
+    forecast.refresh(NOW)
+    # Five hours later the past is cached; only the hours that can still change are asked for
+    later = NOW + 5 * HOUR
+    assert forecast.missing_range(later) == (CURRENT_HOUR + 5 * HOUR, CURRENT_HOUR + 5 * HOUR + 3 * DAY)
+
+
+def test_missing_range_fills_the_gap_after_an_old_cache(cache_path):
+    forecast = make_forecast(cache_path, forecast_days=1)
+    forecast.refresh(NOW)
+    # The cache ends a day from NOW; two days later the hours after it are missing too
+    start, _ = forecast.missing_range(NOW + 2 * DAY)
+    assert start == CURRENT_HOUR + DAY + HOUR
+
+
+def test_missing_range_ignores_history_older_than_past_days(cache_path):
+    forecast = make_forecast(cache_path)
+    forecast.refresh(NOW)
+    # After a long break the request is capped at past_days, not the end of the old cache
+    much_later = NOW + 10 * DAY
+    start, _ = forecast.missing_range(much_later)
+    assert start == CURRENT_HOUR + 10 * DAY - 2 * DAY
+
+
+def test_refresh_merges_only_the_new_hours(cache_path):
+    source = FakeMarineSource()
+    forecast = make_forecast(cache_path, source)
+    first = forecast.refresh(NOW)
+    assert first == 5 * 24 + 1
+
+    later = NOW + 6 * HOUR
+    fetched = forecast.refresh(later)
+    start, end = source.calls[-1]
+    assert start == CURRENT_HOUR + 6 * HOUR  # Past hours stay cached
+    assert fetched == (end - start) // HOUR + 1
+
+    hours = forecast.data.hours
+    assert np.all(np.diff(hours) == HOUR)  # Sorted, no gaps, no duplicates
+    assert hours[0] == CURRENT_HOUR - 2 * DAY
+    assert hours[-1] == CURRENT_HOUR + 6 * HOUR + 3 * DAY
+    assert forecast.data.values.shape == (len(VARIABLES), len(hours))
+    assert forecast.data.fetched_at == later
+
+
+def test_refresh_drops_history_older_than_keep_days(cache_path):
+    forecast = make_forecast(cache_path, keep_days=3)
+    forecast.refresh(NOW)
+    later = NOW + 2 * DAY
+    forecast.refresh(later)
+    assert forecast.data.hours[0] >= later - 3 * DAY
+    assert forecast.data.hours[-1] == CURRENT_HOUR + 2 * DAY + 3 * DAY
+
+
+def test_daily_summary_with_a_missing_day():
+    hours = np.arange(0, 3 * DAY, HOUR, dtype=np.int64)
+    heights = np.full(len(hours), 2.0, dtype=np.float32)
+    heights[24:48] = np.nan  # The whole second day is missing
+    heights[50] = np.nan     # One hour of the third day
+    heights[60] = 4.0
+
+    days, summary = daily_summary(hours, heights)
+
+    assert list(days) == list(np.array([0, 1, 2], dtype="datetime64[D]"))
+    assert summary[0].tolist() == [2.0, 2.0, 2.0]
+    assert np.isnan(summary[1]).all()
+    assert summary[2, 0] == 2.0
+    assert summary[2, 2] == 4.0
+    assert summary[2, 1] == pytest.approx((22 * 2.0 + 4.0) / 23)
+
+
+def test_daily_summary_empty():
+    days, summary = daily_summary(np.array([], dtype=np.int64), np.array([], dtype=np.float32))
+    assert len(days) == 0
+    assert summary.shape == (0, 3)
+
+
+def test_cache_round_trip(cache_path):
+    forecast = make_forecast(cache_path)
+    forecast.refresh(NOW)
+
+    reloaded = make_forecast(cache_path)
+    assert np.array_equal(reloaded.data.hours, forecast.data.hours)
+    assert np.array_equal(reloaded.data.values, forecast.data.values)
+    assert reloaded.data.fetched_at == NOW
+    assert not reloaded.is_stale(NOW + 60)
+
+
+def test_cache_with_other_variables_is_ignored(cache_path, monkeypatch):
+    make_forecast(cache_path).refresh(NOW)
+    monkeypatch.setattr(wave_forecast, "VARIABLES", VARIABLES + ["wind_wave_height"])
+    assert len(make_forecast(cache_path).data.hours) == 0
+
+
+def test_missing_cache_file_gives_empty_data(cache_path):
+    forecast = make_forecast(cache_path)
+    assert len(forecast.data.hours) == 0
+    assert forecast.is_stale(NOW)
+
+
+def test_background_refresh_runs_once_for_many_callers(cache_path):
+    source = FakeMarineSource(latency=0.3)
+    forecast = make_forecast(cache_path, source)
+
+    started = []
+    threads = [threading.Thread(target=lambda: started.append(forecast.refresh_in_background(NOW)))
+               for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert started.count(True) == 1
+    assert forecast.refreshing
+
+    with forecast.refresh_lock:  # Wait for the refresh to finish
+        pass
+    assert len(source.calls) == 1
+    assert len(forecast.data.hours) > 0
+    assert not forecast.refresh_in_background(NOW)  # Fresh now
+
+
+def test_failed_refresh_waits_before_trying_again(cache_path):
+    source = FakeMarineSource(fail=True)
+    forecast = make_forecast(cache_path, source)
+
+    assert forecast.refresh_in_background(NOW)
+    with forecast.refresh_lock:
+        pass
+    assert "down" in forecast.last_error
+    assert forecast.retry_after > 0
+    assert len(forecast.data.hours) == 0
+
+    # No new attempt until retry_after
+    assert not forecast.refresh_in_background(forecast.retry_after - 1)
+    assert len(source.calls) == 1
+
+    source.fail = False
+    assert forecast.refresh_in_background(forecast.retry_after + 1)
+    with forecast.refresh_lock:
+        pass
+    assert forecast.last_error is None
+    assert len(source.calls) == 2
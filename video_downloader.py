@@ -1,44 +1,381 @@
 # Simple Video Downloader
-# This program asks for a URL and downloads the video in the lowest quality
+# This program asks for a URL and downloads the smallest video that still
+# meets a minimum quality (by default: has sound and is at least 144p)
+# It can also download a whole list of URLs at once (queue mode):
+#   python video_downloader.py --batch urls.txt --workers 4 --fragments 4
 
-import yt_dlp
+import argparse
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import yt_dlp
+
+
+# File where finished downloads are remembered (one "extractor video_id" per line)
+DEFAULT_ARCHIVE = 'download_archive.txt'
+
+
+def build_ydl_opts(fragments=1, archive=DEFAULT_ARCHIVE):
+    """
+    Build the yt-dlp options shared by the single and queue downloads.
+
+    Args:
+        fragments: How many fragments of one video to download at the same time
+        archive: Path of the download archive file, or None to re-download everything
+
+    Returns:
+        Dictionary of yt-dlp options
+    """
+    ydl_opts = {
+        'format': 'worst',  # Used only when the format planner finds nothing better
+        # The video ID keeps names unique when two videos share a title,
+        # and stable between runs so an interrupted .part file is found again
+        'outtmpl': '%(title)s [%(id)s].%(ext)s',
+        'concurrent_fragment_downloads': fragments,
+        'continuedl': True,  # Resume .part files instead of starting from zero
+        'retries': 10,
+        'fragment_retries': 10,
+    }
+    if archive:
+        # Videos already listed in the archive are skipped without downloading
+        ydl_opts['download_archive'] = archive
+    return ydl_opts
+
+
+# Smallest acceptable stream: at least this tall, any codec, and with sound
+DEFAULT_FLOOR = {
+    'min_height': 144,
+    'codec': None,  # e.g. 'avc1' to only accept H.264 video
+    'need_audio': True,
+}
+
+
+def estimate_format_bytes(fmt, duration):
+    """
+    Guess how many bytes a format will take, or None if there's no way to tell.
+
+    Uses the exact size when the site gives it, else the approximate size,
+    else the bitrate (kbit/s) times the video duration.
+    """
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    if size:
+        return size
+    if fmt.get('tbr') and duration:
+        return int(fmt['tbr'] * 1000 / 8 * duration)
+    return None
+
+
+def can_merge_formats(ydl):
+    """True if yt-dlp can merge a video-only and an audio-only download (needs ffmpeg)."""
+    from yt_dlp.postprocessor import FFmpegMergerPP
+    return FFmpegMergerPP(ydl).available
+
+
+def plan_format(info, floor=DEFAULT_FLOOR, can_merge=False):
+    """
+    Pick the smallest stream (or video+audio pair) that meets the floor.
+
+    Only looks at the format list that yt-dlp already extracted, so nothing
+    is downloaded here.
+
+    Args:
+        info: Video info dictionary from YoutubeDL.extract_info(download=False)
+        floor: Dictionary with min_height, codec and need_audio
+        can_merge: ffmpeg is installed, so video+audio pairs can be merged into
+            one file; without it only single files are planned
+
+    Returns:
+        Tuple of (format_spec, expected_bytes); format_spec is None if no
+        format meets the floor and expected_bytes is None if unknown
+    """
+    duration = info.get('duration')
+    min_height = floor.get('min_height') or 0
+    codec = floor.get('codec')
+    need_audio = floor.get('need_audio', True)
+
+    def video_ok(fmt):
+        if fmt.get('vcodec') == 'none':
+            return False
+        if (fmt.get('height') or 0) < min_height:
+            return False
+        if codec and not str(fmt.get('vcodec') or '').startswith(codec):
+            return False
+        return True
+
+    def sort_key(candidate):
+        # Unknown sizes go last
+        size = candidate[1]
+        return (size is None, size or 0)
+
+    formats = [f for f in info.get('formats') or [info] if f.get('format_id')]
+    candidates = []
+
+    # Single files that already contain everything we need
+    for fmt in formats:
+        if video_ok(fmt) and (not need_audio or fmt.get('acodec') != 'none'):
+            candidates.append((fmt['format_id'], estimate_format_bytes(fmt, duration)))
+
+    # Video-only stream merged with the smallest audio-only stream. Without
+    # ffmpeg these would end up as two separate files, the video one silent.
+    if need_audio and can_merge:
+        audio = [(f, estimate_format_bytes(f, duration)) for f in formats
+                 if f.get('vcodec') == 'none' and f.get('acodec') not in (None, 'none')]
+        if audio:
+            best_audio, audio_bytes = min(audio, key=sort_key)
+            for fmt in formats:
+                if video_ok(fmt) and fmt.get('acodec') == 'none':
+                    video_bytes = estimate_format_bytes(fmt, duration)
+                    total = video_bytes + audio_bytes if video_bytes and audio_bytes else None
+                    candidates.append((f"{fmt['format_id']}+{best_audio['format_id']}", total))
+
+    if not candidates:
+        return None, None
+    return min(candidates, key=sort_key)
+
+
+def download_with_plan(ydl_opts, url, floor=DEFAULT_FLOOR, label=""):
+    """
+    Extract a URL once, plan the smallest format for each video, then download.
+
+    Falls back to the 'worst' format when nothing meets the floor. Video+audio
+    pairs are only planned when ffmpeg is installed to merge them.
+
+    Returns:
+        Expected number of bytes for the planned downloads (0 if unknown)
+    """
+    prefix = f"[{label}] " if label else ""
+    expected_total = 0
+
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+        can_merge = can_merge_formats(ydl)
+    if info is None:
+        # Already in the download archive
+        return 0
+
+    # A playlist gives a list of videos; a single video is a list of one
+    entries = info.get('entries') if info.get('_type') == 'playlist' else [info]
+    for entry in entries or []:
+        if not entry:
+            continue
+        format_spec, expected = plan_format(entry, floor, can_merge)
+        if format_spec is None:
+            print(f"{prefix}No format meets the floor for {entry.get('title')}, using 'worst'")
+            format_spec = 'worst'
+        size_text = f"{expected / 1024 / 1024:.1f} MB" if expected else "unknown size"
+        print(f"{prefix}Plan for {entry.get('title')}: format {format_spec} ({size_text})")
+        expected_total += expected or 0
+
+        # Reuse the extracted info so the page isn't fetched a second time
+        with yt_dlp.YoutubeDL(dict(ydl_opts, format=format_spec)) as ydl:
+            ydl.process_ie_result(entry, download=True)
+
+    return expected_total
+
+
+def download_video(archive=DEFAULT_ARCHIVE, floor=DEFAULT_FLOOR):
+    """Downloads a video from a URL as the smallest file that still meets the quality floor"""
 
-def download_video():
-    """Downloads a video from a URL in the lowest quality"""
-    
     # Ask the user for the URL
     print("Welcome to the Simple Video Downloader!")
-    print("This program will download videos in the lowest quality to save space.")
+    print("This program downloads the smallest version of a video that still has sound")
+    print(f"and is at least {floor.get('min_height') or 0}p, to save space.")
     print()
-    
+
     url = input("Please enter the video URL: ").strip()
-    
+
     # Check if URL is not empty
     if not url:
         print("Error: Please enter a valid URL.")
         return
-    
-    # Configure yt-dlp to download in lowest quality
-    ydl_opts = {
-        'format': 'worst',  # Downloads the worst/lowest quality
-        'outtmpl': '%(title)s.%(ext)s',  # Output filename format
-    }
-    
+
+    # Configure yt-dlp (the format itself is picked by plan_format)
+    ydl_opts = build_ydl_opts(archive=archive)
+
     try:
         print(f"Starting download from: {url}")
         print("This might take a few moments...")
-        
-        # Create yt-dlp object and download
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
-        
+
+        # Pick the smallest good-enough format, then download it
+        download_with_plan(ydl_opts, url, floor)
+
         print("✅ Download completed successfully!")
         print("The video has been saved to your current folder.")
-        
+
     except Exception as e:
         print(f"❌ Error downloading video: {e}")
         print("Please check that the URL is correct and try again.")
 
+
+def read_url_file(path):
+    """
+    Read URLs (videos or playlists) from a text file, one per line.
+
+    Empty lines and lines starting with # are skipped, and duplicates are
+    only kept once.
+    """
+    urls = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            url = line.strip()
+            if url and not url.startswith('#') and url not in urls:
+                urls.append(url)
+    return urls
+
+
+class DownloadStats:
+    """Thread-safe byte and video counter shared by all download workers."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.total_bytes = 0
+        self.videos = set()  # (extractor, video id) of every finished video
+
+    @property
+    def finished_files(self):
+        with self.lock:
+            return len(self.videos)
+
+    def add_file(self, size, video_key):
+        """
+        Count one finished download.
+
+        A video downloaded as separate video and audio streams finishes twice,
+        so videos are counted by their key, not per call.
+        """
+        with self.lock:
+            self.total_bytes += size or 0
+            self.videos.add(video_key)
+
+
+def make_progress_hook(label, stats):
+    """
+    Create a yt-dlp progress hook that prints progress for one URL.
+
+    Progress is printed every 10% so several workers don't flood the terminal.
+    """
+    last_step = {'value': -1}
+
+    def hook(d):
+        if d['status'] == 'downloading':
+            total = d.get('total_bytes') or d.get('total_bytes_estimate')
+            if not total:
+                return
+            step = int(d.get('downloaded_bytes', 0) * 10 / total)
+            if step != last_step['value']:
+                last_step['value'] = step
+                speed = d.get('speed') or 0
+                print(f"[{label}] {step * 10}% at {speed / 1024 / 1024:.2f} MB/s")
+        elif d['status'] == 'finished':
+            last_step['value'] = -1
+            info = d.get('info_dict') or {}
+            video_key = (info.get('extractor_key'), info.get('id') or d.get('filename'))
+            stats.add_file(d.get('total_bytes') or d.get('downloaded_bytes'), video_key)
+            print(f"[{label}] ✅ Finished {os.path.basename(d.get('filename', ''))}")
+
+    return hook
+
+
+def download_one(index, url, fragments, stats, archive=DEFAULT_ARCHIVE, floor=DEFAULT_FLOOR):
+    """
+    Download one URL (a video or a whole playlist) in a worker thread.
+
+    Returns:
+        Tuple of (url, success, error_message)
+    """
+    label = f"#{index}"
+    ydl_opts = build_ydl_opts(fragments, archive)
+    ydl_opts['progress_hooks'] = [make_progress_hook(label, stats)]
+    ydl_opts['quiet'] = True
+    ydl_opts['noprogress'] = True
+
+    print(f"[{label}] Starting {url}")
+    try:
+        download_with_plan(ydl_opts, url, floor, label)
+        return url, True, ""
+    except Exception as e:
+        print(f"[{label}] ❌ {e}")
+        return url, False, str(e)
+
+
+def download_queue(urls, workers=4, fragments=4, archive=DEFAULT_ARCHIVE, floor=DEFAULT_FLOOR):
+    """
+    Download many URLs with a limited number of parallel workers.
+
+    Args:
+        urls: List of video or playlist URLs
+        workers: How many URLs are downloaded at the same time
+        fragments: How many fragments of each video are fetched at the same time
+        archive: Path of the download archive file, or None to re-download everything
+        floor: Minimum quality, see DEFAULT_FLOOR
+
+    Returns:
+        List of (url, success, error_message) tuples, in the order of urls
+    """
+    stats = DownloadStats()
+    results = {}
+    start = time.time()
+
+    print(f"Downloading {len(urls)} URL(s) with {workers} worker(s) and {fragments} fragment(s) each...")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(download_one, i, url, fragments, stats, archive, floor)
+            for i, url in enumerate(urls, start=1)
+        ]
+        for future in as_completed(futures):
+            url, success, error = future.result()
+            results[url] = (url, success, error)
+
+    elapsed = time.time() - start
+    ordered = [results[url] for url in urls]
+    failed = [r for r in ordered if not r[1]]
+
+    # Combined throughput report
+    megabytes = stats.total_bytes / 1024 / 1024
+    print()
+    print("=== Download report ===")
+    print(f"URLs: {len(urls)} ({len(urls) - len(failed)} ok, {len(failed)} failed)")
+    print(f"Videos: {stats.finished_files} (videos already in the archive are skipped)")
+    print(f"Downloaded: {megabytes:.1f} MB in {elapsed:.1f} s")
+    if elapsed > 0:
+        print(f"Throughput: {megabytes / elapsed:.2f} MB/s")
+    for url, _, error in failed:
+        print(f"❌ {url}: {error}")
+
+    return ordered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download videos in the lowest quality.")
+    parser.add_argument("--batch", help="Text file with one video or playlist URL per line")
+    parser.add_argument("--workers", type=int, default=4, help="URLs downloaded at the same time (default: 4)")
+    parser.add_argument("--fragments", type=int, default=4, help="Fragments per video downloaded at the same time (default: 4)")
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE, help=f"Download archive file (default: {DEFAULT_ARCHIVE})")
+    parser.add_argument("--no-archive", action="store_true", help="Download again even if a video is already in the archive")
+    parser.add_argument("--min-height", type=int, default=DEFAULT_FLOOR['min_height'], help=f"Smallest acceptable video height in pixels (default: {DEFAULT_FLOOR['min_height']})")
+    parser.add_argument("--codec", help="Only accept this video codec, e.g. avc1")
+    parser.add_argument("--allow-no-audio", action="store_true", help="Accept streams without sound")
+    args = parser.parse_args()
+
+    archive = None if args.no_archive else args.archive
+    floor = {
+        'min_height': args.min_height,
+        'codec': args.codec,
+        'need_audio': not args.allow_no_audio,
+    }
+
+    if not args.batch:
+        download_video(archive, floor)
+        return
+
+    urls = read_url_file(args.batch)
+    if not urls:
+        print(f"Error: No URLs found in {args.batch}.")
+        return
+    download_queue(urls, workers=max(1, args.workers), fragments=max(1, args.fragments), archive=archive, floor=floor)
+
+
 if __name__ == "__main__":
-    download_video()
+    main()
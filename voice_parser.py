@@ -1,13 +1,17 @@
 import json
-import google.generativeai as genai
+import re
 import streamlit as st
+from startup_profile import lazy_import
+import api_metrics
 
-def parse_expense_with_gemini(transcribed_text):
+def parse_expense_with_gemini(transcribed_text, category_model=None):
     """
     Use Gemini to parse natural language expense description into structured data.
     
     Args:
         transcribed_text: The text transcribed from voice input
+        category_model: Trained category_model.CategoryModel, used to pick the
+            category if Gemini's answer can't be read
         
     Returns:
         Dictionary with parsed expense data or None if parsing failed
@@ -17,6 +21,8 @@ def parse_expense_with_gemini(transcribed_text):
         if 'GEMINI_API_KEY' not in st.secrets:
             return None
             
+        # The Gemini SDK is slow to import, so only load it when a key is set
+        genai = lazy_import("google.generativeai")
         genai.configure(api_key=st.secrets.GEMINI_API_KEY)
         model = genai.GenerativeModel('gemini-2.5-flash')
         
@@ -41,8 +47,10 @@ def parse_expense_with_gemini(transcribed_text):
         Be precise with the amount - extract only the numerical value.
         """
         
-        # Get response from Gemini
-        response = model.generate_content(prompt)
+        # Get response from Gemini (timed and counted in the API metrics)
+        with api_metrics.track_call('gemini', 'generate_content', len(prompt.encode('utf-8'))) as call:
+            response = model.generate_content(prompt)
+            call['response_bytes'] = len(response.text.encode('utf-8'))
         
         # Parse the JSON response
         try:
@@ -67,21 +75,69 @@ def parse_expense_with_gemini(transcribed_text):
                 
         except json.JSONDecodeError:
             # If JSON parsing fails, try to extract information manually
-            return extract_fallback_data(transcribed_text)
+            return extract_fallback_data(transcribed_text, category_model)
             
     except Exception as e:
         st.error(f"Error parsing with Gemini: {str(e)}")
         return None
 
-def extract_fallback_data(text):
+# Words around the item name in descriptions like "I spent 15 euros on lunch"
+FILLER_WORDS = re.compile(
+    r"\b(i|spent|spend|paid|pay|bought|buy|cost|costs|for|on|at|the|a|an|euros?|eur|of|was|my)\b|€",
+    re.IGNORECASE,
+)
+AMOUNT = re.compile(r'(\d+(?:[.,]\d{1,2})?)')
+
+
+def parse_expense_locally(text, model, min_confidence=0.9):
+    """
+    Parse an expense description without calling Gemini, if that can be done reliably.
+
+    Works when the text contains an amount and the local category model is
+    confident about the category.
+
+    Args:
+        text: The expense description
+        model: A trained category_model.CategoryModel
+        min_confidence: Below this the result is None (ask Gemini instead)
+
+    Returns:
+        Dictionary like parse_expense_with_gemini() returns, or None
+    """
+    amount_match = AMOUNT.search(text)
+    if amount_match is None or model is None:
+        return None
+    # The item is what is left after removing the amount and filler words
+    item = FILLER_WORDS.sub(' ', text[:amount_match.start()] + text[amount_match.end():])
+    item = ' '.join(item.replace(',', ' ').split()).strip(' .')
+    if not item:
+        return None
+    category, confidence = model.predict_one(item)
+    if confidence < min_confidence:
+        return None
+    return {
+        'item': item[:1].upper() + item[1:],
+        'amount': float(amount_match.group(1).replace(',', '.')),
+        'category': category
+    }
+
+
+def extract_fallback_data(text, model=None):
     """
     Fallback method to extract basic information if Gemini parsing fails.
+
+    Uses the local category model when it has learned something, else keywords.
     """
-    import re
-    
     # Try to extract amount (look for numbers with euro symbols or currency)
     amount_match = re.search(r'(\d+(?:\.\d{2})?)', text)
     amount = float(amount_match.group(1)) if amount_match else 0.0
+
+    if model is not None and model.count:
+        return {
+            'item': text.strip(),
+            'amount': amount,
+            'category': model.predict_one(text)[0]
+        }
     
     # Simple category detection based on keywords
     text_lower = text.lower()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Hourly wave forecast for Nazaré, cached on disk and refreshed a piece at a time.
+
+The data comes from the free Open-Meteo marine API (no key needed). It is
+kept in a .npz file so the dashboard (nazare_waves.py) can show it right
+away, even after a restart or while the API is slow or down.
+
+A refresh only asks for the hours that can still change - from the current
+hour to the end of the forecast - and keeps the past hours it already has.
+So the history keeps growing (up to `keep_days`) while each request stays
+small.
+
+Examples:
+    python wave_forecast.py              # refresh the cache and print a summary
+    python wave_forecast.py --fake       # same, with made-up data (fake_waves.py)
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+# Praia do Norte, Nazaré
+NAZARE = (39.605, -9.085)
+VARIABLES = ["wave_height", "wave_period", "wave_direction", "swell_wave_height"]
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+class OpenMeteoSource:
+    """Hourly marine forecast from https://open-meteo.com (free for non-commercial use)."""
+
+    URL = "https://marine-api.open-meteo.com/v1/marine"
+
+    def __init__(self, latitude=NAZARE[0], longitude=NAZARE[1], timeout=15):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.timeout = timeout
+
+    def fetch(self, start, end):
+        """
+        Hourly values from start to end.
+
+        Args:
+            start, end: Epoch seconds (UTC), both included
+
+        Returns:
+            (hours as int64 epoch seconds, {variable: float32 array}); NaN where
+            the API has no value
+        """
+        query = urllib.parse.urlencode({
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "hourly": ",".join(VARIABLES),
+            "timezone": "UTC",
+            "cell_selection": "sea",
+            "start_hour": time.strftime("%Y-%m-%dT%H:00", time.gmtime(start)),
+            "end_hour": time.strftime("%Y-%m-%dT%H:00", time.gmtime(end)),
+        })
+        with urllib.request.urlopen(f"{self.URL}?{query}", timeout=self.timeout) as response:
+            hourly = json.loads(response.read())["hourly"]
+        hours = np.array(hourly["time"], dtype="datetime64[m]").astype("datetime64[s]").astype(np.int64)
+        values = {
+            name: np.array([np.nan if v is None else v for v in hourly.get(name, [])], dtype=np.float32)
+            for name in VARIABLES
+        }
+        return hours, values
+
+
+def daily_summary(hours, heights):
+    """
+    Min, mean and max wave height per day, for the daily chart.
+
+    Computed once per refresh (not per page view) with one pass over the arrays.
+
+    Args:
+        hours: Sorted int64 epoch seconds
+        heights: float32 array, same length (NaN = missing)
+
+    Returns:
+        (days as datetime64[D] array, float32 array of shape (days, 3): min, mean, max)
+    """
+    if len(hours) == 0:
+        return np.array([], dtype="datetime64[D]"), np.zeros((0, 3), dtype=np.float32)
+    day_numbers = hours // DAY
+    starts = np.flatnonzero(np.r_[True, day_numbers[1:] != day_numbers[:-1]])
+    known = ~np.isnan(heights)
+    counts = np.add.reduceat(known.astype(np.int64), starts)
+    sums = np.add.reduceat(np.where(known, heights, 0.0), starts)
+    summary = np.empty((len(starts), 3), dtype=np.float32)
+    # fmin/fmax skip NaN (unless the whole day is missing)
+    summary[:, 0] = np.fmin.reduceat(heights, starts)
+    summary[:, 1] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    summary[:, 2] = np.fmax.reduceat(heights, starts)
+    return day_numbers[starts].astype("datetime64[D]"), summary
+
+
+class WaveData:
+    """
+    One consistent copy of the cached data. Never changed after it is made,
+    so pages can read it while a refresh builds the next one.
+    """
+
+    def __init__(self, hours, values, fetched_at=0.0):
+        self.hours = hours                # int64 epoch seconds, sorted
+        self.values = values              # float32 array (len(VARIABLES), hours)
+        self.fetched_at = fetched_at      # When the newest part was fetched
+        self.days, self.daily = daily_summary(hours, values[0])
+
+    def column(self, name):
+        return self.values[VARIABLES.index(name)]
+
+    def at(self, when):
+        """Values of the hour containing `when`, as {variable: float}, or None."""
+        i = np.searchsorted(self.hours, when - when % HOUR)
+        if i >= len(self.hours) or self.hours[i] != when - when % HOUR:
+            return None
+        return {name: float(self.values[k, i]) for k, name in enumerate(VARIABLES)}
+
+    def window(self, start, end):
+        """(hours, values) between start and end (epoch seconds)."""
+        first, last = np.searchsorted(self.hours, [start, end + 1])
+        return self.hours[first:last], self.values[:, first:last]
+
+
+EMPTY = WaveData(np.array([], dtype=np.int64), np.zeros((len(VARIABLES), 0), dtype=np.float32))
+
+
+class WaveForecast:
+    """
+    The cached forecast, with refreshes that never make a reader wait.
+
+    Args:
+        source: Where new data comes from (OpenMeteoSource or fake_waves.FakeMarineSource)
+        cache_path: The .npz file the data is kept in
+        past_days: History asked for when there is no cache yet
+        forecast_days: How far ahead to ask
+        keep_days: History older than this is dropped
+        refresh_every: Seconds before the data counts as stale (the models update hourly)
+    """
+
+    def __init__(self, source, cache_path="wave_cache.npz", past_days=7, forecast_days=7,
+                 keep_days=60, refresh_every=30 * 60):
+        self.source = source
+        self.cache_path = cache_path
+        self.past_days = past_days
+        self.forecast_days = forecast_days
+        self.keep_days = keep_days
+        self.refresh_every = refresh_every
+        self.data = self.load_cache()
+        self.last_error = None
+        self.retry_after = 0.0  # After a failed refresh, wait a bit before the next try
+        self.refresh_lock = threading.Lock()
+
+    def load_cache(self):
+        try:
+            with np.load(self.cache_path) as cache:
+                if list(cache["variables"]) != VARIABLES:
+                    return EMPTY
+                return WaveData(cache["hours"], cache["values"], float(cache["fetched_at"]))
+        except (OSError, KeyError, ValueError):
+            return EMPTY
+
+    def save_cache(self, data):
+        # Write next to it, then swap, so a crash never leaves half a file
+        temporary = self.cache_path + ".tmp.npz"
+        np.savez(temporary, hours=data.hours, values=data.values,
+                 fetched_at=np.float64(data.fetched_at), variables=np.array(VARIABLES))
+        os.replace(temporary, self.cache_path)
+
+    def is_stale(self, now=None):
+        now = time.time() if now is None else now
+        return now - self.data.fetched_at > self.refresh_every and now >= self.retry_after
+
+    def missing_range(self, now=None):
+        """
+        The hours a refresh has to ask for: from the current hour (or the end
+        of the cache, if that is older) to the end of the forecast.
+        """
+        now = int(time.time() if now is None else now)
+        current_hour = now - now % HOUR
+        start = current_hour - self.past_days * DAY
+        past = self.data.hours[self.data.hours < current_hour]
+        if len(past):
+            start = max(start, int(past[-1]) + HOUR)
+        return start, current_hour + self.forecast_days * DAY
+
+    def refresh(self, now=None):
+        """
+        Fetch the missing hours and merge them into the cache. Blocks while fetching.
+
+        Returns:
+            Number of hours fetched
+        """
+        now = time.time() if now is None else now
+        start, end = self.missing_range(now)
+        hours, fetched = self.source.fetch(start, end)
+        new_values = np.stack([np.asarray(fetched[name], dtype=np.float32) for name in VARIABLES])
+
+        # Keep cached hours before the fetched ones; the fetched ones replace the rest
+        old = self.data
+        keep = (old.hours < (hours[0] if len(hours) else start)) & (old.hours >= now - self.keep_days * DAY)
+        data = WaveData(np.concatenate([old.hours[keep], hours]),
+                        np.concatenate([old.values[:, keep], new_values], axis=1),
+                        fetched_at=now)
+        self.save_cache(data)
+        self.data = data  # One assignment: readers see the old or the new data, never a mix
+        self.last_error = None
+        return len(hours)
+
+    def refresh_in_background(self, now=None):
+        """
+        Start a refresh in a background thread if the data is stale.
+
+        At most one refresh runs at a time, however many pages ask, so a crowd
+        of viewers makes one upstream request, not one each.
+
+        Returns:
+            True if a refresh was started
+        """
+        if not self.is_stale(now) or not self.refresh_lock.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                self.refresh(now)
+            except Exception as e:
+                self.last_error = str(e)
+                # Try again after a minute instead of on every page view
+                self.retry_after = time.time() + 60
+            finally:
+                self.refresh_lock.release()
+
+        threading.Thread(target=run, daemon=True).start()
+        return True
+
+    @property
+    def refreshing(self):
+        return self.refresh_lock.locked()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the cached Nazaré wave forecast.")
+    parser.add_argument("--cache", default="wave_cache.npz", help="Cache file (default: wave_cache.npz)")
+    parser.add_argument("--fake", action="store_true", help="Use made-up data instead of the API")
+    args = parser.parse_args()
+
+    if args.fake:
+        from fake_waves import FakeMarineSource
+        source = FakeMarineSource()
+    else:
+        source = OpenMeteoSource()
+    forecast = WaveForecast(source, args.cache)
+    start, end = forecast.missing_range()
+    print(f"Fetching {(end - start) // HOUR + 1} hours "
+          f"({time.strftime('%Y-%m-%d %H:00', time.gmtime(start))} to {time.strftime('%Y-%m-%d %H:00', time.gmtime(end))} UTC)...")
+    forecast.refresh()
+    data = forecast.data
+    print(f"✅ {len(data.hours)} hours cached in {args.cache}")
+    for day, (low, mean, high) in zip(data.days[-forecast.forecast_days:], data.daily[-forecast.forecast_days:]):
+        print(f"  {day}: {low:.1f} - {high:.1f} m (mean {mean:.1f} m)")
+
+
+if __name__ == "__main__":
+    main()